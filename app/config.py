@@ -8,11 +8,83 @@ class Config(BaseSettings):
     DB_HOST: str
     DB_PORT: str
     DB_DATABASE_NAME: str
+    DB_URL: str | None = None
+    DB_ASYNC: bool = False
+    DB_REPLICA_URLS: list[str] = []
+    REPLICA_EJECT_SECONDS: float = 30
+    REPLICA_READ_YOUR_WRITES_SECONDS: float = 2
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 10
+    # below MySQL's wait_timeout, so idle connections are replaced before the server drops them
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
 
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
     JWT_ACCESS_TOKEN_EXPIRES_MINUTES: int = 10
     JWT_REFRESH_TOKEN_EXPIRES_DAYS: int = 7
+    # a refresh token revoked through another worker keeps working here for up
+    # to this long, until the revocation filter next syncs from the table
+    REFRESH_REVOCATION_SYNC_SECONDS: float = 5.0
+    JWT_CLAIMS_CACHE_SIZE: int = 4096
+
+    TOKEN_SWEEP_ENABLED: bool = True
+    TOKEN_SWEEP_INTERVAL_SECONDS: float = 3600
+    TOKEN_SWEEP_BATCH_SIZE: int = 500
+    TOKEN_SWEEP_BATCH_DELAY_SECONDS: float = 0.2
+
+    # each worker invalidates only its own cache, so a user updated or deleted
+    # through another worker can still authenticate there for up to the TTL
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    # request handlers await the pool from the event loop. A synchronous caller
+    # (AuthHelper.get_password_hash / verify_password) holds its thread until
+    # the hash is done, and from Starlette's threadpool (AnyIO's 40 threads) up
+    # to WORKERS + QUEUE_DEPTH of them could wait at once, so endpoints never
+    # hash synchronously; keep that sum well below 40 if one ever has to
+    HASH_POOL_WORKERS: int = 4
+    HASH_POOL_QUEUE_DEPTH: int = 32
+    HASH_POOL_RETRY_AFTER_SECONDS: int = 1
+    HASH_POOL_BULK_SLOTS: int = 2
+
+    PORTFOLIO_FETCH_WORKERS: int = 12
+    ORDER_EXPORT_CHUNK_SIZE: int = 1000
+
+    ETAG_MAX_AGE_SECONDS: float = 10
+    RESPONSE_CACHE_SIZE: int = 10000
+    RESPONSE_CACHE_TTL_SECONDS: float = 5
+
+    BREAKER_FAIL_MAX: int = 3
+    BREAKER_RESET_TIMEOUT_SECONDS: float = 10
+    BREAKER_LATENCY_THRESHOLD_MS: float | None = 2000
+    BREAKER_LATENCY_PERCENTILE: float = 0.99
+    BREAKER_LATENCY_WINDOW: int = 100
+    STALE_CACHE_SIZE: int = 10000
+    STALE_CACHE_TTL_SECONDS: float = 3600
+    DIAGNOSTICS_API_KEY: str | None = None
+    # unset either one to turn that check off; development can go much lower
+    SLOW_QUERY_THRESHOLD_MS: float | None = 500
+    QUERY_REPEAT_THRESHOLD: int | None = 20
+    PROFILING_ENABLED: bool = False
+    PROFILING_RATE_LIMIT_PER_MINUTE: int = 6
+    PROFILING_HISTORY: int = 20
+
+    PRICE_INGEST_API_KEY: str | None = None
+    PRICE_FLUSH_INTERVAL_SECONDS: float = 0.25
+    PRICE_UPDATE_CHUNK_SIZE: int = 500
+    QUOTE_SEND_TIMEOUT_SECONDS: float = 5
+    QUOTE_MAX_LAG: int = 1000
+
+    ORDER_JOURNAL_PATH: str = 'data/orders.journal'
+    ORDER_JOURNAL_FSYNC: bool = True
+    WRITE_BEHIND_BATCH_SIZE: int = 500
+    WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: float = 0.05
+
+    # replaces the stock tables with a few demo rows on every start; turn off
+    # once the database holds real or generated data (python -m app.seeds)
+    SEED_ON_STARTUP: bool = True
 
     DEBUG: bool = False
 
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+import pybreaker
+
+
+class CircuitBreaker(pybreaker.CircuitBreaker):
+    """Circuit breaker that only takes its lock around bookkeeping.
+
+    pybreaker holds its lock for the whole wrapped call, which would serialise
+    every query that shares a breaker. Here a closed breaker runs calls side by
+    side and locks just to record the outcome. Once ``reset_timeout`` has
+    passed on an open breaker, a single trial call goes through; the rest fail
+    fast with ``CircuitBreakerError`` until it settles.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # a flag rather than a lock: AsyncSession greenlets share the event loop's
+        # thread, and a reentrant lock would let every one of them in
+        self._trial_in_flight = False
+
+    def call(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        state = self.state
+        if state.name != pybreaker.STATE_CLOSED:
+            return self._trial_call(func, *args, **kwargs)
+
+        for listener in self.listeners:
+            listener.before_call(self, func, *args, **kwargs)
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                state._handle_error(error)
+        with self._lock:
+            state._handle_success()
+        return result
+
+    def _trial_call(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            if self._trial_in_flight:
+                raise pybreaker.CircuitBreakerError("Trial call in progress, circuit breaker still open")
+            state = self.state
+            if state.name == pybreaker.STATE_OPEN:
+                # pybreaker's open state would re-enter call() once it goes half-open
+                opened_at = self._state_storage.opened_at
+                if opened_at and datetime.now(timezone.utc) < opened_at + timedelta(seconds=self.reset_timeout):
+                    raise pybreaker.CircuitBreakerError("Timeout not elapsed yet, circuit breaker still open")
+                self.half_open()
+                state = self.state
+            self._trial_in_flight = True
+
+        try:
+            return state.call(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._trial_in_flight = False
+
+
+class AdaptiveCircuitBreaker(CircuitBreaker):
+    """Circuit breaker that also opens when its calls get slow.
+
+    The durations of recent successful calls are kept in a fixed window. Once
+    it holds ``min_samples`` of them and their ``latency_percentile`` is above
+    ``latency_threshold`` seconds, the breaker opens just as it would after
+    ``fail_max`` consecutive errors. The window starts over whenever the
+    breaker closes again.
+    """
+
+    def __init__(
+            self,
+            *args: Any,
+            latency_threshold: float | None = None,
+            latency_percentile: float = 0.99,
+            window: int = 100,
+            min_samples: int = 20,
+            **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.latency_threshold = latency_threshold
+        self.latency_percentile = latency_percentile
+        self.min_samples = min_samples
+        self.opened = 0
+        self.latency_trips = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._latency_lock = threading.Lock()
+        self.add_listener(_StateListener())
+
+    def call(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        result = super().call(func, *args, **kwargs)
+        self._observe(time.perf_counter() - started)
+        return result
+
+    def _observe(self, seconds: float) -> None:
+        with self._latency_lock:
+            self._latencies.append(seconds)
+            # a call under the threshold cannot push the percentile over it
+            if self.latency_threshold is None or seconds <= self.latency_threshold:
+                return
+            if len(self._latencies) < self.min_samples:
+                return
+            slow = _percentile(sorted(self._latencies), self.latency_percentile) > self.latency_threshold
+
+        if slow and self.current_state == pybreaker.STATE_CLOSED:
+            self.latency_trips += 1
+            self.open()
+
+    def _state_changed(self, state: str) -> None:
+        if state == pybreaker.STATE_OPEN:
+            self.opened += 1
+        elif state == pybreaker.STATE_CLOSED:
+            with self._latency_lock:
+                self._latencies.clear()
+
+    def stats(self) -> dict:
+        with self._latency_lock:
+            samples = sorted(self._latencies)
+        p50, p95, p99 = (_percentile(samples, q) for q in (0.50, 0.95, 0.99))
+
+        return {
+            'state': self.current_state,
+            'fail_counter': self.fail_counter,
+            'opened': self.opened,
+            'latency_trips': self.latency_trips,
+            'latency': {
+                'samples': len(samples),
+                'p50_ms': p50 * 1000,
+                'p95_ms': p95 * 1000,
+                'p99_ms': p99 * 1000,
+            },
+        }
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+class _StateListener(pybreaker.CircuitBreakerListener):
+    def state_change(self, cb: AdaptiveCircuitBreaker, old_state, new_state) -> None:
+        cb._state_changed(new_state.name)
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from app.core.metrics import cache_lookups
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries carry their own expiry time."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None, name: str | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # named caches also report their lookups to /metrics
+        self._hit_counter = cache_lookups.labels(name, 'hit') if name else None
+        self._miss_counter = cache_lookups.labels(name, 'miss') if name else None
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._data[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+
+        counter = self._miss_counter if entry is None else self._hit_counter
+        if counter is not None:
+            counter.inc()
+        return default if entry is None else entry[0]
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+
+        if expires_at is None:
+            expires_at = time.time() + self.ttl if self.ttl is not None else float('inf')
+        elif self.ttl is not None:
+            expires_at = min(expires_at, time.time() + self.ttl)
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,13 @@
+import inspect
+from typing import Any, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.profiling import profiled
+
+
+async def run_service(method: Callable, *args: Any, **kwargs: Any) -> Any:
+    # async services are awaited on the event loop, sync ones run in the threadpool
+    if inspect.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await run_in_threadpool(profiled(method), *args, **kwargs)
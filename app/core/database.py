@@ -1,21 +1,182 @@
-from sqlalchemy import create_engine
+import itertools
+import time
+
+from fastapi.requests import HTTPConnection
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, Session, DeclarativeBase, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 from app.config import settings
+from app.core.cache import TTLCache
+from app.core.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
+
+SQLALCHEMY_DATABASE_URL: str = settings.DB_URL or f"mysql+pymysql://{settings.DB_USERNAME}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_DATABASE_NAME}"
+
+ASYNC_DRIVERS = {
+    'mysql+pymysql': 'mysql+aiomysql',
+    'mysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+READ_METHODS = frozenset({'GET', 'HEAD'})
+
+
+def async_database_url(url: str) -> str:
+    sync_url = make_url(url)
+    return sync_url.set(drivername=ASYNC_DRIVERS.get(sync_url.drivername, sync_url.drivername)).render_as_string(
+        hide_password=False
+    )
+
+
+def pool_options(url: str, asynchronous: bool = False) -> dict:
+    # SQLite keeps SQLAlchemy's own pool choice; it has no server to time out
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'poolclass': InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool,
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT_SECONDS,
+        'pool_recycle': settings.DB_POOL_RECYCLE_SECONDS,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+    }
+
+
+def engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {'connect_args': {'check_same_thread': False}}
+    return pool_options(url)
+
+
+class ReplicaSet:
+    """Read replicas picked round-robin, skipping any that recently failed.
+
+    A replica whose connection fails or drops is ejected for ``eject_seconds``
+    and then tried again. With every replica ejected, reads fall back to the
+    primary.
+    """
+
+    def __init__(self, engines: list[Engine], eject_seconds: float):
+        self.engines = engines
+        self.eject_seconds = eject_seconds
+        self._ejected_until: dict[Engine, float] = {}
+        self._turn = itertools.count()
+        for replica in engines:
+            event.listen(replica, 'handle_error', self._on_error)
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            self.eject(context.engine)
+
+    def eject(self, replica: Engine) -> None:
+        self._ejected_until[replica] = time.monotonic() + self.eject_seconds
+
+    def choose(self) -> Engine | None:
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            replica = self.engines[next(self._turn) % len(self.engines)]
+            if self._ejected_until.get(replica, 0.0) <= now:
+                return replica
+        return None
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                'url': replica.url.render_as_string(hide_password=True),
+                'healthy': self._ejected_until.get(replica, 0.0) <= now,
+            }
+            for replica in self.engines
+        ]
 
 
-SQLALCHEMY_DATABASE_URL: str = f"mysql+pymysql://{settings.DB_USERNAME}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_DATABASE_NAME}"
+# users who committed a write recently; their reads stay on the primary until
+# the replicas have had time to catch up
+recent_writes = TTLCache(maxsize=100000, ttl=settings.REPLICA_READ_YOUR_WRITES_SECONDS)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-sessionLocal= sessionmaker(autoflush=False, autocommit=False, bind=engine)
+
+class RoutingSession(Session):
+    """Session that reads from a replica when ``info['replica']`` is set.
+
+    Flushes and Core writes go to the session's own bind, the primary, and
+    keep the rest of the session there so it reads its own writes. Sessions
+    tagged with a user (``info['user_id']``) that wrote within
+    REPLICA_READ_YOUR_WRITES_SECONDS read from the primary as well.
+    """
+
+    replicas: ReplicaSet | None = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['replica'] = False
+            self.info['wrote'] = True
+        elif self.info.get('replica') and self.replicas and not recent_writes.get(self.info.get('user_id')):
+            replica = self.replicas.choose()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_writer(session: Session):
+    user_id = session.info.get('user_id')
+    if session.info.pop('wrote', False) and user_id is not None:
+        recent_writes.set(user_id, True)
+
+
+def read_as(db: Session | AsyncSession, user_id: int) -> None:
+    """Tag a request's session with its user, for read-your-writes routing."""
+    db.info['user_id'] = user_id
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+RoutingSession.replicas = ReplicaSet(
+    [create_engine(url, **engine_options(url)) for url in settings.DB_REPLICA_URLS],
+    eject_seconds=settings.REPLICA_EJECT_SECONDS,
+)
+sessionLocal= sessionmaker(autoflush=False, autocommit=False, bind=engine, class_=RoutingSession)
+
+# DB_ASYNC switches request handling to the async driver; the sync engine stays
+# available for startup tasks, CLIs and background jobs.
+async_engine = create_async_engine(
+    async_database_url(SQLALCHEMY_DATABASE_URL), **pool_options(SQLALCHEMY_DATABASE_URL, asynchronous=True)
+) if settings.DB_ASYNC else None
+
+
+class AsyncRoutingSession(RoutingSession):
+    replicas = ReplicaSet(
+        [
+            create_async_engine(async_database_url(url), **pool_options(url, asynchronous=True)).sync_engine
+            for url in settings.DB_REPLICA_URLS
+        ],
+        eject_seconds=settings.REPLICA_EJECT_SECONDS,
+    ) if settings.DB_ASYNC else None
+
+
+asyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession,
+    sync_session_class=AsyncRoutingSession,
+)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = sessionLocal()
+def get_db(connection: HTTPConnection):
+    # only reads may use a replica; websockets carry no method and stay on the primary
+    db = sessionLocal(info={'replica': connection.scope.get('method') in READ_METHODS})
     try:
         yield db
 
     finally:
         db.close()
 
+
+async def get_async_db(connection: HTTPConnection):
+    async with asyncSessionLocal(info={'replica': connection.scope.get('method') in READ_METHODS}) as db:
+        yield db
+
+
+get_session = get_async_db if settings.DB_ASYNC else get_db
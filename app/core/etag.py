@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable, Iterable
+
+from fastapi import HTTPException, Request, Response
+from pybreaker import CircuitBreakerError
+
+from app.config import settings
+from app.core.cache import TTLCache
+
+
+class VersionRegistry:
+    """Per-user data versions used to build ETags without touching the database.
+
+    Versions are bumped in-process after a write commits. Writes made by other
+    workers are not seen, so every version also rolls over each ``max_age``
+    seconds, which bounds how long a client can be told its copy is current.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._generation = uuid.uuid4().hex[:8]
+        self._versions: dict[tuple[int, str], int] = defaultdict(int)
+        self._global: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def bump(self, user_id: int, resource: str) -> None:
+        with self._lock:
+            self._versions[(user_id, resource)] += 1
+
+    def bump_all(self, resource: str) -> None:
+        with self._lock:
+            self._global[resource] += 1
+
+    def version(self, user_id: int, resources: Iterable[str]) -> str:
+        epoch = int(time.time() // self.max_age) if self.max_age > 0 else time.time_ns()
+        parts = [self._generation, str(epoch)]
+        for resource in resources:
+            parts.append(f"{self._global.get(resource, 0)}.{self._versions.get((user_id, resource), 0)}")
+        return ':'.join(parts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._versions.clear()
+            self._global.clear()
+
+
+version_registry = VersionRegistry(max_age=settings.ETAG_MAX_AGE_SECONDS)
+response_cache = TTLCache(maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL_SECONDS, name='response')
+# last good body per user and request, served while a breaker is open
+stale_cache = TTLCache(maxsize=settings.STALE_CACHE_SIZE, ttl=settings.STALE_CACHE_TTL_SECONDS, name='stale')
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in (candidate.strip() for candidate in if_none_match.split(','))
+
+
+async def conditional_response(
+        request: Request,
+        user_id: int,
+        resources: tuple[str, ...],
+        render: Callable[[], Awaitable[tuple[bytes, dict]]],
+) -> Response:
+    version = version_registry.version(user_id, resources)
+    variant = f"{'+'.join(resources)}?{request.url.query}"
+    etag = '"' + hashlib.sha1(f"{user_id}:{variant}:{version}".encode()).hexdigest() + '"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    if _etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (user_id, variant, version)
+    cached = response_cache.get(key)
+    if cached is None:
+        try:
+            cached = await render()
+        except CircuitBreakerError:
+            return _stale_response(user_id, variant)
+        response_cache.set(key, cached)
+        stale_cache.set((user_id, variant), (*cached, time.time()))
+
+    body, extra_headers = cached
+    return Response(content=body, media_type='application/json', headers={**headers, **extra_headers})
+
+
+def _stale_response(user_id: int, variant: str) -> Response:
+    stale = stale_cache.get((user_id, variant))
+    if stale is None:
+        raise HTTPException(status_code=503, detail="stock service temporarily unavailable")
+
+    body, extra_headers, stored_at = stale
+    # no ETag: a stale copy must not be revalidated as current later
+    return Response(content=body, media_type='application/json', headers={
+        **extra_headers,
+        'Cache-Control': 'private, no-store',
+        'Age': str(int(time.time() - stored_at)),
+        'Warning': '110 - "Response is Stale"',
+        'X-Stale': 'true',
+    })
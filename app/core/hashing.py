@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.core.stats import LatencyStats
+
+
+class HashingPool:
+    """Dedicated executor for bcrypt work with a hard cap on queued jobs.
+
+    bcrypt releases the GIL, so a separately sized thread pool gives real
+    parallelism without tying up Starlette's shared threadpool. Bulk work
+    from ``map`` waits for one of its own ``bulk_slots`` rather than taking
+    the slots interactive logins are admitted against.
+    """
+
+    def __init__(self, workers: int, queue_depth: int, retry_after: int, bulk_slots: int = 1):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+        self.bulk_slots = bulk_slots
+        self.rejected = 0
+        self.queue_wait = LatencyStats()
+        self.hash_time = LatencyStats()
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._bulk = threading.BoundedSemaphore(bulk_slots)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hashing')
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Authentication service busy, retry later',
+                headers={'Retry-After': str(self.retry_after)},
+            )
+        return self._enqueue(self._slots, fn, *args)
+
+    def _enqueue(self, slots: threading.BoundedSemaphore, fn: Callable, *args: Any) -> Future:
+        enqueued_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            self.queue_wait.observe(started_at - enqueued_at)
+            try:
+                return fn(*args)
+            finally:
+                self.hash_time.observe(time.perf_counter() - started_at)
+                slots.release()
+
+        try:
+            return self._executor.submit(job)
+        except BaseException:
+            slots.release()
+            raise
+
+    def run(self, fn: Callable, *args: Any) -> Any:
+        return self.submit(fn, *args).result()
+
+    def map(self, fn: Callable, iterable: Iterable) -> List[Any]:
+        # bulk callers wait for a bulk slot instead of being rejected
+        futures = []
+        for item in iterable:
+            self._bulk.acquire()
+            futures.append(self._enqueue(self._bulk, fn, item))
+        return [future.result() for future in futures]
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'bulk_slots': self.bulk_slots,
+            'rejected': self.rejected,
+            'queue_wait': self.queue_wait.snapshot(),
+            'hash_time': self.hash_time.snapshot(),
+        }
+
+
+hashing_pool = HashingPool(
+    workers=settings.HASH_POOL_WORKERS,
+    queue_depth=settings.HASH_POOL_QUEUE_DEPTH,
+    retry_after=settings.HASH_POOL_RETRY_AFTER_SECONDS,
+    bulk_slots=settings.HASH_POOL_BULK_SLOTS,
+)
@@ -0,0 +1,157 @@
+"""Prometheus metrics for requests, database queries, breakers and caches.
+
+With several uvicorn workers, point ``PROMETHEUS_MULTIPROC_DIR`` at an empty
+directory before starting them; every worker then writes its samples there
+and ``/metrics`` adds them up, whichever worker answers the scrape.
+"""
+import os
+import time
+from contextvars import ContextVar
+
+import pybreaker
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64)
+BREAKER_STATES = {pybreaker.STATE_CLOSED: 0, pybreaker.STATE_HALF_OPEN: 1, pybreaker.STATE_OPEN: 2}
+
+request_latency = Histogram(
+    'http_request_duration_seconds', 'Request latency by route', ['method', 'route'], buckets=LATENCY_BUCKETS,
+)
+responses = Counter('http_responses_total', 'Responses by route and status code', ['method', 'route', 'status'])
+request_queries = Histogram(
+    'http_request_db_queries', 'Database queries per request', ['method', 'route'], buckets=QUERY_COUNT_BUCKETS,
+)
+request_query_time = Histogram(
+    'http_request_db_seconds', 'Database time per request', ['method', 'route'], buckets=LATENCY_BUCKETS,
+)
+breaker_state = Gauge(
+    'circuit_breaker_state', 'Breaker state: 0 closed, 1 half-open, 2 open (worst worker)', ['breaker'],
+    multiprocess_mode='livemax',
+)
+breaker_opened = Counter('circuit_breaker_opened_total', 'Times a breaker opened', ['breaker'])
+cache_lookups = Counter('cache_lookups_total', 'Cache lookups by result', ['cache', 'result'])
+
+
+class QueryStats:
+    __slots__ = ('count', 'seconds', 'statements', 'scope')
+
+    def __init__(self, scope: dict | None = None):
+        self.count = 0
+        self.seconds = 0.0
+        # executions per statement template, filled in by the query log
+        self.statements: dict[str, int] = {}
+        self.scope = scope
+
+
+# the request's query totals; sync services see the same object because the
+# threadpool copies the context into the worker thread
+current_queries: ContextVar[QueryStats | None] = ContextVar('current_queries', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    stats = current_queries.get()
+    if stats is not None and context is not None:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - context._metrics_started
+
+
+class MetricsMiddleware:
+    """Records latency, status and database work for every HTTP request.
+
+    Requests are labelled with the matched route's path template, never the
+    raw path, so the number of series stays bounded. Label children are
+    looked up once per route and reused.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._series: dict[tuple, tuple] = {}
+        self._responses: dict[tuple, Counter] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        queries = QueryStats(scope)
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_queries.reset(token)
+            self._record(scope, status_code, elapsed, queries)
+
+    def _record(self, scope, status_code: int, elapsed: float, queries: QueryStats) -> None:
+        route = scope.get('route')
+        key = (scope['method'], route.path_format if route is not None else 'unmatched')
+
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = (
+                request_latency.labels(*key), request_queries.labels(*key), request_query_time.labels(*key),
+            )
+        latency, query_count, query_time = series
+        latency.observe(elapsed)
+        query_count.observe(queries.count)
+        query_time.observe(queries.seconds)
+
+        counter = self._responses.get((key, status_code))
+        if counter is None:
+            counter = self._responses[(key, status_code)] = responses.labels(*key, str(status_code))
+        counter.inc()
+
+
+class _BreakerListener(pybreaker.CircuitBreakerListener):
+    def __init__(self, name: str):
+        self.state = breaker_state.labels(name)
+        self.opened = breaker_opened.labels(name)
+
+    def state_change(self, cb, old_state, new_state) -> None:
+        self.state.set(BREAKER_STATES[new_state.name])
+        if new_state.name == pybreaker.STATE_OPEN:
+            self.opened.inc()
+
+
+def track_breakers(breakers: dict[str, pybreaker.CircuitBreaker]) -> None:
+    for name, breaker in breakers.items():
+        listener = _BreakerListener(name)
+        listener.state.set(BREAKER_STATES[breaker.current_state])
+        breaker.add_listener(listener)
+
+
+def render() -> tuple[bytes, str]:
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def worker_exited() -> None:
+    # drops this worker's samples from the live-only gauges
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,75 @@
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.stats import LatencyStats
+
+
+class _PoolInstrumentation:
+    """Checkout wait, peak usage and connection churn for a queue pool.
+
+    The wait covers everything ``connect`` does before handing a connection
+    over: queueing for a free slot, opening an overflow connection and the
+    pre-ping.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = LatencyStats()
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.connects = 0
+        self.invalidations = 0
+        event.listen(self, 'connect', self._on_connect)
+        event.listen(self, 'invalidate', self._on_invalidate)
+        event.listen(self, 'soft_invalidate', self._on_invalidate)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - started)
+
+        checked_out = self.checkedout()
+        if checked_out > self.peak_checked_out:
+            self.peak_checked_out = checked_out
+        return connection
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            'size': self.size(),
+            'max_overflow': self._max_overflow,
+            'checked_out': self.checkedout(),
+            'checked_in': self.checkedin(),
+            'overflow': max(self.overflow(), 0),
+            'peak_checked_out': self.peak_checked_out,
+            'checkout_wait': self.checkout_wait.snapshot(),
+            'timeouts': self.timeouts,
+            'connects': self.connects,
+            'invalidations': self.invalidations,
+        }
+
+
+class InstrumentedQueuePool(_PoolInstrumentation, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_PoolInstrumentation, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(pool) -> dict:
+    if isinstance(pool, _PoolInstrumentation):
+        return pool.stats()
+    return {'status': pool.status()}
@@ -0,0 +1,268 @@
+"""Opt-in profiling of a single request.
+
+A request sent with ``X-Profile: 1`` (or ``?profile=1``) and the diagnostics
+API key runs under cProfile while ``PROFILING_ENABLED`` is set. The summary
+(hot functions with their callees, plus every statement the request ran and
+its database time) is kept in memory and its id returned in ``X-Profile-Id``;
+fetch it from ``/diagnostics/profiles/{id}``.
+
+cProfile only sees the thread it is enabled on, so the request is profiled on
+the event loop and each service call it hands to a worker thread is profiled
+there and merged in. The event loop is shared, so work from other requests
+running at the same time can show up too. A thread has a single profiler
+hook, and enabling a second one silently replaces the first, so only one
+profiled request runs at a time per worker; the rest get a 409.
+"""
+import cProfile
+import hmac
+import itertools
+import os
+import pstats
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import JSONResponse
+
+from app.config import settings
+
+
+TOP_FUNCTIONS = 25
+TOP_CALLEES = 5
+TOP_STATEMENTS = 10
+
+
+class RequestProfile:
+    def __init__(self, profile_id: int, scope: dict):
+        self.id = profile_id
+        self.method = scope['method']
+        self.path = scope['path']
+        self.started_at = time.time()
+        self.profiles: list[cProfile.Profile] = []
+        self.statements: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profiling(self) -> Iterator[None]:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self.profiles.append(profile)
+
+    def run(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        with self.profiling():
+            return func(*args, **kwargs)
+
+    def query(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            totals = self.statements.setdefault(statement, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def summary(self, status_code: int, wall: float) -> dict:
+        stats = pstats.Stats(*self.profiles) if self.profiles else None
+        db_seconds = sum(seconds for _, seconds in self.statements.values())
+        statements = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': status_code,
+            'started_at': self.started_at,
+            'wall_ms': round(wall * 1000, 3),
+            'db': {
+                'queries': sum(calls for calls, _ in self.statements.values()),
+                'ms': round(db_seconds * 1000, 3),
+                'share': round(db_seconds / wall, 3) if wall else 0.0,
+                'statements': [
+                    {'statement': statement, 'calls': calls, 'ms': round(seconds * 1000, 3)}
+                    for statement, (calls, seconds) in statements[:TOP_STATEMENTS]
+                ],
+            },
+            'functions': _call_tree(stats) if stats is not None else [],
+        }
+
+
+def _label(function: tuple) -> str:
+    filename, line, name = function
+    if filename == '~':
+        return name
+    if 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    elif filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f'{filename}:{line}({name})'
+
+
+def _call_tree(stats: pstats.Stats) -> list[dict]:
+    callees: dict[tuple, list[tuple[float, tuple]]] = {}
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((cumulative, function))
+
+    hottest = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            'function': _label(function),
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+            'callees': [
+                {'function': _label(callee), 'cumulative_ms': round(seconds * 1000, 3)}
+                for seconds, callee in sorted(callees.get(function, ()), reverse=True)[:TOP_CALLEES]
+            ],
+        }
+        for function, (_, calls, own, cumulative, _) in hottest
+    ]
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar('current_profile', default=None)
+
+
+def profiled(func: Callable) -> Callable:
+    """Wraps ``func`` to be profiled in whichever thread runs it, if the current request is profiled."""
+    profile = current_profile.get()
+    if profile is None:
+        return func
+    return lambda *args, **kwargs: profile.run(func, *args, **kwargs)
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None and context is not None:
+        profile.query(statement, time.perf_counter() - context._metrics_started)
+
+
+class ProfilingUnavailable(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class RequestProfiler:
+    def __init__(self, enabled: bool, api_key: str | None, per_minute: int, history: int):
+        self.enabled = enabled
+        self.api_key = api_key
+        self.per_minute = per_minute
+        self.history = history
+        self._recent: deque[float] = deque()
+        self._profiles: OrderedDict[int, dict] = OrderedDict()
+        self._ids = itertools.count(1)
+        self._active: RequestProfile | None = None
+        self._lock = threading.Lock()
+
+    def requested(self, scope: dict) -> bool:
+        for name, value in scope['headers']:
+            if name == b'x-profile':
+                return value in (b'1', b'true')
+        if b'profile' in scope['query_string']:
+            return parse_qs(scope['query_string'].decode()).get('profile', [''])[-1] in ('1', 'true')
+        return False
+
+    def authorized(self, scope: dict) -> bool:
+        api_key = next((value.decode() for name, value in scope['headers'] if name == b'x-api-key'), None)
+        return bool(self.api_key and api_key and hmac.compare_digest(api_key, self.api_key))
+
+    def start(self, scope: dict) -> RequestProfile:
+        now = time.monotonic()
+        with self._lock:
+            if self._active is not None:
+                raise ProfilingUnavailable(409, 'Another profiled request is running', 1)
+            while self._recent and self._recent[0] <= now - 60:
+                self._recent.popleft()
+            if len(self._recent) >= self.per_minute:
+                raise ProfilingUnavailable(429, 'Profiling rate limit reached', int(self._recent[0] + 60 - now) + 1)
+            self._recent.append(now)
+            self._active = RequestProfile(next(self._ids), scope)
+            return self._active
+
+    def finish(self, profile: RequestProfile, status_code: int, wall: float) -> None:
+        summary = profile.summary(status_code, wall)
+        with self._lock:
+            self._active = None
+            self._profiles[summary['id']] = summary
+            while len(self._profiles) > self.history:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: int) -> dict | None:
+        return self._profiles.get(profile_id)
+
+    def recent(self) -> list[dict]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [
+            {key: profile[key] for key in ('id', 'method', 'path', 'status', 'started_at', 'wall_ms')}
+            | {'db_ms': profile['db']['ms']}
+            for profile in reversed(profiles)
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._profiles.clear()
+            self._active = None
+
+
+profiler = RequestProfiler(
+    enabled=settings.PROFILING_ENABLED,
+    api_key=settings.DIAGNOSTICS_API_KEY,
+    per_minute=settings.PROFILING_RATE_LIMIT_PER_MINUTE,
+    history=settings.PROFILING_HISTORY,
+)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not profiler.enabled or not profiler.requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not profiler.authorized(scope):
+            await JSONResponse({'detail': 'Invalid API key'}, status_code=403)(scope, receive, send)
+            return
+
+        try:
+            profile = profiler.start(scope)
+        except ProfilingUnavailable as error:
+            response = JSONResponse(
+                {'detail': error.detail}, status_code=error.status_code,
+                headers={'Retry-After': str(error.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                message['headers'] = [*message.get('headers', ()), (b'x-profile-id', str(profile.id).encode())]
+            await send(message)
+
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with profile.profiling():
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            wall = time.perf_counter() - started
+            current_profile.reset(token)
+            profiler.finish(profile, status_code, wall)
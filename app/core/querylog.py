@@ -0,0 +1,146 @@
+"""Slow-query log and repeated-statement (N+1) detector.
+
+Both hang off the per-request query totals kept by ``app.core.metrics``. A
+statement slower than ``SLOW_QUERY_THRESHOLD_MS`` is logged with the shape of
+its parameters (never their values) and the service method that ran it. A
+request that runs one statement template more than ``QUERY_REPEAT_THRESHOLD``
+times is logged once per template, which is what a lazy load inside a loop
+looks like. Either check is off while its setting is unset.
+"""
+import logging
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.core.metrics import QueryStats, current_queries
+
+
+logger = logging.getLogger(__name__)
+
+
+def parameters_shape(parameters, executemany: bool = False) -> str:
+    if executemany:
+        rows = len(parameters)
+        return f"{rows} x {parameters_shape(parameters[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+    return type(parameters).__name__
+
+
+def calling_method() -> str:
+    # the nearest frame outside SQLAlchemy and app.core is the code that asked for the query
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith('app.') and not module.startswith('app.core.'):
+            owner = frame.f_locals.get('self')
+            name = frame.f_code.co_name
+            return f'{module}.{type(owner).__name__}.{name}' if owner is not None else f'{module}.{name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def _request_name(stats: QueryStats) -> str:
+    scope = stats.scope
+    if scope is None:
+        return 'query scope'
+    route = scope.get('route')
+    return f"{scope['method']} {route.path_format if route is not None else scope['path']}"
+
+
+class QueryMonitor:
+    def __init__(self, slow_threshold: float | None, repeat_threshold: int | None, history: int = 100):
+        self.slow_threshold = slow_threshold
+        self.repeat_threshold = repeat_threshold
+        self.slow_queries = 0
+        self.repeated_statements = 0
+        self.recent_slow: deque[dict] = deque(maxlen=history)
+        self.recent_repeats: deque[dict] = deque(maxlen=history)
+
+    def observe(self, statement: str, parameters, executemany: bool, seconds: float) -> None:
+        if self.slow_threshold is not None and seconds > self.slow_threshold:
+            self._slow(statement, parameters, executemany, seconds)
+
+        if self.repeat_threshold is None:
+            return
+        stats = current_queries.get()
+        if stats is None:
+            return
+
+        count = stats.statements.get(statement, 0) + 1
+        stats.statements[statement] = count
+        if count == self.repeat_threshold + 1:
+            self._repeated(stats, statement)
+
+    def _slow(self, statement: str, parameters, executemany: bool, seconds: float) -> None:
+        entry = {
+            'ms': round(seconds * 1000, 1),
+            'statement': statement,
+            'parameters': parameters_shape(parameters, executemany),
+            'caller': calling_method(),
+        }
+        self.slow_queries += 1
+        self.recent_slow.append(entry)
+        logger.warning(
+            "slow query (%.1f ms) from %s with parameters %s: %s",
+            entry['ms'], entry['caller'], entry['parameters'], statement,
+        )
+
+    def _repeated(self, stats: QueryStats, statement: str) -> None:
+        entry = {
+            'request': _request_name(stats),
+            'statement': statement,
+            'caller': calling_method(),
+        }
+        self.repeated_statements += 1
+        self.recent_repeats.append(entry)
+        logger.warning(
+            "%s ran the same statement more than %s times (N+1?) from %s: %s",
+            entry['request'], self.repeat_threshold, entry['caller'], statement,
+        )
+
+    def reset(self) -> None:
+        self.slow_queries = self.repeated_statements = 0
+        self.recent_slow.clear()
+        self.recent_repeats.clear()
+
+    def stats(self) -> dict:
+        return {
+            'slow_threshold_ms': self.slow_threshold * 1000 if self.slow_threshold is not None else None,
+            'repeat_threshold': self.repeat_threshold,
+            'slow_queries': self.slow_queries,
+            'repeated_statements': self.repeated_statements,
+            'recent_slow': list(self.recent_slow),
+            'recent_repeats': list(self.recent_repeats),
+        }
+
+
+query_monitor = QueryMonitor(
+    slow_threshold=settings.SLOW_QUERY_THRESHOLD_MS / 1000 if settings.SLOW_QUERY_THRESHOLD_MS is not None else None,
+    repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
+)
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        query_monitor.observe(statement, parameters, executemany, time.perf_counter() - context._metrics_started)
+
+
+@contextmanager
+def query_scope() -> Iterator[QueryStats]:
+    """Counts queries outside a request, e.g. in a job or a test."""
+    stats = QueryStats()
+    token = current_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        current_queries.reset(token)
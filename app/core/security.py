@@ -1,12 +1,23 @@
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta, timezone
+from typing import List
+import asyncio
+import hashlib
+import uuid
 import jwt
 
 from app.config import settings
+from app.core.cache import TTLCache
+from app.core.hashing import hashing_pool
 from app.schemas.token import TokenData
 
 
+# Verified access-token claims keyed by token digest; entries expire at the token's exp.
+# Set JWT_CLAIMS_CACHE_SIZE=0 to disable.
+claims_cache = TTLCache(maxsize=settings.JWT_CLAIMS_CACHE_SIZE, name='jwt_claims')
+
+
 class AuthHelper:
     hasher = CryptContext(schemes=['bcrypt'], deprecated='auto')
     secret_key = settings.JWT_SECRET_KEY
@@ -15,10 +26,19 @@ class AuthHelper:
     refresh_token_expires_days = settings.JWT_REFRESH_TOKEN_EXPIRES_DAYS
 
     def get_password_hash(self, password: str) -> str:
-        return self.hasher.hash(password)
+        return hashing_pool.run(self.hasher.hash, password)
+
+    def get_password_hashes(self, passwords: List[str]) -> List[str]:
+        return hashing_pool.map(self.hasher.hash, passwords)
 
     def verify_password(self, password: str, hashed_password: str) -> bool:
-        return self.hasher.verify(password, hashed_password)
+        return hashing_pool.run(self.hasher.verify, password, hashed_password)
+
+    async def get_password_hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(hashing_pool.submit(self.hasher.hash, password))
+
+    async def verify_password_async(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(hashing_pool.submit(self.hasher.verify, password, hashed_password))
 
     def encode_token(self, userData: dict) -> str:
         payload = userData.copy()
@@ -31,16 +51,27 @@ class AuthHelper:
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
 
     def decode_token(self, token: str) -> TokenData:
+        token_hash = self.token_digest(token)
+        token_data = claims_cache.get(token_hash)
+        if token_data is not None:
+            return token_data
+
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
 
             if payload:
-                return TokenData(
+                token_data = TokenData(
                     id=payload.get('sub'),
                     email=payload.get('email'),
                     username=payload.get('username'),
+                    exp=payload.get('exp'),
                 )
 
+                if token_data.exp is not None:
+                    claims_cache.set(token_hash, token_data, expires_at=token_data.exp)
+
+                return token_data
+
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid Token')
 
         except jwt.ExpiredSignatureError:
@@ -54,9 +85,23 @@ class AuthHelper:
         expires = datetime.now(timezone.utc) + timedelta(days=self.refresh_token_expires_days)
         iat = datetime.now(timezone.utc)
 
-        payload.update({'iat': iat, 'exp': expires})
+        payload.update({'iat': iat, 'exp': expires, 'typ': 'refresh', 'jti': uuid.uuid4().hex})
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
 
+    @staticmethod
+    def token_digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def is_refresh_token(token: str) -> bool:
+        # signature is checked later by refresh_token(); this only routes the revocation lookup
+        try:
+            payload = jwt.decode(token, options={'verify_signature': False})
+        except jwt.InvalidTokenError:
+            return False
+
+        return payload.get('typ') == 'refresh'
+
     def refresh_token(self, refresh_token: str) -> str:
         try:
             payload = jwt.decode(refresh_token, self.secret_key, algorithms=[self.algorithm])
@@ -0,0 +1,57 @@
+import threading
+import time
+from collections import deque
+
+
+class LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self) -> dict:
+        return {
+            'count': self.count,
+            'avg_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'max_ms': self.max * 1000,
+        }
+
+
+class RateWindow:
+    """Events per second over the last ``window`` seconds of wall-clock time.
+
+    Counts are kept in one-second buckets, so memory stays bounded however
+    often ``add`` is called.
+    """
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._started = time.monotonic()
+        self._buckets: deque[list] = deque()
+        self._lock = threading.Lock()
+
+    def add(self, count: int) -> None:
+        second = int(time.monotonic())
+        with self._lock:
+            if self._buckets and self._buckets[-1][0] == second:
+                self._buckets[-1][1] += count
+            else:
+                self._buckets.append([second, count])
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            while self._buckets and self._buckets[0][0] < now - self.window:
+                self._buckets.popleft()
+            total = sum(count for _, count in self._buckets)
+        # a fresh counter divides by its own age, not the full window
+        span = min(self.window, now - self._started)
+        return total / span if span > 0 else 0.0
@@ -1,31 +1,50 @@
+import hmac
+
 import jwt
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import Depends, HTTPException, Query, WebSocketException, status
+from fastapi.security import APIKeyHeader, HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.services.stock import StockService
-from app.services.user import UserService
+from app.config import settings
+from app.core.concurrency import run_service
+from app.core.database import get_session, read_as
+from app.services.stock import StockService, AsyncStockService
+from app.services.user import UserService, AsyncUserService
 from app.core.security import AuthHelper
 
 
 security = HTTPBearer()
+api_key_header = APIKeyHeader(name='X-API-Key', auto_error=False)
 auth_helper = AuthHelper()
 
 
-def get_user_service(db: Session = Depends(get_db)) -> UserService:
-    return UserService(db)
+def get_user_service(db: Session | AsyncSession = Depends(get_session)) -> UserService | AsyncUserService:
+    return AsyncUserService(db) if settings.DB_ASYNC else UserService(db)
 
 
-def get_stock_service(db: Session = Depends(get_db)) -> StockService:
-    return StockService(db)
+def get_stock_service(db: Session | AsyncSession = Depends(get_session)) -> StockService | AsyncStockService:
+    return AsyncStockService(db) if settings.DB_ASYNC else StockService(db)
 
 
 def get_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
     return credentials.credentials
 
 
-def get_current_user(
+def _check_api_key(api_key: str | None, expected: str | None) -> None:
+    if not expected or not api_key or not hmac.compare_digest(api_key, expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API key")
+
+
+def require_ingest_key(api_key: str | None = Depends(api_key_header)) -> None:
+    _check_api_key(api_key, settings.PRICE_INGEST_API_KEY)
+
+
+def require_diagnostics_key(api_key: str | None = Depends(api_key_header)) -> None:
+    _check_api_key(api_key, settings.DIAGNOSTICS_API_KEY)
+
+
+async def get_current_user(
         token: str = Depends(get_token),
         user_service: UserService = Depends(get_user_service)
 ):
@@ -40,7 +59,8 @@ def get_current_user(
                 detail="Invalid token payload"
             )
 
-        user = user_service.get_user_by_id(userId)
+        read_as(user_service.db, userId)
+        user = await run_service(user_service.get_authenticated_user, userId, tokenData.exp)
 
         if not user:
             raise HTTPException(
@@ -56,4 +76,17 @@ def get_current_user(
     except jwt.InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
-        )
\ No newline at end of file
+        )
+
+
+async def get_websocket_user(
+        token: str = Query(...),
+        user_service: UserService = Depends(get_user_service)
+):
+    # browsers cannot set headers on a WebSocket handshake, so the access
+    # token is passed as a query parameter instead
+    try:
+        return await get_current_user(token, user_service)
+
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
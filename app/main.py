@@ -1,24 +1,92 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+
+from fastapi import FastAPI, Response
 from app.routers.auth import authRouter
+from app.routers.diagnostics import diagnosticsRouter
+from app.routers.prices import pricesRouter
 from app.routers.stock import stockRouter
-from contextlib import asynccontextmanager
-from app.core.database import Base, engine
+from contextlib import asynccontextmanager, suppress
+from app.config import settings
+from app.core import metrics
+from app.core.profiling import ProfilingMiddleware
+from app.core.database import Base, engine, sessionLocal
 from app.seeds import seed_db
+from app.services.maintenance import refresh_token_sweeper
+from app.services.matching import matching_engine
+from app.services.persistence import write_behind
+from app.services.pricing import price_ingestor
+from app.services.revocation import revocation_filter
+from app.services.stock import breakers
+
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 
     Base.metadata.create_all(bind=engine)
-    seed_db()
+    if settings.SEED_ON_STARTUP:
+        seed_db()
+
+    # books, accounts and order ids live in process memory, so only the
+    # worker holding the journal matches orders; the others serve reads
+    matching = write_behind.journal.claim()
+    matching_engine.enabled = matching
+    if matching:
+        # acknowledged orders from before a crash reach the database before
+        # the books are rebuilt from it
+        write_behind.recover()
+    else:
+        logger.error("%s is held by another process; order placement is disabled in this worker",
+                     settings.ORDER_JOURNAL_PATH)
+
+    with sessionLocal() as db:
+        revocation_filter.load(db)
+        if matching:
+            matching_engine.load(db)
+
+    sweeper = asyncio.create_task(refresh_token_sweeper.run()) if settings.TOKEN_SWEEP_ENABLED else None
+    price_flusher = asyncio.create_task(price_ingestor.run())
+    order_writer = asyncio.create_task(write_behind.run()) if matching else None
+
     yield
 
+    if order_writer:
+        order_writer.cancel()
+        with suppress(asyncio.CancelledError):
+            await order_writer
+
+    price_flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await price_flusher
+
+    if sweeper:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
+
+    metrics.worker_exited()
+
 app = FastAPI(lifespan=lifespan)
+# the last middleware added runs first, so profiled requests are still measured
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.track_breakers(breakers)
 
 app.include_router(authRouter)
 app.include_router(stockRouter)
+app.include_router(pricesRouter)
+app.include_router(diagnosticsRouter)
 
 @app.get('/health')
 def health():
     return {'status': 'ok'}
 
+
+@app.get('/metrics', include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
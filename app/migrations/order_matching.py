@@ -0,0 +1,79 @@
+"""Prepare holdings and orders for order matching.
+
+Adds orders.filled_quantity (backfilled for executed orders) and replaces the
+global unique index on holdings.symbol with one on (user_id, symbol), so more
+than one user can hold a symbol, plus a plain symbol index for bulk price
+updates. Safe to re-run.
+
+    python -m app.migrations.order_matching
+"""
+from sqlalchemy import Engine, inspect, text
+
+from app.core.database import engine as default_engine
+from app.models.stock import Holding
+
+
+def upgrade(engine: Engine = default_engine) -> None:
+    inspector = inspect(engine)
+
+    if inspector.has_table('orders'):
+        columns = {column['name'] for column in inspector.get_columns('orders')}
+        if 'filled_quantity' not in columns:
+            with engine.begin() as conn:
+                conn.execute(text('ALTER TABLE orders ADD COLUMN filled_quantity INTEGER NOT NULL DEFAULT 0'))
+                conn.execute(text("UPDATE orders SET filled_quantity = quantity WHERE status = 'EXECUTING'"))
+
+    if inspector.has_table('holdings'):
+        _replace_symbol_unique(engine)
+        _create_missing_indexes(engine)
+
+
+def _symbol_only_uniques(engine: Engine) -> list[str]:
+    inspector = inspect(engine)
+    names = [
+        constraint['name'] for constraint in inspector.get_unique_constraints('holdings')
+        if constraint['column_names'] == ['symbol']
+    ]
+    # SQLite only reports inline UNIQUE columns through their automatic index
+    options = {'include_auto_indexes': True} if engine.dialect.name == 'sqlite' else {}
+    names += [
+        index['name'] for index in inspector.get_indexes('holdings', **options)
+        if index['unique'] and index['column_names'] == ['symbol']
+    ]
+    return names
+
+
+def _replace_symbol_unique(engine: Engine) -> None:
+    legacy = _symbol_only_uniques(engine)
+
+    if legacy and engine.dialect.name == 'sqlite':
+        # SQLite cannot drop a constraint declared with the table, so the table is rebuilt
+        with engine.begin() as conn:
+            for index in inspect(conn).get_indexes('holdings'):
+                conn.execute(text(f'DROP INDEX {index["name"]}'))
+            conn.execute(text('ALTER TABLE holdings RENAME TO holdings_legacy'))
+            Holding.__table__.create(bind=conn)
+            columns = ', '.join(column.name for column in Holding.__table__.columns)
+            conn.execute(text(f'INSERT INTO holdings ({columns}) SELECT {columns} FROM holdings_legacy'))
+            conn.execute(text('DROP TABLE holdings_legacy'))
+        return
+
+    with engine.begin() as conn:
+        indexes = {index['name'] for index in inspect(conn).get_indexes('holdings')}
+        uniques = {constraint['name'] for constraint in inspect(conn).get_unique_constraints('holdings')}
+        if 'uq_holdings_user_symbol' not in indexes | uniques:
+            conn.execute(text('CREATE UNIQUE INDEX uq_holdings_user_symbol ON holdings (user_id, symbol)'))
+        for name in dict.fromkeys(legacy):
+            conn.execute(text(f'ALTER TABLE holdings DROP INDEX `{name}`'))
+
+
+def _create_missing_indexes(engine: Engine) -> None:
+    indexes = {index['name'] for index in inspect(engine).get_indexes('holdings')}
+    for index in Holding.__table__.indexes:
+        if index.name not in indexes:
+            index.create(bind=engine)
+
+
+if __name__ == '__main__':
+    upgrade()
+    print("holdings and orders are ready for order matching.")
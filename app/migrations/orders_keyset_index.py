@@ -0,0 +1,26 @@
+"""Add the (user_id, timestamp, id) index used by /stock/orders pagination.
+
+Safe to re-run.
+
+    python -m app.migrations.orders_keyset_index
+"""
+from sqlalchemy import Engine, inspect
+
+from app.core.database import engine as default_engine
+from app.models.stock import Order
+
+
+def upgrade(engine: Engine = default_engine) -> None:
+    inspector = inspect(engine)
+    if not inspector.has_table('orders'):
+        return
+
+    indexes = {index['name'] for index in inspector.get_indexes('orders')}
+    for index in Order.__table__.indexes:
+        if index.name not in indexes:
+            index.create(bind=engine)
+
+
+if __name__ == '__main__':
+    upgrade()
+    print("orders indexes are up to date.")
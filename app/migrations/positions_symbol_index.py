@@ -0,0 +1,26 @@
+"""Add the positions.symbol index used by bulk price updates.
+
+Safe to re-run.
+
+    python -m app.migrations.positions_symbol_index
+"""
+from sqlalchemy import Engine, inspect
+
+from app.core.database import engine as default_engine
+from app.models.stock import Position
+
+
+def upgrade(engine: Engine = default_engine) -> None:
+    inspector = inspect(engine)
+    if not inspector.has_table('positions'):
+        return
+
+    indexes = {index['name'] for index in inspector.get_indexes('positions')}
+    for index in Position.__table__.indexes:
+        if index.name not in indexes:
+            index.create(bind=engine)
+
+
+if __name__ == '__main__':
+    upgrade()
+    print("positions indexes are up to date.")
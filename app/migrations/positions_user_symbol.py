@@ -0,0 +1,36 @@
+"""Add the unique (user_id, symbol) key on positions that write-behind upserts
+resolve conflicts on.
+
+Refuses to run while a user has more than one position row for a symbol,
+since those have to be merged by hand. Safe to re-run.
+
+    python -m app.migrations.positions_user_symbol
+"""
+from sqlalchemy import Engine, inspect, text
+
+from app.core.database import engine as default_engine
+
+
+def upgrade(engine: Engine = default_engine) -> None:
+    inspector = inspect(engine)
+    if not inspector.has_table('positions'):
+        return
+
+    names = {index['name'] for index in inspector.get_indexes('positions')}
+    names |= {constraint['name'] for constraint in inspector.get_unique_constraints('positions')}
+    if 'uq_positions_user_symbol' in names:
+        return
+
+    with engine.begin() as conn:
+        duplicates = conn.execute(text(
+            'SELECT user_id, symbol FROM positions GROUP BY user_id, symbol HAVING COUNT(*) > 1'
+        )).all()
+        if duplicates:
+            listed = ', '.join(f"{user_id}/{symbol}" for user_id, symbol in duplicates)
+            raise RuntimeError(f"positions has duplicate (user_id, symbol) rows: {listed}")
+        conn.execute(text('CREATE UNIQUE INDEX uq_positions_user_symbol ON positions (user_id, symbol)'))
+
+
+if __name__ == '__main__':
+    upgrade()
+    print("positions are keyed by user and symbol.")
@@ -0,0 +1,77 @@
+"""Move refresh_tokens from the raw JWT column to a SHA-256 digest.
+
+Safe to re-run: every step checks the current schema first.
+
+    python -m app.migrations.refresh_token_digest
+"""
+from sqlalchemy import Engine, inspect, text
+
+from app.core.database import engine as default_engine
+from app.core.security import AuthHelper
+
+
+BATCH_SIZE = 1000
+
+
+def upgrade(engine: Engine = default_engine) -> None:
+    inspector = inspect(engine)
+    if not inspector.has_table('refresh_tokens'):
+        return
+
+    columns = {column['name'] for column in inspector.get_columns('refresh_tokens')}
+    indexes = {index['name'] for index in inspector.get_indexes('refresh_tokens')}
+
+    with engine.begin() as conn:
+        if 'token_hash' not in columns:
+            conn.execute(text('ALTER TABLE refresh_tokens ADD COLUMN token_hash VARCHAR(64)'))
+        if 'revoked_at' not in columns:
+            conn.execute(text('ALTER TABLE refresh_tokens ADD COLUMN revoked_at DATETIME'))
+
+    if 'token' in columns:
+        _backfill_digests(engine)
+
+    with engine.begin() as conn:
+        if 'ix_refresh_tokens_token_hash' not in indexes:
+            conn.execute(text(
+                'CREATE UNIQUE INDEX ix_refresh_tokens_token_hash ON refresh_tokens (token_hash)'
+            ))
+        if 'ix_refresh_tokens_revoked_at' not in indexes:
+            conn.execute(text('CREATE INDEX ix_refresh_tokens_revoked_at ON refresh_tokens (revoked_at)'))
+
+        if 'token' in columns:
+            if 'ix_refresh_tokens_token' in indexes:
+                if engine.dialect.name == 'mysql':
+                    conn.execute(text('ALTER TABLE refresh_tokens DROP INDEX ix_refresh_tokens_token'))
+                else:
+                    conn.execute(text('DROP INDEX ix_refresh_tokens_token'))
+            conn.execute(text('ALTER TABLE refresh_tokens DROP COLUMN token'))
+
+        if engine.dialect.name == 'mysql':
+            conn.execute(text('ALTER TABLE refresh_tokens MODIFY token_hash VARCHAR(64) NOT NULL'))
+
+
+def _backfill_digests(engine: Engine) -> None:
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    'SELECT id, token FROM refresh_tokens '
+                    'WHERE id > :last_id AND token_hash IS NULL ORDER BY id LIMIT :limit'
+                ),
+                {'last_id': last_id, 'limit': BATCH_SIZE},
+            ).all()
+
+            if not rows:
+                return
+
+            conn.execute(
+                text('UPDATE refresh_tokens SET token_hash = :token_hash WHERE id = :id'),
+                [{'id': row.id, 'token_hash': AuthHelper.token_digest(row.token)} for row in rows],
+            )
+            last_id = rows[-1].id
+
+
+if __name__ == '__main__':
+    upgrade()
+    print("refresh_tokens migrated to token digests.")
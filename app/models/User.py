@@ -17,8 +17,9 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id = Column(Integer, primary_key=True)
-    token = Column(String(300), unique=True, nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), default=func.now())
     expired_at = Column(DateTime(timezone=True))
     revoked = Column(Boolean, default=False)
+    revoked_at = Column(DateTime(timezone=True), index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Index, UniqueConstraint
 from sqlalchemy.sql import func
 import enum
 
@@ -21,11 +21,17 @@ class Holding(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
-    symbol = Column(String(20), unique=True, nullable=False)
+    symbol = Column(String(20), nullable=False)
     quantity = Column(Integer, nullable=False)
     avg_price = Column(Float, nullable=False)
     current_price = Column(Float, nullable=False)
 
+    __table_args__ = (
+        UniqueConstraint('user_id', 'symbol', name='uq_holdings_user_symbol'),
+        # bulk price updates mark every holding of a symbol
+        Index('ix_holdings_symbol', 'symbol'),
+    )
+
 
 class Order(Base):
     __tablename__ = "orders"
@@ -39,6 +45,12 @@ class Order(Base):
     status = Column(Enum(OrderStatus), nullable=False, default=OrderStatus.PENDING)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     realized_pnl = Column(Float, default=0.0)
+    filled_quantity = Column(Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # keyset pagination of a user's order history, newest first
+        Index('ix_orders_user_timestamp_id', 'user_id', 'timestamp', 'id'),
+    )
 
 
 class Position(Base):
@@ -46,9 +58,13 @@ class Position(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
-    symbol = Column(String(20), nullable=False)
+    symbol = Column(String(20), nullable=False, index=True)
     quantity = Column(Integer, nullable=False)
     entry_price = Column(Float, nullable=False)
     current_price = Column(Float, nullable=False)
     unrealized_pnl = Column(Float, default=0.0)
 
+    __table_args__ = (
+        UniqueConstraint('user_id', 'symbol', name='uq_positions_user_symbol'),
+    )
+
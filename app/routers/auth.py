@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime, timedelta, timezone
 
+from app.core.concurrency import run_service
 from app.dependencies import get_user_service, get_token
 from app.core.security import AuthHelper
 from app.schemas.user import UserRegister, UserDto, UserLogin
@@ -11,15 +12,12 @@ authRouter = APIRouter(prefix='/auth', tags=['auth'])
 auth_helper = AuthHelper()
 
 @authRouter.post('/register')
-def register(userData: UserRegister, user_service: UserService = Depends(get_user_service)):
-    existing_user = user_service.get_user_by_email(email=str(userData.email))
-    if existing_user:
-        raise HTTPException(status_code=400, detail='Email already registered')
-
-    if user_service.get_user_by_username(username=userData.username):
-        raise HTTPException(status_code=400, detail='Username already registered')
-
-    user = user_service.create_user(userData)
+async def register(userData: UserRegister, user_service: UserService = Depends(get_user_service)):
+    # hashed on the event loop, so a threadpool thread is not held while the
+    # request queues for the hashing pool; duplicate email/username surface
+    # from the unique indexes as a 400
+    hashed_password = await auth_helper.get_password_hash_async(userData.password)
+    user = await run_service(user_service.insert_user, userData, hashed_password)
     user_response = UserDto(
         email=user.email,
         username=user.username,
@@ -31,13 +29,13 @@ def register(userData: UserRegister, user_service: UserService = Depends(get_use
 
 
 @authRouter.post('/login', response_model= Token)
-def login(userData:UserLogin, user_service: UserService = Depends(get_user_service)):
-    user = user_service.get_user_by_email(userData.email)
+async def login(userData:UserLogin, user_service: UserService = Depends(get_user_service)):
+    user = await run_service(user_service.get_user_by_email, userData.email)
 
     if not user:
         raise HTTPException(status_code=404, detail='User not found')
 
-    if not auth_helper.verify_password(userData.password, user.hashed_password):
+    if not await auth_helper.verify_password_async(userData.password, user.hashed_password):
         raise HTTPException(status_code=400, detail='Incorrect password')
 
     payload = TokenData(
@@ -49,7 +47,7 @@ def login(userData:UserLogin, user_service: UserService = Depends(get_user_servi
     refresh_token = auth_helper.encode_refresh_token(payload.model_dump(by_alias=True))
 
     expired_at = datetime.now(timezone.utc) + timedelta(days=auth_helper.refresh_token_expires_days)
-    user_service.store_refresh_token(refresh_token, user.id, expired_at)
+    await run_service(user_service.store_refresh_token, refresh_token, user.id, expired_at)
 
     return {
         'access_token': access_token,
@@ -59,25 +57,25 @@ def login(userData:UserLogin, user_service: UserService = Depends(get_user_servi
 
 
 @authRouter.get('/refresh')
-def token_refresh(
+async def token_refresh(
        token: str = Depends(get_token),
         user_service: UserService = Depends(get_user_service),
 ):
-    if user_service.is_token_revoked(token):
+    if await run_service(user_service.is_token_revoked, token):
         raise HTTPException(status_code=401, detail='Refresh token revoked')
     access_token = auth_helper.refresh_token(token)
     return {'access_token': access_token, 'token_type': 'bearer'}
 
 
 @authRouter.post('/logout')
-def logout(
+async def logout(
         token: str = Depends(get_token),
         user_service: UserService = Depends(get_user_service),
 ):
 
-    if user_service.is_token_revoked(token):
+    if await run_service(user_service.is_token_revoked, token):
         raise HTTPException(status_code=401, detail='Refresh token revoked')
 
-    if user_service.revoke_refresh_token(token):
+    if await run_service(user_service.revoke_refresh_token, token):
         return {"message": "logged out successfully"}
 
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+
+from app.config import settings
+from app.core.database import AsyncRoutingSession, RoutingSession, async_engine, engine
+from app.core.etag import stale_cache
+from app.core.pool import pool_stats
+from app.core.profiling import profiler
+from app.core.querylog import query_monitor
+from app.dependencies import require_diagnostics_key
+from app.services.stock import breakers
+
+
+diagnosticsRouter = APIRouter(prefix="/diagnostics", tags=["diagnostics"], dependencies=[Depends(require_diagnostics_key)])
+
+
+@diagnosticsRouter.get('/breakers', status_code=status.HTTP_200_OK)
+async def breaker_stats():
+    return {
+        'breakers': {name: breaker.stats() for name, breaker in breakers.items()},
+        'stale_cache': stale_cache.stats(),
+    }
+
+
+@diagnosticsRouter.get('/replicas', status_code=status.HTTP_200_OK)
+async def replica_stats():
+    replicas = AsyncRoutingSession.replicas if settings.DB_ASYNC else RoutingSession.replicas
+    return {'replicas': replicas.stats()}
+
+
+@diagnosticsRouter.get('/pool', status_code=status.HTTP_200_OK)
+async def connection_pool_stats():
+    pools = {'primary': engine.pool}
+    pools.update((f'replica-{index}', replica.pool) for index, replica in enumerate(RoutingSession.replicas.engines))
+    if async_engine is not None:
+        pools['async-primary'] = async_engine.sync_engine.pool
+        pools.update(
+            (f'async-replica-{index}', replica.pool) for index, replica in enumerate(AsyncRoutingSession.replicas.engines)
+        )
+    return {name: pool_stats(pool) for name, pool in pools.items()}
+
+
+@diagnosticsRouter.get('/queries', status_code=status.HTTP_200_OK)
+async def query_log_stats():
+    return query_monitor.stats()
+
+
+@diagnosticsRouter.get('/profiles', status_code=status.HTTP_200_OK)
+async def list_profiles():
+    return {'profiles': profiler.recent()}
+
+
+@diagnosticsRouter.get('/profiles/{profile_id}', status_code=status.HTTP_200_OK)
+async def get_profile(profile_id: int):
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile
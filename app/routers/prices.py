@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from starlette import status
+
+from app.dependencies import require_ingest_key
+from app.schemas.price import PriceBatchDTO, PriceBatchAcceptedDTO
+from app.services.pricing import price_ingestor
+from app.services.quotes import price_store, quote_hub
+
+
+pricesRouter = APIRouter(prefix="/stock/prices", tags=["prices"], dependencies=[Depends(require_ingest_key)])
+
+
+@pricesRouter.post('', status_code=status.HTTP_202_ACCEPTED, response_model=PriceBatchAcceptedDTO)
+async def ingest_prices(batch: PriceBatchDTO):
+    ticks = [(tick.symbol, tick.price) for tick in batch.ticks]
+    accepted = price_ingestor.submit(ticks)
+    quote_hub.publish(price_store.update(ticks))
+    return {'accepted': accepted, 'pending_symbols': price_ingestor.pending()}
+
+
+@pricesRouter.get('/stats', status_code=status.HTTP_200_OK)
+async def ingest_stats():
+    return {**price_ingestor.stats(), 'stream': quote_hub.stats()}
@@ -1,54 +1,222 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pybreaker import CircuitBreaker, CircuitBreakerError
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, WebSocket, WebSocketException
+from fastapi.responses import StreamingResponse
+from pybreaker import CircuitBreakerError
 from starlette import status
-from typing import List, Type
+from typing import List, Literal
+from datetime import datetime
+import csv
+import io
 
-from app.dependencies import get_current_user, get_stock_service
-from app.models.User import User
-from app.models.stock import Holding, Position, Order
-from app.schemas.stock import HoldingDTO, PositionDTO, OrderDTO
-from app.services.stock import StockService
+from app.core.concurrency import run_service
+from app.core.etag import conditional_response
+from app.core.database import get_session
+from app.dependencies import get_current_user, get_stock_service, get_websocket_user
+from app.models.stock import OrderStatus, OrderType
+from app.schemas.stock import (
+    HoldingDTO, PositionDTO, OrderDTO, PlaceOrderDTO, PortfolioDTO, AnalyticsDTO,
+    holdings_adapter, positions_adapter, orders_adapter, portfolio_adapter, analytics_adapter, to_records,
+)
+from app.schemas.user import AuthenticatedUser
+from app.services.quotes import quote_hub
+from app.services.stock import StockService, encode_cursor, decode_cursor, portfolio_totals
 
 
 stockRouter = APIRouter(prefix="/stock", tags=["stock"])
 
 
-@stockRouter.get("/holdings", status_code=status.HTTP_200_OK)
-def get_holdings(
-    user: User = Depends(get_current_user),
+@stockRouter.get("/holdings", status_code=status.HTTP_200_OK, response_model=List[HoldingDTO])
+async def get_holdings(
+    request: Request,
+    user: AuthenticatedUser = Depends(get_current_user),
     stock_service: StockService = Depends(get_stock_service),
-) -> List[HoldingDTO]:
-   try:
-       holdings: List[Type[Holding]] = stock_service.get_holdings(user.id)
+) -> Response:
+    async def render():
+        holdings = await run_service(stock_service.get_holdings, user.id)
+        return holdings_adapter.dump_json(holdings_adapter.validate_python(to_records(holdings), from_attributes=True)), {}
 
-   except CircuitBreakerError:
-       raise HTTPException(status_code=503, detail="stock service temporarily unavailable")
+    return await conditional_response(request, user.id, ('holdings',), render)
 
-   return [HoldingDTO.model_validate(holding) for holding in holdings]
 
+@stockRouter.get('/positions', status_code=status.HTTP_200_OK, response_model=List[PositionDTO])
+async def get_positions(
+    request: Request,
+    user: AuthenticatedUser = Depends(get_current_user),
+    stock_service: StockService = Depends(get_stock_service),
+) -> Response:
+    async def render():
+        positions = await run_service(stock_service.get_positions, user.id)
+        return positions_adapter.dump_json(positions_adapter.validate_python(to_records(positions), from_attributes=True)), {}
+
+    return await conditional_response(request, user.id, ('positions',), render)
 
-@stockRouter.get('/positions', status_code=status.HTTP_200_OK)
-def get_positions(
-    user: User = Depends(get_current_user),
+@stockRouter.get('/orders', status_code=status.HTTP_200_OK, response_model=List[OrderDTO])
+async def get_orders(
+    request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    symbol: str | None = None,
+    order_status: OrderStatus | None = Query(None, alias='status'),
+    order_type: OrderType | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    user: AuthenticatedUser = Depends(get_current_user),
     stock_service: StockService = Depends(get_stock_service),
-) -> List[PositionDTO]:
+) -> Response:
     try:
-        positions = stock_service.get_positions(user.id)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    except CircuitBreakerError:
-        raise HTTPException(status_code=503, detail="stock service temporarily unavailable")
+    async def render():
+        # one extra row tells us whether another page exists
+        orders = await run_service(
+            stock_service.get_orders,
+            user.id,
+            limit=limit + 1,
+            cursor=after,
+            symbol=symbol,
+            status=order_status,
+            order_type=order_type,
+            start=start,
+            end=end,
+        )
+
+        headers = {}
+        if len(orders) > limit:
+            orders = orders[:limit]
+            headers['X-Next-Cursor'] = encode_cursor(orders[-1])
+
+        return orders_adapter.dump_json(orders_adapter.validate_python(to_records(orders), from_attributes=True)), headers
 
-    return [PositionDTO.model_validate(position) for position in positions]
+    return await conditional_response(request, user.id, ('orders',), render)
 
-@stockRouter.get('/orders', status_code=status.HTTP_200_OK)
-def get_orders(
-    user: User = Depends(get_current_user),
+
+@stockRouter.post('/orders', status_code=status.HTTP_201_CREATED, response_model=OrderDTO)
+async def place_order(
+    order: PlaceOrderDTO,
+    user: AuthenticatedUser = Depends(get_current_user),
     stock_service: StockService = Depends(get_stock_service),
-) -> List[OrderDTO]:
-  try:
-      orders = stock_service.get_orders(user.id)
+):
+    placed = await run_service(
+        stock_service.place_order, user.id, order.symbol, order.order_type, order.quantity, order.price
+    )
+    return to_records([placed])[0]
+
+
+@stockRouter.delete('/orders/{order_id}', status_code=status.HTTP_200_OK, response_model=OrderDTO)
+async def cancel_order(
+    order_id: int,
+    user: AuthenticatedUser = Depends(get_current_user),
+    stock_service: StockService = Depends(get_stock_service),
+):
+    canceled = await run_service(stock_service.cancel_order, user.id, order_id)
+    return to_records([canceled])[0]
+
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _encode_order_batch(batch, export_format: str) -> bytes:
+    orders = orders_adapter.validate_python(to_records(batch), from_attributes=True)
+
+    if export_format == 'ndjson':
+        return b''.join(order.model_dump_json().encode() + b'\n' for order in orders)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(order.model_dump(mode='json').values() for order in orders)
+    return buffer.getvalue().encode()
+
+
+def _export_header(export_format: str) -> bytes:
+    if export_format == 'csv':
+        return (','.join(OrderDTO.model_fields) + '\r\n').encode()
+    return b''
+
+
+@stockRouter.get('/orders/export', status_code=status.HTTP_200_OK)
+async def export_orders(
+    export_format: Literal['ndjson', 'csv'] = Query('ndjson', alias='format'),
+    user: AuthenticatedUser = Depends(get_current_user),
+    stock_service: StockService = Depends(get_stock_service),
+) -> StreamingResponse:
+    batches = stock_service.iter_order_batches(user.id)
+
+    if hasattr(batches, '__aiter__'):
+        async def content():
+            yield _export_header(export_format)
+            async for batch in batches:
+                yield _encode_order_batch(batch, export_format)
+    else:
+        # sync iteration is driven from the threadpool by StreamingResponse
+        def content():
+            yield _export_header(export_format)
+            for batch in batches:
+                yield _encode_order_batch(batch, export_format)
+
+    return StreamingResponse(
+        content(),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="orders.{export_format}"'},
+    )
+
+
+@stockRouter.get('/portfolio', status_code=status.HTTP_200_OK, response_model=PortfolioDTO)
+async def get_portfolio(
+    request: Request,
+    orders_limit: int | None = Query(None, ge=1, le=500),
+    user: AuthenticatedUser = Depends(get_current_user),
+    stock_service: StockService = Depends(get_stock_service),
+) -> Response:
+    async def render():
+        portfolio = await run_service(stock_service.get_portfolio, user.id, orders_limit=orders_limit)
+        body = {
+            'holdings': to_records(portfolio['holdings']),
+            'positions': to_records(portfolio['positions']),
+            'orders': to_records(portfolio['orders']),
+            'totals': portfolio_totals(portfolio['holdings'], portfolio['positions']),
+        }
+        return portfolio_adapter.dump_json(portfolio_adapter.validate_python(body, from_attributes=True)), {}
+
+    return await conditional_response(request, user.id, ('holdings', 'positions', 'orders'), render)
+
+
+@stockRouter.get('/analytics', status_code=status.HTTP_200_OK, response_model=AnalyticsDTO)
+async def get_analytics(
+    request: Request,
+    group_by: Literal['symbol'] | None = None,
+    user: AuthenticatedUser = Depends(get_current_user),
+    stock_service: StockService = Depends(get_stock_service),
+) -> Response:
+    async def render():
+        analytics = await run_service(stock_service.get_analytics, user.id, group_by=group_by)
+        return analytics_adapter.dump_json(analytics_adapter.validate_python(analytics)), {}
+
+    return await conditional_response(request, user.id, ('holdings', 'positions'), render)
+
+
+@stockRouter.websocket('/prices/stream')
+async def stream_prices(
+    websocket: WebSocket,
+    user: AuthenticatedUser = Depends(get_websocket_user),
+    stock_service: StockService = Depends(get_stock_service),
+    db=Depends(get_session),
+):
+    try:
+        holdings = await run_service(stock_service.get_holdings, user.id)
+        positions = await run_service(stock_service.get_positions, user.id)
+
+    except CircuitBreakerError:
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason="stock service temporarily unavailable")
+
+    # the socket can stay open for hours, so hand the database connection
+    # back to the pool instead of holding it until the dependency closes
+    await run_service(db.close)
 
-  except CircuitBreakerError:
-      raise HTTPException(status_code=503, detail="stock service temporarily unavailable")
+    fallback = {row.symbol: (row.current_price, None) for row in (*holdings, *positions)}
 
-  return [OrderDTO.model_validate(order) for order in orders]
\ No newline at end of file
+    await websocket.accept()
+    await quote_hub.serve(websocket, fallback.keys(), fallback)
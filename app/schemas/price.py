@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class PriceTickDTO(BaseModel):
+    symbol: str = Field(min_length=1, max_length=20)
+    price: float = Field(gt=0)
+
+
+class PriceBatchDTO(BaseModel):
+    ticks: List[PriceTickDTO]
+
+
+class PriceBatchAcceptedDTO(BaseModel):
+    accepted: int
+    pending_symbols: int
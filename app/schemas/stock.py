@@ -1,5 +1,9 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from datetime import datetime
+from typing import List, Sequence
+from sqlalchemy import Row
+
+from app.models.stock import OrderType
 
 
 class HoldingDTO(BaseModel):
@@ -22,10 +26,18 @@ class OrderDTO(BaseModel):
     status: str
     timestamp: datetime
     realized_pnl: float
+    filled_quantity: int
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class PlaceOrderDTO(BaseModel):
+    symbol: str = Field(min_length=1, max_length=20)
+    order_type: OrderType
+    quantity: int = Field(gt=0)
+    price: float = Field(gt=0)
+
+
 class PositionDTO(BaseModel):
     id: int
     user_id: int
@@ -36,3 +48,83 @@ class PositionDTO(BaseModel):
     unrealized_pnl: float
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class PortfolioTotalsDTO(BaseModel):
+    invested_amount: float
+    market_value: float
+    holdings_pnl: float
+    unrealized_pnl: float
+    total_pnl: float
+
+
+class PortfolioDTO(BaseModel):
+    holdings: List[HoldingDTO]
+    positions: List[PositionDTO]
+    orders: List[OrderDTO]
+    totals: PortfolioTotalsDTO
+
+
+class HoldingAnalyticsDTO(BaseModel):
+    symbol: str
+    quantity: int
+    avg_price: float
+    current_price: float
+    invested_amount: float
+    market_value: float
+    pnl: float
+    pnl_percent: float
+    allocation_percent: float
+
+
+class PositionAnalyticsDTO(BaseModel):
+    symbol: str
+    quantity: int
+    entry_price: float
+    current_price: float
+    exposure: float
+    unrealized_pnl: float
+    pnl_percent: float
+
+
+class SymbolAllocationDTO(BaseModel):
+    symbol: str
+    quantity: int
+    market_value: float
+    pnl: float
+    allocation_percent: float
+
+
+class AnalyticsTotalsDTO(BaseModel):
+    invested_amount: float
+    market_value: float
+    pnl: float
+    pnl_percent: float
+    positions_exposure: float
+    unrealized_pnl: float
+
+
+class AnalyticsDTO(BaseModel):
+    holdings: List[HoldingAnalyticsDTO]
+    positions: List[PositionAnalyticsDTO]
+    totals: AnalyticsTotalsDTO
+    by_symbol: List[SymbolAllocationDTO] | None = None
+
+
+# Whole responses are validated in one pass and serialised straight to JSON
+# bytes by pydantic-core, instead of per-row model_validate plus FastAPI's
+# second validation of the return value.
+holdings_adapter = TypeAdapter(List[HoldingDTO])
+positions_adapter = TypeAdapter(List[PositionDTO])
+orders_adapter = TypeAdapter(List[OrderDTO])
+portfolio_adapter = TypeAdapter(PortfolioDTO)
+analytics_adapter = TypeAdapter(AnalyticsDTO)
+
+
+def to_records(rows: Sequence) -> list:
+    # attribute access on SQLAlchemy rows is several times slower for pydantic
+    # than reading a plain dict, so column rows are handed over as dicts
+    if rows and isinstance(rows[0], Row):
+        fields = rows[0]._fields
+        return [dict(zip(fields, row)) for row in rows]
+    return list(rows)
@@ -12,5 +12,6 @@ class TokenData(BaseModel):
     username: str | None = None
     email: str | None = None
     id: str | None = Field(alias="sub")
+    exp: int | None = None
 
     model_config = ConfigDict(populate_by_name=True)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from datetime import datetime
 
 
@@ -22,3 +22,8 @@ class UserDto(BaseModel):
     email: str
     created_at: datetime
 
+
+class AuthenticatedUser(UserDto):
+    """Read-only snapshot of the user behind an access token, shared through the user cache."""
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
@@ -1,7 +1,34 @@
+"""Demo rows for local development, and a synthetic dataset generator for load tests.
+
+    python -m app.seeds [users] [--seed N] [--chunk-size N] [--reset]
+
+``seed_db`` replaces the stock tables with nine hand-written rows; the app
+runs it at startup while ``SEED_ON_STARTUP`` is set.
+
+``generate`` appends ``users`` users with holdings, positions and orders drawn
+from skewed distributions: symbol popularity follows a Zipf curve, per-user
+row counts and quantities are log-normal, so most users are small and a few
+are heavy, and order history is spread over the year before ``AS_OF``. The
+same seed and arguments produce the same rows on an empty database. Every
+user's password is ``--password``. Rows go in through Core executemany
+inserts of ``chunk_size`` rows, and rows/sec is reported per table.
+"""
+import argparse
+import itertools
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+from sqlalchemy import Engine, Table, delete, func, insert, select
 from sqlalchemy.orm import Session
+
 from app.models.stock import Holding, Order, Position, OrderType, OrderStatus
-from app.core.database import sessionLocal
-from sqlalchemy import delete
+from app.models.User import RefreshToken, User
+from app.core.database import Base, engine as default_engine, sessionLocal
+from app.core.security import AuthHelper
+
 
 def seed_db():
     db: Session = sessionLocal()
@@ -46,3 +73,190 @@ def seed_db():
         print(f"Error during seeding: {e}")
     finally:
         db.close()
+
+
+LISTED_SYMBOLS = (
+    "AAPL", "MSFT", "GOOG", "AMZN", "TSLA", "NVDA", "META", "NFLX", "AMD", "INTC",
+    "INFY", "TCS", "WIPRO", "RELIANCE", "HDFCBANK", "ICICIBANK", "SBIN", "ITC", "LT", "HCLTECH",
+)
+SYMBOL_COUNT = 500
+AS_OF = datetime(2025, 1, 1, tzinfo=timezone.utc)
+HISTORY = timedelta(days=365)
+USERS_PER_BATCH = 1000
+
+
+class Universe:
+    """Tradable symbols with a reference price and a Zipf popularity weight."""
+
+    def __init__(self, rng: random.Random, size: int = SYMBOL_COUNT):
+        self.symbols = list(LISTED_SYMBOLS) + [f"SYM{index:04d}" for index in range(size - len(LISTED_SYMBOLS))]
+        self.prices = {symbol: round(min(max(rng.lognormvariate(math.log(300), 1.0), 1.0), 50000.0), 2)
+                       for symbol in self.symbols}
+        self.cum_weights = list(itertools.accumulate(1 / rank ** 1.1 for rank in range(1, len(self.symbols) + 1)))
+
+    def pick(self, rng: random.Random, count: int) -> list[str]:
+        # popular symbols come up often, so draw a few extra and drop repeats
+        picked = dict.fromkeys(rng.choices(self.symbols, cum_weights=self.cum_weights, k=count * 2))
+        return list(picked)[:count]
+
+
+def _count(rng: random.Random, median: float, sigma: float, cap: int, none: float = 0.0) -> int:
+    if rng.random() < none:
+        return 0
+    return min(cap, max(1, round(rng.lognormvariate(math.log(median), sigma))))
+
+
+def _user_rows(rng: random.Random, universe: Universe, user_id: int, password_hash: str, order_ids: Iterator[int]):
+    user = {
+        'id': user_id,
+        'username': f"user{user_id}",
+        'email': f"user{user_id}@example.com",
+        'hashed_password': password_hash,
+        'created_at': AS_OF - HISTORY * rng.random(),
+    }
+
+    holdings = []
+    for symbol in universe.pick(rng, _count(rng, median=5, sigma=0.8, cap=60, none=0.1)):
+        price = universe.prices[symbol]
+        holdings.append({
+            'user_id': user_id,
+            'symbol': symbol,
+            'quantity': _count(rng, median=20, sigma=1.2, cap=10000),
+            'avg_price': round(price * rng.uniform(0.6, 1.3), 2),
+            'current_price': price,
+        })
+
+    positions = []
+    for symbol in universe.pick(rng, _count(rng, median=2, sigma=0.7, cap=20, none=0.4)):
+        price = universe.prices[symbol]
+        quantity = _count(rng, median=10, sigma=1.0, cap=5000)
+        entry_price = round(price * rng.uniform(0.95, 1.05), 2)
+        positions.append({
+            'user_id': user_id,
+            'symbol': symbol,
+            'quantity': quantity,
+            'entry_price': entry_price,
+            'current_price': price,
+            'unrealized_pnl': round((price - entry_price) * quantity, 2),
+        })
+
+    orders = []
+    order_count = _count(rng, median=25, sigma=1.1, cap=5000, none=0.05)
+    for symbol in rng.choices(universe.symbols, cum_weights=universe.cum_weights, k=order_count):
+        price = universe.prices[symbol]
+        order_type = OrderType.BUY if rng.random() < 0.6 else OrderType.SELL
+        quantity = _count(rng, median=10, sigma=1.0, cap=5000)
+        draw = rng.random()
+        if draw < 0.03:
+            # resting orders sit away from the price, so the rebuilt books are never crossed
+            status = OrderStatus.PENDING
+            price = round(price * (rng.uniform(0.85, 0.98) if order_type == OrderType.BUY else rng.uniform(1.02, 1.15)), 2)
+            filled = 0
+        elif draw < 0.13:
+            status, filled = OrderStatus.CANCELED, 0
+            price = round(price * rng.uniform(0.9, 1.1), 2)
+        else:
+            status, filled = OrderStatus.EXECUTING, quantity
+            price = round(price * rng.uniform(0.8, 1.2), 2)
+
+        orders.append({
+            'id': next(order_ids),
+            'user_id': user_id,
+            'symbol': symbol,
+            'order_type': order_type,
+            'quantity': quantity,
+            'price': price,
+            'status': status,
+            'timestamp': AS_OF - HISTORY * rng.random(),
+            'realized_pnl': (
+                round(price * quantity * rng.gauss(0.02, 0.1), 2)
+                if order_type == OrderType.SELL and status == OrderStatus.EXECUTING else 0.0
+            ),
+            'filled_quantity': filled,
+        })
+
+    return user, holdings, positions, orders
+
+
+def _insert(engine: Engine, table: Table, rows: list[dict], chunk_size: int) -> None:
+    with engine.begin() as conn:
+        for start in range(0, len(rows), chunk_size):
+            conn.execute(insert(table), rows[start:start + chunk_size])
+
+
+def generate(
+        users: int,
+        seed: int = 0,
+        chunk_size: int = 5000,
+        password: str = "password123",
+        reset: bool = False,
+        engine: Engine = default_engine,
+        report: bool = True,
+) -> dict[str, int]:
+    rng = random.Random(seed)
+    universe = Universe(rng)
+    tables = {
+        'users': User.__table__,
+        'holdings': Holding.__table__,
+        'positions': Position.__table__,
+        'orders': Order.__table__,
+    }
+
+    Base.metadata.create_all(bind=engine)
+    if reset:
+        with engine.begin() as conn:
+            for table in (RefreshToken.__table__, *reversed(tables.values())):
+                conn.execute(delete(table))
+
+    with engine.connect() as conn:
+        first_user = (conn.execute(select(func.max(User.id))).scalar() or 0) + 1
+        first_order = (conn.execute(select(func.max(Order.id))).scalar() or 0) + 1
+
+    # one bcrypt hash shared by every user, so logins in load tests all work
+    password_hash = AuthHelper.hasher.hash(password)
+    order_ids = iter(range(first_order, 2 ** 63))
+    counts = dict.fromkeys(tables, 0)
+    seconds = dict.fromkeys(tables, 0.0)
+    started = time.perf_counter()
+
+    for batch_start in range(first_user, first_user + users, USERS_PER_BATCH):
+        batch = {name: [] for name in tables}
+        for user_id in range(batch_start, min(batch_start + USERS_PER_BATCH, first_user + users)):
+            user, holdings, positions, orders = _user_rows(rng, universe, user_id, password_hash, order_ids)
+            batch['users'].append(user)
+            batch['holdings'] += holdings
+            batch['positions'] += positions
+            batch['orders'] += orders
+
+        for name, rows in batch.items():
+            if rows:
+                table_started = time.perf_counter()
+                _insert(engine, tables[name], rows, chunk_size)
+                seconds[name] += time.perf_counter() - table_started
+                counts[name] += len(rows)
+
+    elapsed = time.perf_counter() - started
+    if report:
+        for name in tables:
+            rate = counts[name] / seconds[name] if seconds[name] else 0.0
+            print(f"{name:10} {counts[name]:12,} rows   {rate:12,.0f} rows/s")
+        total = sum(counts.values())
+        print(f"{'total':10} {total:12,} rows   {total / elapsed:12,.0f} rows/s   ({elapsed:.1f} s, seed {seed})")
+
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load a synthetic dataset for performance testing.")
+    parser.add_argument('users', type=int, nargs='?', default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--password', default="password123", help="password shared by every generated user")
+    parser.add_argument('--reset', action='store_true', help="delete existing users, tokens and stock rows first")
+    args = parser.parse_args()
+
+    generate(args.users, seed=args.seed, chunk_size=args.chunk_size, password=args.password, reset=args.reset)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+from math import fsum
+from operator import attrgetter
+from typing import Iterable, List, Sequence
+
+from sqlalchemy import Row
+
+
+HOLDING_FIELDS = ('symbol', 'quantity', 'avg_price', 'current_price')
+POSITION_FIELDS = ('symbol', 'quantity', 'entry_price', 'current_price', 'unrealized_pnl')
+
+
+def _columns(rows: Sequence, fields: tuple[str, ...]) -> list[tuple]:
+    # transpose into one tuple per field; rows are read positionally when possible
+    if not rows:
+        return [() for _ in fields]
+
+    if isinstance(rows[0], Row):
+        transposed = list(zip(*rows))
+        index = {name: position for position, name in enumerate(rows[0]._fields)}
+        return [transposed[index[name]] for name in fields]
+
+    return list(zip(*map(attrgetter(*fields), rows)))
+
+
+def _percent(numerators: Iterable[float], denominators: Iterable[float]) -> List[float]:
+    return [n / d * 100 if d else 0.0 for n, d in zip(numerators, denominators)]
+
+
+def _share(values: Sequence[float], total: float) -> List[float]:
+    if not total:
+        return [0.0] * len(values)
+    scale = 100 / total
+    return [value * scale for value in values]
+
+
+def compute(holdings: Sequence, positions: Sequence, group_by: str | None = None) -> dict:
+    # plain Python throughout: each metric is one comprehension over a
+    # transposed column, which beats per-row attribute lookups, but the larger
+    # saving is that StockService selects columns instead of ORM objects
+    h_symbol, h_quantity, h_avg, h_current = _columns(holdings, HOLDING_FIELDS)
+    invested = [quantity * price for quantity, price in zip(h_quantity, h_avg)]
+    market = [quantity * price for quantity, price in zip(h_quantity, h_current)]
+    pnl = [value - cost_basis for value, cost_basis in zip(market, invested)]
+
+    p_symbol, p_quantity, p_entry, p_current, p_unrealized = _columns(positions, POSITION_FIELDS)
+    exposure = [quantity * price for quantity, price in zip(p_quantity, p_current)]
+    cost = [quantity * price for quantity, price in zip(p_quantity, p_entry)]
+    unrealized = [value or 0.0 for value in p_unrealized]
+
+    total_invested = fsum(invested)
+    total_market = fsum(market)
+    total_exposure = fsum(exposure)
+    gross = total_market + total_exposure
+
+    result = {
+        'holdings': [
+            {
+                'symbol': symbol, 'quantity': quantity, 'avg_price': avg_price, 'current_price': current_price,
+                'invested_amount': cost_basis, 'market_value': value, 'pnl': gain, 'pnl_percent': gain_percent,
+                'allocation_percent': allocation,
+            }
+            for symbol, quantity, avg_price, current_price, cost_basis, value, gain, gain_percent, allocation in zip(
+                h_symbol, h_quantity, h_avg, h_current, invested, market, pnl,
+                _percent(pnl, invested), _share(market, total_market),
+            )
+        ],
+        'positions': [
+            {
+                'symbol': symbol, 'quantity': quantity, 'entry_price': entry_price, 'current_price': current_price,
+                'exposure': value, 'unrealized_pnl': gain, 'pnl_percent': gain_percent,
+            }
+            for symbol, quantity, entry_price, current_price, value, gain, gain_percent in zip(
+                p_symbol, p_quantity, p_entry, p_current, exposure, unrealized, _percent(unrealized, cost),
+            )
+        ],
+        'totals': {
+            'invested_amount': total_invested,
+            'market_value': total_market,
+            'pnl': total_market - total_invested,
+            'pnl_percent': (total_market - total_invested) / total_invested * 100 if total_invested else 0.0,
+            'positions_exposure': total_exposure,
+            'unrealized_pnl': fsum(unrealized),
+        },
+        'by_symbol': None,
+    }
+
+    if group_by == 'symbol':
+        groups: dict[str, list[float]] = {}
+        for symbol, quantity, value, gain in zip(h_symbol, h_quantity, market, pnl):
+            group = groups.setdefault(symbol, [0, 0.0, 0.0])
+            group[0] += quantity
+            group[1] += value
+            group[2] += gain
+        for symbol, quantity, value, gain in zip(p_symbol, p_quantity, exposure, unrealized):
+            group = groups.setdefault(symbol, [0, 0.0, 0.0])
+            group[0] += quantity
+            group[1] += value
+            group[2] += gain
+
+        result['by_symbol'] = [
+            {
+                'symbol': symbol,
+                'quantity': quantity,
+                'market_value': value,
+                'pnl': gain,
+                'allocation_percent': value / gross * 100 if gross else 0.0,
+            }
+            for symbol, (quantity, value, gain) in sorted(groups.items(), key=lambda item: -item[1][1])
+        ]
+
+    return result
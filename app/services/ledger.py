@@ -0,0 +1,177 @@
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.stock import Holding, Order, OrderStatus, OrderType, Position
+from app.services.matching import Fill, RestingOrder
+
+
+class Account:
+    """One user's holding and net position in one symbol."""
+
+    __slots__ = ('user_id', 'symbol', 'quantity', 'avg_price', 'position', 'entry_price', 'current_price')
+
+    def __init__(self, user_id: int, symbol: str, quantity: int = 0, avg_price: float = 0.0,
+                 position: int = 0, entry_price: float = 0.0, current_price: float = 0.0):
+        self.user_id = user_id
+        self.symbol = symbol
+        self.quantity = quantity
+        self.avg_price = avg_price
+        self.position = position
+        self.entry_price = entry_price
+        self.current_price = current_price
+
+    def buy(self, quantity: int, price: float) -> None:
+        self.avg_price = (self.quantity * self.avg_price + quantity * price) / (self.quantity + quantity)
+        self.quantity += quantity
+        self._move_position(quantity, price)
+
+    def sell(self, quantity: int, price: float) -> float:
+        # sells were checked against holdings when placed, so the stock is there
+        realized = (price - self.avg_price) * quantity
+        self.quantity -= quantity
+        self._move_position(-quantity, price)
+        return realized
+
+    def _move_position(self, quantity: int, price: float) -> None:
+        # positions are the net quantity traded, signed; the entry price is
+        # averaged while the position grows and reset when it flips side
+        held = self.position
+        moved = held + quantity
+        if held == 0 or (held > 0) == (quantity > 0):
+            self.entry_price = (abs(held) * self.entry_price + abs(quantity) * price) / abs(moved)
+        elif moved and (moved > 0) != (held > 0):
+            self.entry_price = price
+        self.position = moved
+        self.current_price = price
+
+
+def order_event(order: RestingOrder, status: OrderStatus) -> dict:
+    return {
+        'table': 'orders',
+        'key': [order.id],
+        'row': {
+            'id': order.id,
+            'user_id': order.user_id,
+            'symbol': order.symbol,
+            'order_type': order.side.value,
+            'quantity': order.quantity,
+            'price': order.price,
+            'status': status.value,
+            'timestamp': order.timestamp.isoformat(),
+            'realized_pnl': order.realized_pnl,
+            'filled_quantity': order.quantity - order.remaining,
+        },
+    }
+
+
+def account_events(account: Account) -> list[dict]:
+    key = [account.user_id, account.symbol]
+    holding = {
+        'user_id': account.user_id,
+        'symbol': account.symbol,
+        'quantity': account.quantity,
+        'avg_price': account.avg_price,
+        'current_price': account.current_price,
+    } if account.quantity else None
+    position = {
+        'user_id': account.user_id,
+        'symbol': account.symbol,
+        'quantity': account.position,
+        'entry_price': account.entry_price,
+        'current_price': account.current_price,
+        'unrealized_pnl': (account.current_price - account.entry_price) * account.position,
+    } if account.position else None
+
+    return [
+        {'table': 'holdings', 'key': key, 'row': holding},
+        {'table': 'positions', 'key': key, 'row': position},
+    ]
+
+
+class OrderLedger:
+    """Order ids and per-account state for order matching.
+
+    Writes reach the database later through the write-behind queue, so the
+    accounts touched by matching are kept here once read, and order ids are
+    assigned in process. Accounts for a symbol are only read and changed
+    while holding that symbol's book lock.
+    """
+
+    def __init__(self):
+        self._accounts: dict[tuple[int, str], Account] = {}
+        self._next_order_id: int | None = None
+        self._id_lock = threading.Lock()
+
+    def next_order_id(self, db: Session) -> int:
+        with self._id_lock:
+            if self._next_order_id is None:
+                self._next_order_id = (db.scalar(select(func.max(Order.id))) or 0) + 1
+            order_id = self._next_order_id
+            self._next_order_id += 1
+            return order_id
+
+    def account(self, db: Session, user_id: int, symbol: str) -> Account:
+        account = self._accounts.get((user_id, symbol))
+        if account is not None:
+            return account
+
+        account = Account(user_id, symbol)
+        holding = db.execute(
+            select(Holding.quantity, Holding.avg_price, Holding.current_price)
+            .where(Holding.user_id == user_id, Holding.symbol == symbol)
+        ).first()
+        if holding:
+            account.quantity, account.avg_price, account.current_price = holding
+        position = db.execute(
+            select(Position.quantity, Position.entry_price)
+            .where(Position.user_id == user_id, Position.symbol == symbol)
+        ).first()
+        if position:
+            account.position, account.entry_price = position
+
+        self._accounts[(user_id, symbol)] = account
+        return account
+
+    def open_order(self, db: Session, user_id: int, symbol: str, side: OrderType, quantity: int, price: float) -> RestingOrder:
+        return RestingOrder(
+            self.next_order_id(db), user_id, symbol, side, price, quantity,
+            timestamp=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+
+    def settle(self, db: Session, taker: RestingOrder, fills: list[Fill]) -> list[dict]:
+        orders = {taker.id: taker}
+        accounts = {}
+
+        for fill in fills:
+            buy_order, sell_order = (taker, fill.maker) if taker.side is OrderType.BUY else (fill.maker, taker)
+            buyer = self.account(db, buy_order.user_id, taker.symbol)
+            seller = self.account(db, sell_order.user_id, taker.symbol)
+
+            buyer.buy(fill.quantity, fill.price)
+            sell_order.realized_pnl += seller.sell(fill.quantity, fill.price)
+
+            orders[fill.maker.id] = fill.maker
+            accounts[buyer.user_id] = buyer
+            accounts[seller.user_id] = seller
+
+        events = [
+            order_event(order, OrderStatus.PENDING if order.remaining else OrderStatus.EXECUTING)
+            for order in orders.values()
+        ]
+        for account in accounts.values():
+            events.extend(account_events(account))
+        return events
+
+    def forget(self, symbol: str | None = None) -> None:
+        if symbol is None:
+            self._accounts.clear()
+            self._next_order_id = None
+        else:
+            for key in [key for key in self._accounts if key[1] == symbol]:
+                del self._accounts[key]
+
+
+order_ledger = OrderLedger()
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.database import sessionLocal
+from app.core.stats import LatencyStats
+from app.models.User import RefreshToken
+
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenSweeper:
+    """Purges expired refresh tokens in small keyset-paginated batches.
+
+    Revoked tokens are kept until they expire: the revoked rows are what
+    the revocation filter is loaded from.
+    """
+
+    def __init__(
+            self,
+            session_factory: Callable[[], Session],
+            batch_size: int,
+            batch_delay: float,
+            interval: float,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.interval = interval
+        self.rows_purged = 0
+        self.batch_latency = LatencyStats()
+
+    def purge_batch(self, after_id: int) -> tuple[int, int | None]:
+        now = datetime.now(timezone.utc)
+
+        with self.session_factory() as db:
+            ids = db.scalars(
+                select(RefreshToken.id)
+                .where(RefreshToken.id > after_id, RefreshToken.expired_at < now)
+                .order_by(RefreshToken.id)
+                .limit(self.batch_size)
+            ).all()
+
+            if not ids:
+                return 0, None
+
+            # delete by primary key only, so concurrent logins and other
+            # workers sweeping the same range never contend on a range lock
+            result = db.execute(
+                delete(RefreshToken)
+                .where(RefreshToken.id.in_(ids), RefreshToken.expired_at < now)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+        return result.rowcount, ids[-1]
+
+    async def sweep(self) -> int:
+        purged = 0
+        last_id = 0
+
+        while True:
+            started_at = time.perf_counter()
+            deleted, last_id = await asyncio.to_thread(self.purge_batch, last_id)
+            if last_id is None:
+                break
+
+            self.batch_latency.observe(time.perf_counter() - started_at)
+            purged += deleted
+            self.rows_purged += deleted
+            await asyncio.sleep(self.batch_delay)
+
+        latency = self.batch_latency.snapshot()
+        logger.info(
+            "refresh token sweep purged %s rows (batch latency avg %.1f ms, max %.1f ms)",
+            purged, latency['avg_ms'], latency['max_ms'],
+        )
+        return purged
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("refresh token sweep failed")
+
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            'rows_purged': self.rows_purged,
+            'batch_latency': self.batch_latency.snapshot(),
+        }
+
+
+refresh_token_sweeper = RefreshTokenSweeper(
+    session_factory=sessionLocal,
+    batch_size=settings.TOKEN_SWEEP_BATCH_SIZE,
+    batch_delay=settings.TOKEN_SWEEP_BATCH_DELAY_SECONDS,
+    interval=settings.TOKEN_SWEEP_INTERVAL_SECONDS,
+)
@@ -0,0 +1,223 @@
+import asyncio
+import heapq
+import itertools
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.stock import Order, OrderStatus, OrderType
+
+
+class RestingOrder:
+    __slots__ = ('id', 'user_id', 'symbol', 'side', 'price', 'quantity', 'remaining', 'realized_pnl', 'timestamp')
+
+    def __init__(
+            self,
+            order_id: int,
+            user_id: int,
+            symbol: str,
+            side: OrderType,
+            price: float,
+            quantity: int,
+            remaining: int | None = None,
+            realized_pnl: float = 0.0,
+            timestamp: datetime | None = None,
+    ):
+        self.id = order_id
+        self.user_id = user_id
+        self.symbol = symbol
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.remaining = quantity if remaining is None else remaining
+        self.realized_pnl = realized_pnl
+        self.timestamp = timestamp
+
+
+class Fill(NamedTuple):
+    maker: RestingOrder
+    taker: RestingOrder
+    price: float
+    quantity: int
+
+
+class OrderBook:
+    """Resting limit orders for one symbol, matched in price-time priority.
+
+    Each side is a binary heap of (price key, arrival, order), so adding an
+    order is O(log n). Cancelling only removes the order from the index in
+    O(1); its heap entry is discarded when it reaches the top, and the heaps
+    are rebuilt once stale entries outnumber live ones.
+
+    ``lock`` serialises everything that touches the book, including the
+    account updates and journal write for the resulting fills, so the
+    events for one symbol are recorded in the order they happened.
+    ``async_lock`` queues DB_ASYNC requests on the event loop ahead of it.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.lock = threading.Lock()
+        self.async_lock = asyncio.Lock()
+        self._bids: list[tuple[float, int, RestingOrder]] = []
+        self._asks: list[tuple[float, int, RestingOrder]] = []
+        self._orders: dict[int, RestingOrder] = {}
+        self._reserved: dict[int, int] = defaultdict(int)
+        self._arrival = itertools.count()
+        self._stale = 0
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._orders
+
+    def reserved(self, user_id: int) -> int:
+        """Quantity the user already has resting on the sell side."""
+        return self._reserved.get(user_id, 0)
+
+    def best_bid(self) -> float | None:
+        self._discard_stale(self._bids)
+        return -self._bids[0][0] if self._bids else None
+
+    def best_ask(self) -> float | None:
+        self._discard_stale(self._asks)
+        return self._asks[0][0] if self._asks else None
+
+    def get(self, order_id: int) -> RestingOrder | None:
+        return self._orders.get(order_id)
+
+    def submit(self, order: RestingOrder) -> list[Fill]:
+        price = order.price
+        if order.side is OrderType.BUY:
+            opposite, crosses = self._asks, lambda best: best <= price
+        else:
+            opposite, crosses = self._bids, lambda best: -best >= price
+
+        fills = []
+
+        while order.remaining and opposite:
+            key, _, maker = opposite[0]
+            if self._orders.get(maker.id) is not maker:
+                heapq.heappop(opposite)
+                self._stale -= 1
+                continue
+            if not crosses(key):
+                break
+
+            traded = min(order.remaining, maker.remaining)
+            fills.append(Fill(maker, order, maker.price, traded))
+            order.remaining -= traded
+            maker.remaining -= traded
+            if maker.side is OrderType.SELL:
+                self._release(maker.user_id, traded)
+
+            if not maker.remaining:
+                heapq.heappop(opposite)
+                del self._orders[maker.id]
+
+        if order.remaining:
+            self.rest(order)
+
+        return fills
+
+    def rest(self, order: RestingOrder) -> None:
+        self._orders[order.id] = order
+        if order.side is OrderType.BUY:
+            heapq.heappush(self._bids, (-order.price, next(self._arrival), order))
+        else:
+            heapq.heappush(self._asks, (order.price, next(self._arrival), order))
+            self._reserved[order.user_id] += order.remaining
+
+    def cancel(self, order_id: int) -> RestingOrder | None:
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return None
+
+        if order.side is OrderType.SELL:
+            self._release(order.user_id, order.remaining)
+
+        self._stale += 1
+        if self._stale > len(self._orders) and self._stale > 64:
+            self._compact()
+        return order
+
+    def clear(self) -> None:
+        self._bids.clear()
+        self._asks.clear()
+        self._orders.clear()
+        self._reserved.clear()
+        self._stale = 0
+
+    def _release(self, user_id: int, quantity: int) -> None:
+        left = self._reserved[user_id] - quantity
+        if left:
+            self._reserved[user_id] = left
+        else:
+            del self._reserved[user_id]
+
+    def _discard_stale(self, side: list) -> None:
+        while side and self._orders.get(side[0][2].id) is not side[0][2]:
+            heapq.heappop(side)
+            self._stale -= 1
+
+    def _compact(self) -> None:
+        for side in (self._bids, self._asks):
+            side[:] = [entry for entry in side if self._orders.get(entry[2].id) is entry[2]]
+            heapq.heapify(side)
+        self._stale = 0
+
+
+class MatchingEngine:
+    """Order books by symbol, rebuilt from the open orders in the database at
+    startup (after the write-behind journal has been replayed).
+
+    Only the process that owns the journal matches orders; in any other
+    worker ``enabled`` is False and order placement is refused.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._books: dict[str, OrderBook] = {}
+        self._lock = threading.Lock()
+
+    def book(self, symbol: str) -> OrderBook:
+        book = self._books.get(symbol)
+        if book is None:
+            with self._lock:
+                book = self._books.setdefault(symbol, OrderBook(symbol))
+        return book
+
+    def load(self, db: Session, symbol: str | None = None) -> None:
+        query = (
+            select(Order.id, Order.user_id, Order.symbol, Order.order_type, Order.price, Order.quantity,
+                   (Order.quantity - Order.filled_quantity).label('remaining'), Order.realized_pnl, Order.timestamp)
+            .where(Order.status == OrderStatus.PENDING)
+            .order_by(Order.timestamp, Order.id)
+        )
+        if symbol is not None:
+            query = query.where(Order.symbol == symbol)
+            self.book(symbol).clear()
+        else:
+            for book in list(self._books.values()):
+                book.clear()
+
+        for row in db.execute(query):
+            if row.remaining > 0:
+                self.book(row.symbol).rest(RestingOrder(
+                    row.id, row.user_id, row.symbol, row.order_type, row.price, row.quantity,
+                    remaining=row.remaining, realized_pnl=row.realized_pnl or 0.0, timestamp=row.timestamp,
+                ))
+
+    def stats(self) -> dict:
+        return {
+            'books': len(self._books),
+            'resting_orders': sum(len(book) for book in list(self._books.values())),
+        }
+
+
+matching_engine = MatchingEngine()
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Table, delete, tuple_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.database import recent_writes, sessionLocal
+from app.core.etag import version_registry
+from app.core.journal import Journal
+from app.core.stats import LatencyStats
+from app.models.stock import Holding, Order, OrderStatus, OrderType, Position
+
+
+logger = logging.getLogger(__name__)
+
+TABLES: dict[str, tuple[Table, tuple[str, ...]]] = {
+    'orders': (Order.__table__, ('id',)),
+    'holdings': (Holding.__table__, ('user_id', 'symbol')),
+    'positions': (Position.__table__, ('user_id', 'symbol')),
+}
+
+UPSERT_DIALECTS = {'sqlite': sqlite, 'postgresql': postgresql, 'mysql': mysql}
+
+
+def _upsert(db: Session, table: Table, keys: tuple[str, ...], rows: list[dict]) -> None:
+    # one statement per table run as executemany: its compiled form is cached,
+    # where a multi-row VALUES clause is recompiled for every batch
+    dialect = UPSERT_DIALECTS[db.get_bind().dialect.name]
+    statement = dialect.insert(table)
+    columns = [column for column in rows[0] if column not in keys]
+
+    if dialect is mysql:
+        statement = statement.on_duplicate_key_update({column: statement.inserted[column] for column in columns})
+    else:
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: statement.excluded[column] for column in columns},
+        )
+    db.execute(statement, rows)
+
+
+def _order_row(row: dict) -> dict:
+    return {
+        **row,
+        'order_type': OrderType(row['order_type']),
+        'status': OrderStatus(row['status']),
+        'timestamp': datetime.fromisoformat(row['timestamp']),
+    }
+
+
+class WriteBehindQueue:
+    """Batches order, holding and position writes behind an fsync'd journal.
+
+    ``submit`` returns once the events are durable in the journal; the
+    database is written later, by size or time, with one batched upsert
+    (or delete) per table. Events carry the full row state, so later events
+    for the same row replace earlier ones in the queue, and replaying a batch
+    that had already reached the database is harmless.
+    """
+
+    def __init__(
+            self,
+            session_factory: Callable[[], Session],
+            journal: Journal,
+            batch_size: int,
+            interval: float,
+    ):
+        self.session_factory = session_factory
+        self.journal = journal
+        self.batch_size = batch_size
+        self.interval = interval
+        self.events_submitted = 0
+        self.rows_written = 0
+        self.flush_latency = LatencyStats()
+        self._pending: dict[tuple, dict] = {}
+        self._in_flight: dict[tuple, dict] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def _merge(self, events: list[dict]) -> None:
+        for event in events:
+            self._pending[(event['table'], *event['key'])] = event
+
+    def submit(self, events: list[dict]) -> None:
+        with self._lock:
+            # journal order and queue order stay the same
+            seq = self.journal.write(events)
+            self._merge(events)
+            self._seq = seq
+            self.events_submitted += len(events)
+            full = len(self._pending) >= self.batch_size
+
+        self.journal.sync(seq)
+
+        if full and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending_row(self, table: str, *key) -> dict | None:
+        """Latest queued state of a row that may not have reached the database yet."""
+        event = self._pending.get((table, *key)) or self._in_flight.get((table, *key))
+        return event['row'] if event else None
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._in_flight = batch
+                seq = self._seq
+
+            if not batch:
+                return 0
+
+            started_at = time.perf_counter()
+            try:
+                written = self._write(batch.values())
+            except Exception:
+                with self._lock:
+                    # newer events for the same rows win over the failed batch
+                    self._pending = {**batch, **self._pending}
+                raise
+            finally:
+                self._in_flight = {}
+
+            self.journal.checkpoint(seq)
+            self.flush_latency.observe(time.perf_counter() - started_at)
+            self.rows_written += written
+
+            # Core writes skip the ORM events that normally bump ETag versions,
+            # and their users' next reads should not hit a lagging replica
+            changed = {
+                (event['table'], event['row']['user_id'] if event['row'] else event['key'][0])
+                for event in batch.values()
+            }
+            for table, user_id in changed:
+                version_registry.bump(user_id, table)
+                recent_writes.set(user_id, True)
+
+            return written
+
+    def _write(self, events) -> int:
+        upserts: dict[str, list[dict]] = {}
+        deletes: dict[str, list[list]] = {}
+        for event in events:
+            if event['row'] is None:
+                deletes.setdefault(event['table'], []).append(event['key'])
+            else:
+                row = _order_row(event['row']) if event['table'] == 'orders' else event['row']
+                upserts.setdefault(event['table'], []).append(row)
+
+        written = 0
+        with self.session_factory() as db:
+            for name, rows in upserts.items():
+                table, keys = TABLES[name]
+                for start in range(0, len(rows), self.batch_size):
+                    _upsert(db, table, keys, rows[start:start + self.batch_size])
+                written += len(rows)
+
+            for name, keys in deletes.items():
+                table, key_columns = TABLES[name]
+                columns = tuple_(*(table.c[column] for column in key_columns))
+                for start in range(0, len(keys), self.batch_size):
+                    chunk = [tuple(key) for key in keys[start:start + self.batch_size]]
+                    written += db.execute(delete(table).where(columns.in_(chunk))).rowcount
+
+            db.commit()
+
+        return written
+
+    def recover(self) -> int:
+        events = self.journal.replay()
+        if not events:
+            return 0
+
+        with self._lock:
+            self._merge(events)
+            self._seq = self.journal.seq
+        written = self.flush()
+        logger.info("replayed %s journaled events (%s rows written)", len(events), written)
+        return written
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception:
+                    logger.exception("write-behind flush failed")
+        finally:
+            self._loop = None
+            # everything acknowledged so far goes to the database before shutdown
+            await asyncio.to_thread(self.flush)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._seq = 0
+        self.events_submitted = self.rows_written = 0
+        self.flush_latency = LatencyStats()
+
+    def stats(self) -> dict:
+        return {
+            'events_submitted': self.events_submitted,
+            'rows_written': self.rows_written,
+            'pending_rows': self.pending(),
+            'flush_latency': self.flush_latency.snapshot(),
+        }
+
+
+write_behind = WriteBehindQueue(
+    session_factory=sessionLocal,
+    journal=Journal(settings.ORDER_JOURNAL_PATH, fsync=settings.ORDER_JOURNAL_FSYNC),
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+    interval=settings.WRITE_BEHIND_FLUSH_INTERVAL_SECONDS,
+)
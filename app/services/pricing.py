@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.database import sessionLocal
+from app.core.etag import version_registry
+from app.core.stats import LatencyStats, RateWindow
+from app.models.stock import Holding, Position
+
+
+logger = logging.getLogger(__name__)
+
+# ingest and apply rates are averaged over this much wall-clock time
+RATE_WINDOW_SECONDS = 60.0
+
+holdings_table = Holding.__table__
+positions_table = Position.__table__
+
+# Each statement updates every row holding the symbol and is executed once
+# per batch with many parameter sets, so it is compiled and prepared once.
+# P&L is computed from the bound price rather than read back from
+# current_price, since MySQL applies SET clauses left to right.
+update_holding_prices = (
+    update(holdings_table)
+    .where(holdings_table.c.symbol == bindparam('tick_symbol'))
+    .values(current_price=bindparam('tick_price'))
+)
+update_position_prices = (
+    update(positions_table)
+    .where(positions_table.c.symbol == bindparam('tick_symbol'))
+    .values(
+        current_price=bindparam('tick_price'),
+        unrealized_pnl=(bindparam('tick_price') - positions_table.c.entry_price) * positions_table.c.quantity,
+    )
+)
+
+
+class PriceIngestor:
+    """Marks holdings and positions to market from batches of price ticks.
+
+    Ticks are coalesced per symbol until the next flush, so a symbol that
+    ticks many times within a window costs one update. A flush runs the two
+    bulk UPDATEs below in chunks of ``chunk_size`` symbols, with unrealized
+    P&L recomputed by the database.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], window: float, chunk_size: int):
+        self.session_factory = session_factory
+        self.window = window
+        self.chunk_size = chunk_size
+        self.ticks_received = 0
+        self.symbols_applied = 0
+        self.rows_updated = 0
+        self.busy_seconds = 0.0
+        self.flush_latency = LatencyStats()
+        self.received_rate = RateWindow(RATE_WINDOW_SECONDS)
+        self.applied_rate = RateWindow(RATE_WINDOW_SECONDS)
+        self._pending: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, ticks: Iterable[tuple[str, float]]) -> int:
+        ticks = list(ticks)
+        with self._lock:
+            # later ticks for a symbol overwrite earlier ones
+            self._pending.update(ticks)
+            self.ticks_received += len(ticks)
+        self.received_rate.add(len(ticks))
+        return len(ticks)
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def apply(self, prices: dict[str, float]) -> int:
+        params = [{'tick_symbol': symbol, 'tick_price': price} for symbol, price in prices.items()]
+        updated = 0
+
+        with self.session_factory() as db:
+            for start in range(0, len(params), self.chunk_size):
+                chunk = params[start:start + self.chunk_size]
+                updated += db.execute(update_holding_prices, chunk).rowcount
+                updated += db.execute(update_position_prices, chunk).rowcount
+            db.commit()
+
+        return updated
+
+    def flush(self) -> int:
+        with self._lock:
+            prices, self._pending = self._pending, {}
+
+        if not prices:
+            return 0
+
+        started_at = time.perf_counter()
+        try:
+            updated = self.apply(prices)
+        except Exception:
+            with self._lock:
+                # ticks that arrived during the failed flush are newer and win
+                self._pending = {**prices, **self._pending}
+            raise
+        elapsed = time.perf_counter() - started_at
+
+        self.flush_latency.observe(elapsed)
+        self.busy_seconds += elapsed
+        self.symbols_applied += len(prices)
+        self.rows_updated += updated
+        self.applied_rate.add(len(prices))
+
+        if updated:
+            version_registry.bump_all('holdings')
+            version_registry.bump_all('positions')
+
+        logger.debug("applied %s prices to %s rows in %.1f ms", len(prices), updated, elapsed * 1000)
+        return updated
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.window)
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception:
+                    logger.exception("price flush failed")
+        finally:
+            # apply whatever arrived during the last window before shutting down
+            await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict:
+        return {
+            'ticks_received': self.ticks_received,
+            'symbols_applied': self.symbols_applied,
+            'rows_updated': self.rows_updated,
+            'pending_symbols': self.pending(),
+            # wall-clock rates; applied counts one per symbol after coalescing
+            'received_per_second': self.received_rate.rate(),
+            'applied_per_second': self.applied_rate.rate(),
+            # how fast a flush writes while it runs, not sustained throughput
+            'flush_rows_per_second': self.rows_updated / self.busy_seconds if self.busy_seconds else 0.0,
+            'flush_latency': self.flush_latency.snapshot(),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._pending.clear()
+        self.ticks_received = self.symbols_applied = self.rows_updated = 0
+        self.busy_seconds = 0.0
+        self.flush_latency = LatencyStats()
+        self.received_rate = RateWindow(RATE_WINDOW_SECONDS)
+        self.applied_rate = RateWindow(RATE_WINDOW_SECONDS)
+
+
+price_ingestor = PriceIngestor(
+    session_factory=sessionLocal,
+    window=settings.PRICE_FLUSH_INTERVAL_SECONDS,
+    chunk_size=settings.PRICE_UPDATE_CHUNK_SIZE,
+)
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Iterable
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from app.config import settings
+
+
+# (price, tick timestamp); the timestamp is None for prices read from the database
+Quote = tuple[float, float | None]
+
+
+class PriceStore:
+    """Latest price and timestamp per symbol.
+
+    Each quote is an immutable tuple and writers swap whole entries, so
+    readers never take a lock and never see a price paired with another
+    tick's timestamp.
+    """
+
+    def __init__(self):
+        self._quotes: dict[str, Quote] = {}
+        self._write_lock = threading.Lock()
+
+    def get(self, symbol: str) -> Quote | None:
+        return self._quotes.get(symbol)
+
+    def snapshot(self, symbols: Iterable[str]) -> dict[str, Quote]:
+        quotes = self._quotes
+        return {symbol: quotes[symbol] for symbol in symbols if symbol in quotes}
+
+    def update(self, ticks: Iterable[tuple[str, float]], timestamp: float | None = None) -> dict[str, Quote]:
+        timestamp = time.time() if timestamp is None else timestamp
+        changed = {}
+
+        with self._write_lock:
+            for symbol, price in ticks:
+                current = self._quotes.get(symbol)
+                if current is None or current[0] != price:
+                    changed[symbol] = self._quotes[symbol] = (price, timestamp)
+
+        return changed
+
+    def clear(self) -> None:
+        with self._write_lock:
+            self._quotes.clear()
+
+
+class Subscription:
+    """Per-connection queue of price updates, at most one per symbol.
+
+    A symbol that ticks again before the client has been sent the previous
+    price replaces it, so memory per connection is bounded by its symbols.
+    Every replaced update counts as lag; a connection that falls more than
+    ``max_lag`` updates behind between two sends is marked as dropped.
+    """
+
+    __slots__ = ('symbols', 'max_lag', 'pending', 'lag', 'dropped', 'ready', 'loop')
+
+    def __init__(self, symbols: Iterable[str], max_lag: int):
+        self.symbols = frozenset(symbols)
+        self.max_lag = max_lag
+        self.pending: dict[str, Quote] = {}
+        self.lag = 0
+        self.dropped = False
+        self.ready = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+    def offer(self, symbol: str, quote: Quote) -> None:
+        if symbol in self.pending:
+            self.lag += 1
+            if self.lag > self.max_lag:
+                self.dropped = True
+        self.pending[symbol] = quote
+        self.ready.set()
+
+    async def next_batch(self) -> dict[str, Quote]:
+        await self.ready.wait()
+        self.ready.clear()
+        batch, self.pending = self.pending, {}
+        self.lag = 0
+        return batch
+
+
+def _message(kind: str, quotes: dict[str, Quote]) -> str:
+    return json.dumps({
+        'type': kind,
+        'prices': {symbol: {'price': price, 'ts': ts} for symbol, (price, ts) in quotes.items()},
+    })
+
+
+class QuoteHub:
+    """Fans price changes out to the WebSocket connections subscribed to each symbol.
+
+    ``publish`` can be called from any thread; updates for connections served
+    by another event loop are handed over with ``call_soon_threadsafe``.
+    """
+
+    def __init__(self, store: PriceStore, send_timeout: float, max_lag: int):
+        self.store = store
+        self.send_timeout = send_timeout
+        self.max_lag = max_lag
+        self.messages_sent = 0
+        self.slow_consumers_dropped = 0
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+        self._connections = 0
+
+    def subscribe(self, subscription: Subscription) -> None:
+        self._connections += 1
+        for symbol in subscription.symbols:
+            self._subscribers[symbol].add(subscription)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._connections -= 1
+        for symbol in subscription.symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[symbol]
+
+    def publish(self, changes: dict[str, Quote]) -> None:
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+
+        subscribers = self._subscribers
+        for symbol, quote in changes.items():
+            for subscription in tuple(subscribers.get(symbol, ())):
+                if subscription.loop is current_loop:
+                    subscription.offer(symbol, quote)
+                else:
+                    subscription.loop.call_soon_threadsafe(subscription.offer, symbol, quote)
+
+    async def serve(self, websocket: WebSocket, symbols: Iterable[str], fallback: dict[str, Quote]) -> None:
+        subscription = Subscription(symbols, self.max_lag)
+        self.subscribe(subscription)
+
+        try:
+            # prices that have not ticked since startup come from the database rows
+            initial = {symbol: quote for symbol, quote in fallback.items() if symbol in subscription.symbols}
+            initial.update(self.store.snapshot(subscription.symbols))
+            await websocket.send_text(_message('snapshot', initial))
+
+            sender = asyncio.create_task(self._send_updates(websocket, subscription))
+            receiver = asyncio.create_task(self._drain(websocket))
+            done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.result()
+
+        except WebSocketDisconnect:
+            pass
+
+        finally:
+            self.unsubscribe(subscription)
+
+    async def _send_updates(self, websocket: WebSocket, subscription: Subscription) -> None:
+        while True:
+            batch = await subscription.next_batch()
+
+            if subscription.dropped:
+                self.slow_consumers_dropped += 1
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="slow consumer")
+                return
+
+            try:
+                await asyncio.wait_for(websocket.send_text(_message('delta', batch)), self.send_timeout)
+            except asyncio.TimeoutError:
+                self.slow_consumers_dropped += 1
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="slow consumer")
+                return
+
+            self.messages_sent += 1
+
+    @staticmethod
+    async def _drain(websocket: WebSocket) -> None:
+        # clients have nothing to send; reading is how a disconnect is noticed
+        # while no prices are changing
+        async for _ in websocket.iter_text():
+            pass
+
+    def stats(self) -> dict:
+        return {
+            'connections': self._connections,
+            'symbols': len(self._subscribers),
+            'messages_sent': self.messages_sent,
+            'slow_consumers_dropped': self.slow_consumers_dropped,
+        }
+
+
+price_store = PriceStore()
+quote_hub = QuoteHub(
+    store=price_store,
+    send_timeout=settings.QUOTE_SEND_TIMEOUT_SECONDS,
+    max_lag=settings.QUOTE_MAX_LAG,
+)
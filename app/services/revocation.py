@@ -0,0 +1,100 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.User import RefreshToken
+
+
+# rows revoked by other workers may commit with a slightly older revoked_at
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def _timestamp(value: datetime | None) -> float:
+    if value is None:
+        return float('inf')
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return value.timestamp()
+
+
+class RevocationFilter:
+    """In-process set of revoked refresh-token digests.
+
+    The set is loaded once and then refreshed incrementally from
+    ``revoked_at`` at most every ``sync_interval`` seconds, so checking a
+    live token normally costs no database round trip. Revocations made by
+    other workers are missed for up to ``sync_interval`` seconds.
+    """
+
+    def __init__(self, sync_interval: float):
+        self.sync_interval = sync_interval
+        self._revoked: dict[str, float] = {}
+        self._watermark: datetime | None = None
+        self._synced_at: float | None = None
+        self._lock = threading.Lock()
+
+    def add(self, digest: str, expires_at: datetime | None) -> None:
+        with self._lock:
+            self._revoked[digest] = _timestamp(expires_at)
+
+    def is_revoked(self, db: Session, digest: str) -> bool:
+        if self._synced_at is None or time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync(db)
+
+        return digest in self._revoked
+
+    def load(self, db: Session) -> None:
+        with self._lock:
+            self._revoked.clear()
+            self._watermark = None
+
+        self.sync(db)
+
+    def sync(self, db: Session) -> None:
+        # the query runs outside the lock: under AsyncSession.run_sync it yields to
+        # the event loop, and another coroutine on the same thread may sync too
+        now = datetime.now(timezone.utc)
+        watermark = self._watermark
+        query = db.query(
+            RefreshToken.token_hash, RefreshToken.expired_at, RefreshToken.revoked_at
+        ).filter(RefreshToken.revoked.is_(True))
+
+        if watermark is None:
+            query = query.filter(or_(RefreshToken.expired_at.is_(None), RefreshToken.expired_at > now))
+        else:
+            query = query.filter(RefreshToken.revoked_at >= watermark - SYNC_OVERLAP)
+
+        rows = query.all()
+
+        with self._lock:
+            for token_hash, expired_at, revoked_at in rows:
+                self._revoked[token_hash] = _timestamp(expired_at)
+                if revoked_at is not None and (watermark is None or revoked_at > watermark):
+                    watermark = revoked_at
+
+            self._watermark = watermark or now.replace(tzinfo=None)
+            self._synced_at = time.monotonic()
+            self._prune(now.timestamp())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._revoked.clear()
+            self._watermark = None
+            self._synced_at = None
+
+    def _prune(self, now: float) -> None:
+        expired = [digest for digest, expires_at in self._revoked.items() if expires_at <= now]
+        for digest in expired:
+            del self._revoked[digest]
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+revocation_filter = RevocationFilter(sync_interval=settings.REFRESH_REVOCATION_SYNC_SECONDS)
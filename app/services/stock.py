@@ -1,29 +1,379 @@
-from typing import List
-from sqlalchemy.orm import Session
-from typing import Type
-import pybreaker
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import AsyncIterator, Iterator, List
+from fastapi import HTTPException, status as http_status
+from sqlalchemy import and_, or_, event, select, Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, object_session
+from datetime import datetime, timezone
+import asyncio
+import base64
+import threading
 
-from app.models.stock import Holding, Order, Position
+from app.config import settings
+from app.core.breaker import AdaptiveCircuitBreaker
+from app.core.etag import version_registry
+from app.core.profiling import profiled
+from app.services import analytics
+from app.services.ledger import order_event, order_ledger
+from app.services.matching import OrderBook, matching_engine
+from app.services.persistence import write_behind
+from app.services.quotes import price_store, quote_hub
+from app.models.stock import Holding, Order, Position, OrderStatus, OrderType
+from app.schemas.stock import HoldingDTO, PositionDTO, OrderDTO
 
-circuit_breaker = pybreaker.CircuitBreaker(
-    fail_max=3,
-    reset_timeout=10
+# one breaker per read, so a failing or slow query only takes down the
+# endpoints that depend on it
+breakers = {
+    operation: AdaptiveCircuitBreaker(
+        name=operation,
+        fail_max=settings.BREAKER_FAIL_MAX,
+        reset_timeout=settings.BREAKER_RESET_TIMEOUT_SECONDS,
+        latency_threshold=(
+            settings.BREAKER_LATENCY_THRESHOLD_MS / 1000 if settings.BREAKER_LATENCY_THRESHOLD_MS else None
+        ),
+        latency_percentile=settings.BREAKER_LATENCY_PERCENTILE,
+        window=settings.BREAKER_LATENCY_WINDOW,
+    )
+    for operation in ('holdings', 'positions', 'orders')
+}
+
+STOCK_RESOURCES = {Holding: 'holdings', Position: 'positions', Order: 'orders'}
+
+# Reads select only the columns their DTO exposes and return plain rows, which
+# skips ORM entity construction and the identity map.
+HOLDING_COLUMNS = tuple(getattr(Holding, field) for field in HoldingDTO.model_fields)
+POSITION_COLUMNS = tuple(getattr(Position, field) for field in PositionDTO.model_fields)
+ORDER_COLUMNS = tuple(getattr(Order, field) for field in OrderDTO.model_fields)
+
+
+# ORM writes record which user resources changed; their ETag versions are
+# bumped only once the transaction commits so readers never cache old rows
+# under a new version.
+def _record_stock_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('stock_changes', set()).add((target.user_id, STOCK_RESOURCES[type(target)]))
+
+
+for _model in STOCK_RESOURCES:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _record_stock_change)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_stock_versions(session: Session):
+    for user_id, resource in session.info.pop('stock_changes', ()):
+        version_registry.bump(user_id, resource)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stock_changes(session: Session):
+    session.info.pop('stock_changes', None)
+
+
+# Session objects are not thread-safe, so each concurrent portfolio fetch
+# runs on its own session from this pool.
+portfolio_executor = ThreadPoolExecutor(
+    max_workers=settings.PORTFOLIO_FETCH_WORKERS,
+    thread_name_prefix='portfolio',
 )
 
+
+def encode_cursor(order: Row) -> str:
+    raw = f"{order.timestamp.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    timestamp, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return _as_utc_naive(datetime.fromisoformat(timestamp)), int(order_id)
+
+
+def _as_utc_naive(value: datetime) -> datetime:
+    # order timestamps are stored as naive UTC by both MySQL and SQLite
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 class StockService:
     def __init__(self, db: Session):
         self.db: Session = db
 
-    @circuit_breaker
-    def get_holdings(self, user_id: int) -> List[Type[Holding]]:
-        return self.db.query(Holding).filter(Holding.user_id == user_id).all()
+    @breakers['holdings']
+    def get_holdings(self, user_id: int) -> List[Row]:
+        return self.db.query(*HOLDING_COLUMNS).filter(Holding.user_id == user_id).all()
+
+    @breakers['positions']
+    def get_positions(self, user_id: int) -> List[Row]:
+        return self.db.query(*POSITION_COLUMNS).filter(Position.user_id == user_id).all()
+
+    @breakers['orders']
+    def get_orders(
+            self,
+            user_id: int,
+            limit: int | None = None,
+            cursor: tuple[datetime, int] | None = None,
+            symbol: str | None = None,
+            status: OrderStatus | None = None,
+            order_type: OrderType | None = None,
+            start: datetime | None = None,
+            end: datetime | None = None,
+    ) -> List[Row]:
+        query = self.db.query(*ORDER_COLUMNS).filter(Order.user_id == user_id)
+
+        if symbol:
+            query = query.filter(Order.symbol == symbol)
+        if status:
+            query = query.filter(Order.status == status)
+        if order_type:
+            query = query.filter(Order.order_type == order_type)
+        if start:
+            query = query.filter(Order.timestamp >= _as_utc_naive(start))
+        if end:
+            query = query.filter(Order.timestamp < _as_utc_naive(end))
+
+        if cursor:
+            timestamp, order_id = cursor
+            query = query.filter(or_(
+                Order.timestamp < timestamp,
+                and_(Order.timestamp == timestamp, Order.id < order_id),
+            ))
+
+        query = query.order_by(Order.timestamp.desc(), Order.id.desc())
+        if limit:
+            query = query.limit(limit)
+
+        return query.all()
+
+    def iter_order_batches(self, user_id: int, chunk_size: int = settings.ORDER_EXPORT_CHUNK_SIZE) -> Iterator[List[Row]]:
+        # streamed after the request's own session is closed, so the export
+        # owns a session for as long as the client keeps reading
+        session_factory = sessionmaker(bind=self.db.get_bind(), autoflush=False)
+
+        with session_factory() as db:
+            result = db.execute(
+                select(*ORDER_COLUMNS)
+                .where(Order.user_id == user_id)
+                .order_by(Order.timestamp, Order.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            for partition in result.partitions():
+                yield partition
+
+    def get_portfolio(self, user_id: int, orders_limit: int | None = None) -> dict:
+        session_factory = sessionmaker(bind=self.db.get_bind(), autoflush=False)
+
+        def fetch(method: str, **kwargs):
+            with session_factory() as db:
+                return getattr(StockService(db), method)(user_id, **kwargs)
+
+        # each fetch runs in a copy of the request's context, so its queries
+        # still count towards the request in /metrics and in its profile
+        fetch = profiled(fetch)
+        holdings = portfolio_executor.submit(copy_context().run, fetch, 'get_holdings')
+        positions = portfolio_executor.submit(copy_context().run, fetch, 'get_positions')
+        orders = portfolio_executor.submit(copy_context().run, fetch, 'get_orders', limit=orders_limit)
+
+        return {
+            'holdings': holdings.result(),
+            'positions': positions.result(),
+            'orders': orders.result(),
+        }
+
+    def get_analytics(self, user_id: int, group_by: str | None = None) -> dict:
+        return analytics.compute(self.get_holdings(user_id), self.get_positions(user_id), group_by=group_by)
+
+    def order_symbol(self, user_id: int, order_id: int) -> str:
+        # a recent order may still be waiting in the write-behind queue
+        row = write_behind.pending_row('orders', order_id)
+        if row is not None:
+            symbol = row['symbol'] if row['user_id'] == user_id else None
+        else:
+            symbol = self.db.scalar(select(Order.symbol).where(Order.id == order_id, Order.user_id == user_id))
+        if symbol is None:
+            raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Order not found")
+        return symbol
+
+    def place_order(self, user_id: int, symbol: str, order_type: OrderType, quantity: int, price: float) -> dict:
+        _require_matching()
+        book = matching_engine.book(symbol)
+        with book.lock:
+            return self._place_order(book, user_id, order_type, quantity, price)
+
+    def cancel_order(self, user_id: int, order_id: int) -> dict:
+        _require_matching()
+        book = matching_engine.book(self.order_symbol(user_id, order_id))
+        with book.lock:
+            return self._cancel_order(book, user_id, order_id)
+
+    def _place_order(self, book: OrderBook, user_id: int, order_type: OrderType, quantity: int, price: float) -> dict:
+        if order_type is OrderType.SELL:
+            held = order_ledger.account(self.db, user_id, book.symbol).quantity
+            if quantity > held - book.reserved(user_id):
+                raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail="Insufficient holdings")
+
+        order = order_ledger.open_order(self.db, user_id, book.symbol, order_type, quantity, price)
+        try:
+            fills = book.submit(order)
+            events = order_ledger.settle(self.db, order, fills)
+            write_behind.submit(events)
+        except Exception:
+            self._reload(book)
+            raise
+
+        if fills:
+            quote_hub.publish(price_store.update([(book.symbol, fills[-1].price)]))
+
+        # the taker's own event always comes first
+        return events[0]['row']
+
+    def _cancel_order(self, book: OrderBook, user_id: int, order_id: int) -> dict:
+        order = book.get(order_id)
+        if order is None or order.user_id != user_id:
+            # the book holds every open order, so anything else is either
+            # someone else's, already filled or canceled, or unknown
+            row = write_behind.pending_row('orders', order_id)
+            if row is not None:
+                owner = row['user_id']
+            else:
+                owner = self.db.scalar(select(Order.user_id).where(Order.id == order_id))
+            if owner != user_id:
+                raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Order not found")
+            raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail="Order is no longer open")
+
+        book.cancel(order_id)
+        event = order_event(order, OrderStatus.CANCELED)
+        try:
+            write_behind.submit([event])
+        except Exception:
+            self._reload(book)
+            raise
+
+        return event['row']
+
+    def _reload(self, book: OrderBook) -> None:
+        # the book and cached accounts may have moved past what was journaled,
+        # so rebuild both from the database once the queue has drained
+        try:
+            write_behind.flush()
+            matching_engine.load(self.db, book.symbol)
+        finally:
+            order_ledger.forget(book.symbol)
+
+
+def _sibling_sessions(db: AsyncSession) -> async_sessionmaker:
+    # extra sessions for the same request: same primary, same replica routing
+    return async_sessionmaker(
+        bind=db.bind, sync_session_class=db.sync_session_class, info=dict(db.info),
+        autoflush=False, expire_on_commit=False,
+    )
+
+
+def _require_matching() -> None:
+    if not matching_engine.enabled:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Order matching runs in another worker; run order placement on a single worker",
+        )
+
+
+async def _acquire_off_loop(lock: threading.Lock) -> None:
+    if lock.acquire(blocking=False):
+        return
+
+    acquiring = asyncio.ensure_future(asyncio.to_thread(lock.acquire))
+    try:
+        await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        # the worker thread still gets the lock; hand it straight back
+        acquiring.add_done_callback(lambda _: lock.release())
+        raise
+
+
+class AsyncStockService:
+    """StockService for DB_ASYNC mode, running the same queries through AsyncSession.run_sync."""
+
+    def __init__(self, db: AsyncSession):
+        self.db: AsyncSession = db
+
+    async def _run(self, method: str, *args, **kwargs):
+        return await self.db.run_sync(lambda session: getattr(StockService(session), method)(*args, **kwargs))
+
+    async def get_holdings(self, user_id: int) -> List[Row]:
+        return await self._run('get_holdings', user_id)
+
+    async def get_positions(self, user_id: int) -> List[Row]:
+        return await self._run('get_positions', user_id)
+
+    async def get_orders(self, user_id: int, **filters) -> List[Row]:
+        return await self._run('get_orders', user_id, **filters)
+
+    async def iter_order_batches(
+            self, user_id: int, chunk_size: int = settings.ORDER_EXPORT_CHUNK_SIZE
+    ) -> AsyncIterator[List[Row]]:
+        session_factory = _sibling_sessions(self.db)
+
+        async with session_factory() as db:
+            result = await db.stream(
+                select(*ORDER_COLUMNS)
+                .where(Order.user_id == user_id)
+                .order_by(Order.timestamp, Order.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            async for partition in result.partitions():
+                yield partition
+
+    async def get_portfolio(self, user_id: int, orders_limit: int | None = None) -> dict:
+        session_factory = _sibling_sessions(self.db)
+
+        async def fetch(method: str, **kwargs):
+            async with session_factory() as db:
+                return await AsyncStockService(db)._run(method, user_id, **kwargs)
+
+        holdings, positions, orders = await asyncio.gather(
+            fetch('get_holdings'),
+            fetch('get_positions'),
+            fetch('get_orders', limit=orders_limit),
+        )
+
+        return {'holdings': holdings, 'positions': positions, 'orders': orders}
+
+    async def get_analytics(self, user_id: int, group_by: str | None = None) -> dict:
+        holdings = await self.get_holdings(user_id)
+        positions = await self.get_positions(user_id)
+        return analytics.compute(holdings, positions, group_by=group_by)
+
+    async def _run_locked(self, book: OrderBook, method: str, *args):
+        # requests on this loop wait their turn on the asyncio lock, so the
+        # thread lock is normally free by the time they reach it
+        async with book.async_lock:
+            await _acquire_off_loop(book.lock)
+            try:
+                return await self._run(method, book, *args)
+            finally:
+                book.lock.release()
+
+    async def place_order(self, user_id: int, symbol: str, order_type: OrderType, quantity: int, price: float) -> dict:
+        _require_matching()
+        return await self._run_locked(matching_engine.book(symbol), '_place_order', user_id, order_type, quantity, price)
 
-    @circuit_breaker
-    def get_positions(self, user_id: int) -> List[Type[Position]]:
-        return self.db.query(Position).filter(Position.user_id == user_id).all()
+    async def cancel_order(self, user_id: int, order_id: int) -> dict:
+        _require_matching()
+        symbol = await self._run('order_symbol', user_id, order_id)
+        return await self._run_locked(matching_engine.book(symbol), '_cancel_order', user_id, order_id)
 
-    @circuit_breaker
-    def get_orders(self, user_id: int) -> List[Type[Order]]:
-        return self.db.query(Order).filter(Order.user_id == user_id).all()
 
+def portfolio_totals(holdings: List[Row], positions: List[Row]) -> dict:
+    invested_amount = sum(holding.quantity * holding.avg_price for holding in holdings)
+    market_value = sum(holding.quantity * holding.current_price for holding in holdings)
+    unrealized_pnl = sum(position.unrealized_pnl or 0.0 for position in positions)
 
+    return {
+        'invested_amount': invested_amount,
+        'market_value': market_value,
+        'holdings_pnl': market_value - invested_amount,
+        'unrealized_pnl': unrealized_pnl,
+        'total_pnl': market_value - invested_amount + unrealized_pnl,
+    }
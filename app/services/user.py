@@ -1,10 +1,37 @@
-from datetime import datetime
+import re
+from datetime import datetime, timezone
+from typing import Iterable, List
 from fastapi import HTTPException
+from sqlalchemy import event, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.config import settings
+from app.core.cache import TTLCache
 from app.core.security import AuthHelper
 from app.models.User import User, RefreshToken
-from app.schemas.user import UserRegister
+from app.schemas.user import AuthenticatedUser, UserRegister
+from app.services.revocation import revocation_filter
+
+
+# Snapshots of authenticated users keyed by id. Entries never outlive the access
+# token that loaded them; updates made by other workers show up within the TTL.
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    name='user',
+)
+
+
+# "UNIQUE constraint failed: users.email" (SQLite), "... for key 'users.ix_users_email'" (MySQL)
+_CONSTRAINT_PATTERN = re.compile(r"(?:constraint failed: |for key ')([\w.]+)")
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target: User):
+    user_cache.invalidate(target.id)
 
 
 class UserService:
@@ -24,23 +51,138 @@ class UserService:
         return self.db.query(User).filter(User.id == user_id).first()
 
 
+    def get_authenticated_user(self, user_id: int, expires_at: float | None = None) -> AuthenticatedUser | None:
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+
+        row = self.get_user_by_id(user_id)
+        if row is None:
+            return None
+
+        # an immutable copy, so concurrent requests never share an ORM instance
+        user = AuthenticatedUser.model_validate(row)
+        user_cache.set(user_id, user, expires_at)
+        return user
+
+
     def create_user(self, userData: UserRegister) -> User:
         hashed_password = self.auth_helper.get_password_hash(userData.password)
+        return self.insert_user(userData, hashed_password)
+
+
+    def insert_user(self, userData: UserRegister, hashed_password: str) -> User:
         new_user = User(
             username=userData.username,
             email=str(userData.email),
             hashed_password=hashed_password,
+            created_at=datetime.now(timezone.utc),
         )
 
         self.db.add(new_user)
+        try:
+            self.db.flush()
+        except IntegrityError as error:
+            self.db.rollback()
+            raise HTTPException(status_code=400, detail=self._conflict_detail(error, userData))
+
+        # every column is already known, so detach instead of reloading after commit
+        self.db.expunge(new_user)
         self.db.commit()
-        self.db.refresh(new_user)
 
         return new_user
 
 
+    def import_users(self, users: Iterable[UserRegister], chunk_size: int = 1000) -> dict:
+        created = skipped = 0
+        chunk: List[UserRegister] = []
+
+        for userData in users:
+            chunk.append(userData)
+            if len(chunk) >= chunk_size:
+                chunk_created, chunk_skipped = self._import_chunk(chunk)
+                created, skipped = created + chunk_created, skipped + chunk_skipped
+                chunk = []
+
+        if chunk:
+            chunk_created, chunk_skipped = self._import_chunk(chunk)
+            created, skipped = created + chunk_created, skipped + chunk_skipped
+
+        return {'created': created, 'skipped': skipped}
+
+
+    def _import_chunk(self, chunk: List[UserRegister]) -> tuple[int, int]:
+        emails = [str(userData.email) for userData in chunk]
+        usernames = [userData.username for userData in chunk]
+        existing = self.db.execute(
+            select(User.email, User.username).where(or_(User.email.in_(emails), User.username.in_(usernames)))
+        ).all()
+        taken_emails = {email for email, _ in existing}
+        taken_usernames = {username for _, username in existing}
+
+        fresh: List[UserRegister] = []
+        for userData in chunk:
+            if str(userData.email) in taken_emails or userData.username in taken_usernames:
+                continue
+
+            taken_emails.add(str(userData.email))
+            taken_usernames.add(userData.username)
+            fresh.append(userData)
+
+        if not fresh:
+            return 0, len(chunk)
+
+        hashed_passwords = self.auth_helper.get_password_hashes([userData.password for userData in fresh])
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                'username': userData.username,
+                'email': str(userData.email),
+                'hashed_password': hashed_password,
+                'created_at': now,
+            }
+            for userData, hashed_password in zip(fresh, hashed_passwords)
+        ]
+
+        try:
+            self.db.execute(insert(User), rows)
+            self.db.commit()
+            return len(rows), len(chunk) - len(rows)
+        except IntegrityError:
+            self.db.rollback()
+
+        # lost a race with a concurrent signup; fall back to row-by-row for this chunk
+        created = 0
+        for row in rows:
+            try:
+                self.db.execute(insert(User), [row])
+                self.db.commit()
+                created += 1
+            except IntegrityError:
+                self.db.rollback()
+
+        return created, len(chunk) - created
+
+
+    def _conflict_detail(self, error: IntegrityError, userData: UserRegister) -> str:
+        match = _CONSTRAINT_PATTERN.search(str(error.orig))
+        constraint = match.group(1) if match else ''
+
+        if 'email' in constraint:
+            return 'Email already registered'
+
+        # the database reports only the first violated index; a taken email still wins
+        if self.get_user_by_email(str(userData.email)):
+            return 'Email already registered'
+        return 'Username already registered'
+
+
     def store_refresh_token(self, token: str, user_id: int, expired_at: datetime):
-        db_token = RefreshToken(token=token, user_id=user_id, expired_at=expired_at)
+        db_token = RefreshToken(
+            token_hash=self.auth_helper.token_digest(token),
+            user_id=user_id,
+            expired_at=expired_at,
+        )
         self.db.add(db_token)
         self.db.commit()
         self.db.refresh(db_token)
@@ -48,21 +190,76 @@ class UserService:
         return db_token
 
     def is_token_revoked(self, token: str) -> bool:
-        db_token = self.db.query(RefreshToken).filter_by(token=token).first()
+        token_hash = self.auth_helper.token_digest(token)
+        if revocation_filter.is_revoked(self.db, token_hash):
+            return True
+
+        # tokens issued with a typ claim are always stored at login, so a miss in
+        # the revocation filter counts as live; a logout on another worker shows
+        # up at the next sync. Legacy tokens still hit the table.
+        if self.auth_helper.is_refresh_token(token):
+            return False
+
+        db_token = self.db.query(RefreshToken).filter_by(token_hash=token_hash).first()
         if not db_token:
 
             raise HTTPException(status_code=404, detail="Refresh token not found")
         return bool(db_token.revoked)
 
     def revoke_refresh_token(self, token: str) -> bool:
-        db_token = self.db.query(RefreshToken).filter_by(token=token).first()
+        token_hash = self.auth_helper.token_digest(token)
+        db_token = self.db.query(RefreshToken).filter_by(token_hash=token_hash).first()
 
         if not db_token:
             raise HTTPException(status_code=404, detail="Invalid token")
 
         db_token.revoked = True
+        db_token.revoked_at = datetime.now(timezone.utc)
         self.db.commit()
+        revocation_filter.add(token_hash, db_token.expired_at)
+        user_cache.invalidate(db_token.user_id)
         self.db.refresh(db_token)
         return bool(db_token.revoked)
 
 
+class AsyncUserService:
+    """UserService for DB_ASYNC mode.
+
+    Queries reuse the UserService implementation through AsyncSession.run_sync,
+    so both modes issue the same SQL; only password hashing is awaited separately.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db: AsyncSession = db
+        self.auth_helper: AuthHelper = AuthHelper()
+
+    async def _run(self, method: str, *args):
+        return await self.db.run_sync(lambda session: getattr(UserService(session), method)(*args))
+
+    async def get_user_by_email(self, email: str) -> User | None:
+        return await self._run('get_user_by_email', email)
+
+    async def get_user_by_username(self, username: str) -> User | None:
+        return await self._run('get_user_by_username', username)
+
+    async def get_user_by_id(self, user_id: int) -> User | None:
+        return await self._run('get_user_by_id', user_id)
+
+    async def get_authenticated_user(self, user_id: int, expires_at: float | None = None) -> AuthenticatedUser | None:
+        return await self._run('get_authenticated_user', user_id, expires_at)
+
+    async def create_user(self, userData: UserRegister) -> User:
+        hashed_password = await self.auth_helper.get_password_hash_async(userData.password)
+        return await self.insert_user(userData, hashed_password)
+
+    async def insert_user(self, userData: UserRegister, hashed_password: str) -> User:
+        return await self._run('insert_user', userData, hashed_password)
+
+    async def store_refresh_token(self, token: str, user_id: int, expired_at: datetime):
+        return await self._run('store_refresh_token', token, user_id, expired_at)
+
+    async def is_token_revoked(self, token: str) -> bool:
+        return await self._run('is_token_revoked', token)
+
+    async def revoke_refresh_token(self, token: str) -> bool:
+        return await self._run('revoke_refresh_token', token)
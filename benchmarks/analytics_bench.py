@@ -0,0 +1,86 @@
+"""Cost of computing /stock/analytics for large portfolios, per-row loop vs the columnar engine.
+
+    python -m benchmarks.analytics_bench [rows]
+
+Both sides start from the column rows StockService returns. "per-row" walks
+each row computing its metrics into a dict, the way clients used to; "columnar"
+is analytics.compute, which transposes the rows once and computes each metric
+with one comprehension over a column. Both are plain Python; only the
+computation is timed, not the query.
+"""
+import sys
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.stock import Holding, Position
+from app.services import analytics
+from app.services.stock import HOLDING_COLUMNS, POSITION_COLUMNS
+
+
+def per_row(holdings, positions) -> dict:
+    rows = []
+    for holding in holdings:
+        invested = holding.quantity * holding.avg_price
+        market = holding.quantity * holding.current_price
+        rows.append({
+            'symbol': holding.symbol,
+            'invested_amount': invested,
+            'market_value': market,
+            'pnl': market - invested,
+            'pnl_percent': (market - invested) / invested * 100 if invested else 0.0,
+        })
+    total_market = sum(row['market_value'] for row in rows)
+    for row in rows:
+        row['allocation_percent'] = row['market_value'] / total_market * 100 if total_market else 0.0
+
+    exposure = [
+        {'symbol': position.symbol, 'exposure': position.quantity * position.current_price}
+        for position in positions
+    ]
+    return {'holdings': rows, 'positions': exposure}
+
+
+def measure(fn, holdings, positions, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(holdings, positions)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(rows: int = 10000) -> None:
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[Holding.__table__, Position.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Holding.__table__), [
+            {'user_id': 1, 'symbol': f'SYM{i}', 'quantity': i % 100 + 1, 'avg_price': 100.0 + i, 'current_price': 101.0 + i}
+            for i in range(rows)
+        ])
+        conn.execute(insert(Position.__table__), [
+            # one position per symbol, as uq_positions_user_symbol requires
+            {'user_id': 1, 'symbol': f'SYM{i}', 'quantity': i % 50 + 1, 'entry_price': 50.0 + i,
+             'current_price': 52.0 + i, 'unrealized_pnl': 2.0 * (i % 50 + 1)}
+            for i in range(rows)
+        ])
+
+    with sessionmaker(bind=engine)() as db:
+        holdings = db.query(*HOLDING_COLUMNS).filter(Holding.user_id == 1).all()
+        positions = db.query(*POSITION_COLUMNS).filter(Position.user_id == 1).all()
+
+    row_loop = measure(per_row, holdings, positions)
+    columnar = measure(analytics.compute, holdings, positions)
+    grouped = measure(lambda h, p: analytics.compute(h, p, group_by='symbol'), holdings, positions)
+
+    print(f"rows:             {rows} holdings + {rows} positions")
+    print(f"per-row:          {row_loop * 1e3:8.2f} ms")
+    print(f"columnar:         {columnar * 1e3:8.2f} ms  ({row_loop / columnar:.1f}x)")
+    print(f"columnar+group:   {grouped * 1e3:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
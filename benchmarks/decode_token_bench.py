@@ -0,0 +1,30 @@
+"""Cold vs warm cost of AuthHelper.decode_token.
+
+    python -m benchmarks.decode_token_bench [iterations]
+"""
+import sys
+import timeit
+
+from app.core.security import AuthHelper, claims_cache
+
+
+def main(iterations: int = 20000) -> None:
+    auth_helper = AuthHelper()
+    token = auth_helper.encode_token({'sub': '42', 'username': 'bench', 'email': 'bench@example.com'})
+
+    maxsize = claims_cache.maxsize
+    claims_cache.maxsize = 0
+    cold = timeit.timeit(lambda: auth_helper.decode_token(token), number=iterations)
+
+    claims_cache.maxsize = maxsize
+    auth_helper.decode_token(token)
+    warm = timeit.timeit(lambda: auth_helper.decode_token(token), number=iterations)
+
+    print(f"iterations: {iterations}")
+    print(f"cold decode: {cold / iterations * 1e6:8.2f} us/op")
+    print(f"warm decode: {warm / iterations * 1e6:8.2f} us/op")
+    print(f"speedup:     {cold / warm:8.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
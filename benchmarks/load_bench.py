@@ -0,0 +1,332 @@
+"""HTTP load test of the auth and stock endpoints against a generated dataset.
+
+    python -m benchmarks.load_bench [--users 2000] [--seed 0] [--clients 32] [--duration 30] \\
+        [--workers 1] [--db PATH] [--url URL] [--output results.json] \\
+        [--baseline old.json] [--threshold 0.10] [--error-threshold 0.01]
+    python -m benchmarks.load_bench --compare old.json new.json [--threshold 0.10]
+
+Unless ``--url`` points at a running server, loads ``--users`` users into a
+SQLite file with ``python -m app.seeds`` (skipped if ``--db`` already exists)
+and boots the app on it under uvicorn. ``--clients`` concurrent clients then
+log in as random generated users and send a weighted mix of logins,
+refreshes and stock reads for ``--duration`` seconds. The generated users'
+ids are read from the database file; with ``--url`` and no ``--db`` they are
+assumed to be 1..``--users``. Each endpoint's error rate, RPS and client-side
+p50/p95/p99 are reported, along with database queries per request, which
+come from the server's /metrics. RPS and latencies count successful
+requests only, so fast failures cannot pass for a speed-up.
+
+With ``--baseline`` (or ``--compare``) an endpoint regresses when its p95
+grows, or its RPS drops, by more than ``--threshold``, or its error rate
+rises by more than ``--error-threshold``, and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+
+PASSWORD = "password123"
+# (method, path, weight); the paths double as the /metrics route labels
+MIX = (
+    ('POST', '/auth/login', 2),
+    ('GET', '/auth/refresh', 8),
+    ('GET', '/stock/holdings', 20),
+    ('GET', '/stock/positions', 20),
+    ('GET', '/stock/orders', 20),
+    ('GET', '/stock/portfolio', 20),
+    ('GET', '/stock/analytics', 10),
+)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def generated_user_ids(db_path: str) -> list[int]:
+    # app.seeds names each user after its id; other accounts in the file are skipped
+    with sqlite3.connect(f'file:{db_path}?mode=ro', uri=True) as conn:
+        rows = conn.execute("SELECT id FROM users WHERE email = 'user' || id || '@example.com' ORDER BY id").fetchall()
+    return [user_id for user_id, in rows]
+
+
+def start_server(args, db_path: str, workdir: str) -> tuple[subprocess.Popen, str]:
+    metrics_dir = os.path.join(workdir, 'metrics')
+    os.makedirs(metrics_dir, exist_ok=True)
+    env = {
+        **os.environ,
+        'DB_URL': f'sqlite:///{db_path}',
+        'SEED_ON_STARTUP': 'false',
+        'TOKEN_SWEEP_ENABLED': 'false',
+        'ORDER_JOURNAL_PATH': os.path.join(workdir, 'orders.journal'),
+        'PROMETHEUS_MULTIPROC_DIR': metrics_dir,
+    }
+
+    if not os.path.exists(db_path):
+        subprocess.run(
+            [sys.executable, '-m', 'app.seeds', str(args.users), '--seed', str(args.seed), '--password', PASSWORD],
+            env=env, check=True,
+        )
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port),
+         '--workers', str(args.workers), '--log-level', 'warning'],
+        env=env,
+    )
+    url = f'http://127.0.0.1:{port}'
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with status {server.returncode}")
+        try:
+            if httpx.get(f'{url}/health').status_code == 200:
+                return server, url
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError("server did not start within 60 s")
+
+
+async def scrape_queries(client: httpx.AsyncClient) -> dict[str, tuple[float, float]]:
+    # (queries, requests) per route, summed over status codes and workers
+    response = await client.get('/metrics')
+    totals: dict[str, list[float]] = {}
+    for family in text_string_to_metric_families(response.text):
+        if family.name != 'http_request_db_queries':
+            continue
+        for sample in family.samples:
+            key = f"{sample.labels['method']} {sample.labels['route']}"
+            if sample.name.endswith('_sum'):
+                totals.setdefault(key, [0.0, 0.0])[0] += sample.value
+            elif sample.name.endswith('_count'):
+                totals.setdefault(key, [0.0, 0.0])[1] += sample.value
+    return {key: (queries, requests) for key, (queries, requests) in totals.items()}
+
+
+class Client:
+    def __init__(self, http: httpx.AsyncClient, rng: random.Random, user_ids: list[int]):
+        self.http = http
+        self.rng = rng
+        self.user_ids = user_ids
+        self.access_token: str | None = None
+        self.refresh_token: str | None = None
+
+    async def login(self) -> httpx.Response:
+        user_id = self.rng.choice(self.user_ids)
+        response = await self.http.post(
+            '/auth/login', json={'email': f'user{user_id}@example.com', 'password': PASSWORD},
+        )
+        if response.status_code == 200:
+            body = response.json()
+            self.access_token, self.refresh_token = body['access_token'], body['refresh_token']
+        return response
+
+    async def send(self, method: str, path: str) -> httpx.Response:
+        if path == '/auth/login':
+            return await self.login()
+        if path == '/auth/refresh':
+            response = await self.http.get(path, headers={'Authorization': f'Bearer {self.refresh_token}'})
+            if response.status_code == 200:
+                self.access_token = response.json()['access_token']
+            return response
+        return await self.http.request(method, path, headers={'Authorization': f'Bearer {self.access_token}'})
+
+
+async def drive(client: Client, deadline: float, latencies: dict[str, list[float]], errors: dict[str, int]) -> None:
+    endpoints = [f'{method} {path}' for method, path, _ in MIX]
+    weights = [weight for _, _, weight in MIX]
+
+    await client.login()
+    while time.monotonic() < deadline:
+        endpoint = client.rng.choices(endpoints, weights)[0]
+        method, path = endpoint.split(' ', 1)
+        started = time.perf_counter()
+        try:
+            response = await client.send(method, path)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if failed:
+            errors[endpoint] += 1
+        else:
+            latencies[endpoint].append(time.perf_counter() - started)
+
+
+def summarise(samples: list[float], errors: int, elapsed: float) -> dict:
+    requests = len(samples) + errors
+    return {
+        'requests': requests,
+        'errors': errors,
+        'error_rate': round(errors / requests, 4) if requests else 0.0,
+        'rps': round(len(samples) / elapsed, 1),
+        'p50_ms': round(percentile(samples, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(samples, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 2),
+    }
+
+
+async def run(args, url: str, user_ids: list[int]) -> dict:
+    endpoints = [f'{method} {path}' for method, path, _ in MIX]
+    latencies: dict[str, list[float]] = {endpoint: [] for endpoint in endpoints}
+    errors = dict.fromkeys(endpoints, 0)
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+
+    async with httpx.AsyncClient(base_url=url, timeout=30, limits=limits) as http:
+        before = await scrape_queries(http)
+        started_at = datetime.now(timezone.utc).isoformat()
+        started = time.monotonic()
+        clients = [Client(http, random.Random(args.seed * 1000 + index), user_ids) for index in range(args.clients)]
+        await asyncio.gather(*(drive(client, started + args.duration, latencies, errors) for client in clients))
+        elapsed = time.monotonic() - started
+        after = await scrape_queries(http)
+
+    results = {}
+    for endpoint in endpoints:
+        queries, requests = (
+            after.get(endpoint, (0.0, 0.0))[index] - before.get(endpoint, (0.0, 0.0))[index] for index in (0, 1)
+        )
+        results[endpoint] = summarise(latencies[endpoint], errors[endpoint], elapsed) | {
+            'db_queries_per_request': round(queries / requests, 2) if requests else None,
+        }
+
+    everything = [sample for samples in latencies.values() for sample in samples]
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': started_at,
+            'users': len(user_ids),
+            'seed': args.seed,
+            'clients': args.clients,
+            'workers': args.workers,
+            'duration': round(elapsed, 1),
+        },
+        'total': summarise(everything, sum(errors.values()), elapsed),
+        'endpoints': results,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def report(results: dict) -> None:
+    print(
+        f"{'endpoint':24} {'requests':>9} {'errors':>7} {'err %':>6} {'rps':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}"
+    )
+    rows = [*results['endpoints'].items(), ('total', results['total'])]
+    for endpoint, stats in rows:
+        queries = stats.get('db_queries_per_request')
+        print(
+            f"{endpoint:24} {stats['requests']:9,} {stats['errors']:7,} {stats['error_rate']:6.1%} {stats['rps']:9,.1f} "
+            f"{stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} "
+            f"{'' if queries is None else f'{queries:8.2f}':>8}"
+        )
+
+
+def compare(baseline: dict, current: dict, threshold: float, error_threshold: float) -> list[str]:
+    regressions = []
+    for endpoint, now in [*current['endpoints'].items(), ('total', current['total'])]:
+        before = baseline['total'] if endpoint == 'total' else baseline['endpoints'].get(endpoint)
+        if not before or not before['requests'] or not now['requests']:
+            continue
+        if now['error_rate'] > before.get('error_rate', 0.0) + error_threshold:
+            regressions.append(f"{endpoint}: errors {before.get('error_rate', 0.0):.1%} -> {now['error_rate']:.1%}")
+        if before['p95_ms'] and now['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms")
+        if now['rps'] < before['rps'] * (1 - threshold):
+            regressions.append(f"{endpoint}: rps {before['rps']:,.1f} -> {now['rps']:,.1f}")
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path) as results:
+        return json.load(results)
+
+
+def check(baseline: dict, current: dict, threshold: float, error_threshold: float) -> int:
+    regressions = compare(baseline, current, threshold, error_threshold)
+    label = f"{baseline['meta'].get('commit')} -> {current['meta'].get('commit')}"
+    if not regressions:
+        print(f"no regressions beyond {threshold:.0%} ({label})")
+        return 0
+    print(f"regressions beyond {threshold:.0%} ({label}):")
+    for regression in regressions:
+        print(f"  {regression}")
+    return 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn workers')
+    parser.add_argument('--db', help='SQLite file to load into, or reuse if it exists')
+    parser.add_argument('--url', help='test a running server instead of booting one')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='results JSON to check this run against')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='only compare two results files')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed p95 growth / RPS drop')
+    parser.add_argument('--error-threshold', type=float, default=0.01, help='allowed error rate rise')
+    args = parser.parse_args()
+
+    if args.compare:
+        return check(load(args.compare[0]), load(args.compare[1]), args.threshold, args.error_threshold)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = None
+        db_path = args.db or os.path.join(workdir, 'load.db')
+        if args.url:
+            url = args.url
+        else:
+            server, url = start_server(args, db_path, workdir)
+        try:
+            user_ids = generated_user_ids(db_path) if os.path.exists(db_path) else list(range(1, args.users + 1))
+            if not user_ids:
+                raise SystemExit(f"no generated users in {db_path}")
+            results = asyncio.run(run(args, url, user_ids))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        return check(load(args.baseline), results, args.threshold, args.error_threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
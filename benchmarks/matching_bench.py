@@ -0,0 +1,118 @@
+"""Order matching throughput and latency.
+
+    python -m benchmarks.matching_bench [book_orders] [service_orders]
+
+"book" drives a single OrderBook with random limit orders around a moving
+mid price, one in five followed by a cancel of an earlier order, and times
+every submit. "service" places orders through StockService.place_order on an
+in-memory SQLite database, so it includes the fill bookkeeping and the fsync'd
+journal write; the write-behind queue is flushed every batch_size orders and
+that time is reported separately.
+"""
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.core.journal import Journal
+from app.models.stock import Holding, OrderType
+from app.services.ledger import order_ledger
+from app.services.matching import OrderBook, RestingOrder, matching_engine
+from app.services.persistence import write_behind
+from app.services.stock import StockService
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def report(name: str, latencies: list[float], elapsed: float, extra: str = '') -> None:
+    print(
+        f"{name:8} {len(latencies) / elapsed:12,.0f} orders/s   "
+        f"p50 {percentile(latencies, 0.50) * 1e6:8.1f} us   p99 {percentile(latencies, 0.99) * 1e6:8.1f} us   {extra}"
+    )
+
+
+def random_orders(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    mid = 100.0
+    for order_id in range(1, count + 1):
+        mid = max(1.0, mid + rng.gauss(0, 0.05))
+        side = OrderType.BUY if rng.random() < 0.5 else OrderType.SELL
+        offset = rng.gauss(0, 0.5)
+        price = round(mid - offset if side is OrderType.BUY else mid + offset, 2)
+        yield order_id, rng.randrange(1, 1000), side, price, rng.randrange(1, 100), rng
+
+
+def bench_book(count: int) -> None:
+    book = OrderBook('BENCH')
+    latencies = []
+    fills = 0
+    placed = []
+
+    started = time.perf_counter()
+    for order_id, user_id, side, price, quantity, rng in random_orders(count):
+        t0 = time.perf_counter()
+        matched = book.submit(RestingOrder(order_id, user_id, 'BENCH', side, price, quantity))
+        latencies.append(time.perf_counter() - t0)
+        fills += len(matched)
+        placed.append(order_id)
+        if rng.random() < 0.2:
+            book.cancel(placed[rng.randrange(len(placed))])
+    elapsed = time.perf_counter() - started
+
+    report('book', latencies, elapsed, f"{fills} fills, {len(book)} resting")
+
+
+def bench_service(count: int) -> None:
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # every trader starts with enough stock for any sell
+        conn.execute(insert(Holding.__table__), [
+            {'user_id': user_id, 'symbol': 'BENCH', 'quantity': 10 ** 9, 'avg_price': 100.0, 'current_price': 100.0}
+            for user_id in range(1, 1000)
+        ])
+
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    matching_engine.book('BENCH').clear()
+    order_ledger.forget()
+    write_behind.session_factory = session_factory
+    latencies = []
+    flushing = 0.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_behind.journal = Journal(f"{directory}/orders.journal")
+
+        started = time.perf_counter()
+        with session_factory() as db:
+            service = StockService(db)
+            for placed, (_, user_id, side, price, quantity, _) in enumerate(random_orders(count), 1):
+                t0 = time.perf_counter()
+                service.place_order(user_id, 'BENCH', side, quantity, price)
+                latencies.append(time.perf_counter() - t0)
+                if placed % write_behind.batch_size == 0:
+                    t0 = time.perf_counter()
+                    write_behind.flush()
+                    flushing += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        write_behind.flush()
+        flushing += time.perf_counter() - t0
+        elapsed = time.perf_counter() - started
+        write_behind.journal.close()
+
+    report('service', latencies, elapsed - flushing, f"flushes {flushing * 1e3:.0f} ms in total")
+
+
+def main(book_orders: int = 200000, service_orders: int = 2000) -> None:
+    bench_book(book_orders)
+    bench_service(service_orders)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
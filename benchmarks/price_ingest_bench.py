@@ -0,0 +1,77 @@
+"""Mark-to-market throughput: per-row ORM updates vs coalesced bulk UPDATEs.
+
+    python -m benchmarks.price_ingest_bench [symbols] [ticks]
+
+Every symbol has one holding and four positions. "per-row" applies each tick
+by loading the matching entities and assigning prices and P&L in Python;
+"bulk" feeds the same ticks through PriceIngestor.submit and flush.
+"""
+import random
+import sys
+import time
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.stock import Holding, Position
+from app.services.pricing import PriceIngestor
+
+
+def per_row(session_factory, ticks) -> int:
+    updated = 0
+    with session_factory() as db:
+        for symbol, price in ticks:
+            for holding in db.query(Holding).filter(Holding.symbol == symbol):
+                holding.current_price = price
+                updated += 1
+            for position in db.query(Position).filter(Position.symbol == symbol):
+                position.current_price = price
+                position.unrealized_pnl = (price - position.entry_price) * position.quantity
+                updated += 1
+        db.commit()
+    return updated
+
+
+def bulk(session_factory, ticks) -> int:
+    ingestor = PriceIngestor(session_factory, window=0, chunk_size=500)
+    ingestor.submit(ticks)
+    return ingestor.flush()
+
+
+def seed(engine, symbols: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(delete(Holding.__table__))
+        conn.execute(delete(Position.__table__))
+        conn.execute(insert(Holding.__table__), [
+            {'user_id': i, 'symbol': f'SYM{i}', 'quantity': 10, 'avg_price': 100.0, 'current_price': 100.0}
+            for i in range(symbols)
+        ])
+        conn.execute(insert(Position.__table__), [
+            {'user_id': i * 4 + n, 'symbol': f'SYM{i}', 'quantity': 5, 'entry_price': 100.0,
+             'current_price': 100.0, 'unrealized_pnl': 0.0}
+            for i in range(symbols) for n in range(4)
+        ])
+
+
+def main(symbols: int = 2000, tick_count: int = 10000) -> None:
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[Holding.__table__, Position.__table__])
+    session_factory = sessionmaker(bind=engine)
+
+    rng = random.Random(42)
+    ticks = [(f'SYM{rng.randrange(symbols)}', round(rng.uniform(50, 150), 2)) for _ in range(tick_count)]
+
+    print(f"symbols: {symbols}, ticks: {tick_count}")
+    for name, fn in (('per-row', per_row), ('bulk', bulk)):
+        seed(engine, symbols)
+        started = time.perf_counter()
+        rows = fn(session_factory, ticks)
+        elapsed = time.perf_counter() - started
+        print(f"{name:8} {elapsed * 1e3:9.1f} ms  {tick_count / elapsed:12,.0f} ticks/s  {rows / elapsed:12,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,72 @@
+"""Per-row cost of building a /stock/holdings response, before and after the column fast path.
+
+    python -m benchmarks.serialization_bench [rows]
+
+"before" loads ORM entities, runs HoldingDTO.model_validate per row, then
+re-validates and JSON-encodes the list the way FastAPI does for a List[...]
+return annotation. "after" selects the DTO columns as rows and builds the
+body with one TypeAdapter validate + dump_json pass.
+"""
+import json
+import sys
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.stock import Holding
+from app.schemas.stock import HoldingDTO, holdings_adapter, to_records
+from app.services.stock import HOLDING_COLUMNS
+
+
+def before(db, user_id: int) -> bytes:
+    holdings = db.query(Holding).filter(Holding.user_id == user_id).all()
+    dtos = [HoldingDTO.model_validate(holding) for holding in holdings]
+    adapter = TypeAdapter(List[HoldingDTO])
+    content = adapter.dump_python(adapter.validate_python(dtos), mode='json')
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def after(db, user_id: int) -> bytes:
+    rows = db.query(*HOLDING_COLUMNS).filter(Holding.user_id == user_id).all()
+    return holdings_adapter.dump_json(holdings_adapter.validate_python(to_records(rows), from_attributes=True))
+
+
+def measure(fn, session_factory, rows: int, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        with session_factory() as db:
+            started = time.perf_counter()
+            fn(db, 1)
+            best = min(best, time.perf_counter() - started)
+    return best / rows * 1e6
+
+
+def main(rows: int = 10000) -> None:
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[Holding.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Holding.__table__), [
+            {'user_id': 1, 'symbol': f'SYM{i}', 'quantity': i % 100 + 1, 'avg_price': 100.0 + i, 'current_price': 101.0 + i}
+            for i in range(rows)
+        ])
+
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        assert json.loads(before(db, 1)) == json.loads(after(db, 1))
+
+    cost_before = measure(before, session_factory, rows)
+    cost_after = measure(after, session_factory, rows)
+
+    print(f"rows:   {rows}")
+    print(f"before: {cost_before:6.2f} us/row")
+    print(f"after:  {cost_after:6.2f} us/row")
+    print(f"speedup {cost_before / cost_after:.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,101 @@
+"""Random-walk price tick generator for load testing the ingest and stream endpoints.
+
+    python -m benchmarks.tick_simulator --url http://localhost:8000 --api-key KEY \\
+        [--symbols AAPL,TSLA,...] [--rate 2000] [--batch 200] [--duration 30] \\
+        [--subscribers 50 --token ACCESS_TOKEN]
+
+Posts batches of ticks to /stock/prices at roughly ``rate`` ticks per second.
+With ``--subscribers`` it also opens that many /stock/prices/stream sockets for
+the token's user and reports delta messages received and tick-to-client delay.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+import websockets
+
+
+async def produce(client: httpx.AsyncClient, args, prices: dict[str, float], deadline: float) -> int:
+    interval = args.batch / args.rate
+    symbols = list(prices)
+    sent = 0
+
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        ticks = []
+        for symbol in random.choices(symbols, k=args.batch):
+            prices[symbol] = round(max(0.01, prices[symbol] * (1 + random.gauss(0, 0.001))), 2)
+            ticks.append({'symbol': symbol, 'price': prices[symbol]})
+
+        response = await client.post('/stock/prices', json={'ticks': ticks}, headers={'X-API-Key': args.api_key})
+        response.raise_for_status()
+        sent += len(ticks)
+
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    return sent
+
+
+async def subscribe(url: str, deadline: float, delays: list[float]) -> int:
+    messages = 0
+    async with websockets.connect(url) as websocket:
+        await websocket.recv()  # snapshot
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return messages
+            try:
+                message = json.loads(await asyncio.wait_for(websocket.recv(), remaining))
+            except asyncio.TimeoutError:
+                return messages
+
+            received_at = time.time()
+            messages += 1
+            delays.extend(received_at - quote['ts'] for quote in message['prices'].values() if quote['ts'])
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def main(args) -> None:
+    symbols = args.symbols.split(',') if args.symbols else [f'SYM{i}' for i in range(args.symbol_count)]
+    prices = {symbol: random.uniform(50, 3000) for symbol in symbols}
+    deadline = time.monotonic() + args.duration
+    stream_url = args.url.replace('http', 'ws', 1) + f'/stock/prices/stream?token={args.token}'
+    delays: list[float] = []
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=10) as client:
+        subscribers = [
+            asyncio.create_task(subscribe(stream_url, deadline, delays)) for _ in range(args.subscribers)
+        ] if args.subscribers and args.token else []
+        sent = await produce(client, args, prices, deadline)
+        received = sum(await asyncio.gather(*subscribers))
+        stats = (await client.get('/stock/prices/stats', headers={'X-API-Key': args.api_key})).json()
+
+    print(f"ticks sent:        {sent} ({sent / args.duration:,.0f}/s)")
+    if subscribers:
+        print(f"delta messages:    {received} across {len(subscribers)} subscribers")
+        print(f"tick->client p50:  {percentile(delays, 0.50) * 1e3:.1f} ms")
+        print(f"tick->client p99:  {percentile(delays, 0.99) * 1e3:.1f} ms")
+    print(f"server:            {json.dumps(stats)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--api-key', required=True)
+    parser.add_argument('--symbols', help='comma-separated; defaults to SYM0..SYMn')
+    parser.add_argument('--symbol-count', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=2000, help='ticks per second')
+    parser.add_argument('--batch', type=int, default=200, help='ticks per request')
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--subscribers', type=int, default=0)
+    parser.add_argument('--token', help='access token used by the stream subscribers')
+    asyncio.run(main(parser.parse_args()))
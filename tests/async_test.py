@@ -0,0 +1,117 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.core.database import get_db
+from app.main import app
+from app.models.User import User
+
+
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def async_client(client, monkeypatch):
+    async def override_get_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    monkeypatch.setattr(settings, 'DB_ASYNC', True)
+    app.dependency_overrides[get_db] = override_get_db
+
+    yield client
+
+    app.dependency_overrides.clear()
+
+
+def test_async_auth_and_stock_flow(async_client, db):
+    register = async_client.post('/auth/register', json={
+        "username": "async_user",
+        "email": "async_user@gmail.com",
+        "password": "TestPassword@123"
+    })
+    duplicate = async_client.post('/auth/register', json={
+        "username": "async_user",
+        "email": "async_user@gmail.com",
+        "password": "TestPassword@123"
+    })
+
+    login = async_client.post('/auth/login', json={
+        "email": "async_user@gmail.com",
+        "password": "TestPassword@123"
+    })
+    tokens = login.json()
+    access = {"Authorization": f"Bearer {tokens['access_token']}"}
+    refresh = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+
+    holdings = async_client.get('/stock/holdings', headers=access)
+    portfolio = async_client.get('/stock/portfolio', headers=access)
+    export = async_client.get('/stock/orders/export', params={"format": "csv"}, headers=access)
+    refreshed = async_client.get('/auth/refresh', headers=refresh)
+    logout = async_client.post('/auth/logout', headers=refresh)
+    after_logout = async_client.get('/auth/refresh', headers=refresh)
+
+    db.query(User).filter(User.username == "async_user").delete()
+    db.commit()
+
+    assert register.status_code == 200
+    assert duplicate.status_code == 400
+    assert duplicate.json()["detail"] == "Email already registered"
+    assert login.status_code == 200
+    assert holdings.status_code == 200
+    assert holdings.json() == []
+    assert portfolio.json()["totals"]["total_pnl"] == 0
+    assert export.text.startswith("id,user_id,symbol")
+    assert refreshed.status_code == 200
+    assert logout.json()["message"] == "logged out successfully"
+    assert after_logout.status_code == 401
+
+
+def test_async_place_and_cancel_order(async_client, db, test_user):
+    from app.dependencies import get_current_user
+    from app.models.stock import Order
+    from app.services.matching import matching_engine
+    from app.services.persistence import write_behind
+
+    app.dependency_overrides[get_current_user] = lambda: test_user
+
+    placed = async_client.post('/stock/orders', json={
+        "symbol": "ASYNC", "order_type": "BUY", "quantity": 3, "price": 10.0
+    })
+    canceled = async_client.delete(f"/stock/orders/{placed.json()['id']}")
+
+    write_behind.flush()
+    db.query(Order).filter(Order.symbol == "ASYNC").delete()
+    db.commit()
+
+    assert placed.status_code == 201
+    assert placed.json()["status"] == "PENDING"
+    assert canceled.json()["status"] == "CANCELED"
+    assert len(matching_engine.book("ASYNC")) == 0
+
+
+def test_cancelled_wait_for_book_lock_does_not_leak_it():
+    import asyncio
+    import threading
+
+    from app.services.stock import _acquire_off_loop
+
+    lock = threading.Lock()
+    lock.acquire()
+
+    async def scenario():
+        waiter = asyncio.create_task(_acquire_off_loop(lock))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # the holder finishes; the cancelled waiter's thread takes the lock and gives it back
+        lock.release()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+
+    assert lock.acquire(timeout=1)
+    lock.release()
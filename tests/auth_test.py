@@ -1,9 +1,13 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from urllib import response
 
-from app.schemas.user import UserRegister, UserLogin
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.user import AuthenticatedUser, UserRegister, UserLogin
 from app.core.security import AuthHelper
 from app.models.User import RefreshToken
+from app.services.revocation import revocation_filter
 
 
 def test_register_user(client):
@@ -34,6 +38,50 @@ def test_register_duplicate_user(client):
     assert response.json()["detail"] == "Email already registered"
 
 
+def test_register_duplicate_username(client):
+    client.post('/auth/register', json={
+        "username": "sanjay",
+        "email": "sanjay@gmail.com",
+        "password": "TestPassword@123"
+    })
+
+    response = client.post('/auth/register', json={
+        "username": "sanjay",
+        "email": "another@gmail.com",
+        "password": "TestPassword@123"
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already registered"
+
+
+def test_import_users_skips_existing_and_duplicate_rows(client, db):
+    from app.models.User import User
+    from app.services.user import UserService
+
+    client.post('/auth/register', json={
+        "username": "sanjay",
+        "email": "sanjay@gmail.com",
+        "password": "TestPassword@123"
+    })
+
+    users = [
+        UserRegister(username="sanjay", email="sanjay@gmail.com", password="pw"),
+        UserRegister(username="cohort_a", email="cohort_a@partner.com", password="pw"),
+        UserRegister(username="cohort_b", email="cohort_b@partner.com", password="pw"),
+        UserRegister(username="cohort_b", email="cohort_c@partner.com", password="pw"),
+    ]
+
+    result = UserService(db).import_users(users, chunk_size=3)
+
+    assert result == {'created': 2, 'skipped': 2}
+    imported = db.query(User).filter(User.username.in_(["cohort_a", "cohort_b"])).all()
+    assert len(imported) == 2
+    assert AuthHelper().verify_password("pw", imported[0].hashed_password)
+
+    db.query(User).filter(User.username.in_(["cohort_a", "cohort_b"])).delete()
+    db.commit()
+
+
 def test_login_success(client):
     client.post("/auth/register", json={
         "username": "sanjay",
@@ -98,9 +146,12 @@ def test_refresh_token_revoked(client, db):
 
     refresh_token = login_response.json()["refresh_token"]
 
-    db_token = db.query(RefreshToken).filter(RefreshToken.token==refresh_token).first()
+    token_hash = AuthHelper.token_digest(refresh_token)
+    db_token = db.query(RefreshToken).filter(RefreshToken.token_hash==token_hash).first()
     db_token.revoked = True
+    db_token.revoked_at = datetime.now(timezone.utc)
     db.commit()
+    revocation_filter.sync(db)
 
     response = client.get('/auth/refresh', headers={
         "Authorization": f"Bearer {refresh_token}"
@@ -110,6 +161,40 @@ def test_refresh_token_revoked(client, db):
     assert response.json()["detail"] == "Refresh token revoked"
 
 
+def test_refresh_token_revoked_by_another_worker(client, db, monkeypatch):
+    client.post('/auth/register', json= {
+        "username": "sanjay",
+        "email": "sanjay@gmail.com",
+        "password": "TestPassword@123"
+    })
+
+    login_response = client.post('/auth/login', json= {
+        "email": "sanjay@gmail.com",
+        "password": "TestPassword@123"
+    })
+
+    refresh_token = login_response.json()["refresh_token"]
+    revocation_filter.load(db)
+
+    # revoked behind this worker's back, before its filter syncs again
+    token_hash = AuthHelper.token_digest(refresh_token)
+    db_token = db.query(RefreshToken).filter(RefreshToken.token_hash==token_hash).first()
+    db_token.revoked = True
+    db_token.revoked_at = datetime.now(timezone.utc)
+    db.commit()
+
+    headers = {"Authorization": f"Bearer {refresh_token}"}
+
+    # within the sync window the filter still answers from memory
+    assert client.get('/auth/refresh', headers=headers).status_code == 200
+
+    monkeypatch.setattr(revocation_filter, 'sync_interval', 0)
+    response = client.get('/auth/refresh', headers=headers)
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Refresh token revoked"
+
+
 def test_logout(client):
     client.post('/auth/register', json= {
         "username": "sanjay",
@@ -155,4 +240,56 @@ def test_refresh_logged_out(client):
     })
 
     assert refresh_response.status_code == 401
-    assert refresh_response.json()["detail"] == "Refresh token revoked"
\ No newline at end of file
+    assert refresh_response.json()["detail"] == "Refresh token revoked"
+
+def test_authenticated_user_is_cached(client, db):
+    from app.models.User import User
+    from app.services.user import user_cache
+
+    client.post('/auth/register', json={
+        "username": "sanjay",
+        "email": "sanjay@gmail.com",
+        "password": "TestPassword@123"
+    })
+
+    login_response = client.post('/auth/login', json={
+        "email": "sanjay@gmail.com",
+        "password": "TestPassword@123"
+    })
+    access_token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    assert client.get('/stock/holdings', headers=headers).status_code == 200
+    assert client.get('/stock/holdings', headers=headers).status_code == 200
+
+    assert user_cache.misses == 1
+    assert user_cache.hits == 1
+
+    # requests share an immutable snapshot, not a detached ORM instance
+    cached = user_cache.get(db.query(User.id).filter(User.email == "sanjay@gmail.com").scalar())
+    assert isinstance(cached, AuthenticatedUser)
+    with pytest.raises(ValidationError):
+        cached.username = "someone-else"
+
+
+
+def test_refresh_with_access_token_is_rejected(client):
+    client.post('/auth/register', json={
+        "username": "sanjay",
+        "email": "sanjay@gmail.com",
+        "password": "TestPassword@123"
+    })
+
+    login_response = client.post('/auth/login', json={
+        "email": "sanjay@gmail.com",
+        "password": "TestPassword@123"
+    })
+
+    access_token = login_response.json()["access_token"]
+
+    response = client.get('/auth/refresh', headers={
+        "Authorization": f"Bearer {access_token}"
+    })
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Refresh token not found"
@@ -0,0 +1,33 @@
+import time
+
+from app.core.cache import TTLCache
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_cache_entry_expires_at_given_time():
+    cache = TTLCache(maxsize=10)
+    cache.set('live', 1, expires_at=time.time() + 60)
+    cache.set('dead', 2, expires_at=time.time() - 1)
+
+    assert cache.get('live') == 1
+    assert cache.get('dead') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cache_ttl_caps_entry_expiry():
+    cache = TTLCache(maxsize=10, ttl=0)
+    cache.set('key', 1, expires_at=time.time() + 60)
+
+    assert cache.get('key') is None
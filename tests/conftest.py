@@ -9,6 +9,14 @@ from app.dependencies import get_current_user, get_stock_service
 from app.main import app
 from app.models.User import User, RefreshToken
 from app.core.database import Base, get_db
+from app.core.etag import response_cache, stale_cache, version_registry
+from app.core.journal import Journal
+from app.core.querylog import query_monitor
+from app.services import analytics
+from app.services.ledger import order_ledger
+from app.services.persistence import write_behind
+from app.services.revocation import revocation_filter
+from app.services.user import user_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -25,10 +33,6 @@ class MockStockService:
                 quantity=15,
                 avg_price=145.20,
                 current_price=150.75,
-                invested_amount=2178.00,
-                market_value=2261.25,
-                profit=83.25,
-                pnl_percent=3.82,
                 created_at=datetime.utcnow(),
             ),
             SimpleNamespace(
@@ -38,10 +42,6 @@ class MockStockService:
                 quantity=5,
                 avg_price=2800.00,
                 current_price=2900.00,
-                invested_amount=14000.00,
-                market_value=14500.00,
-                profit=500.00,
-                pnl_percent=3.57,
                 created_at=datetime.now(timezone.utc),
             ),
         ]
@@ -59,7 +59,7 @@ class MockStockService:
             )
         ]
 
-    def get_orders(self, user_id: int):
+    def get_orders(self, user_id: int, **filters):
         return [
             SimpleNamespace(
                 id=1,
@@ -71,9 +71,20 @@ class MockStockService:
                 status="executed",
                 timestamp=datetime.now(timezone.utc),
                 realized_pnl=150.0,
+                filled_quantity=100,
             )
         ]
 
+    def get_portfolio(self, user_id: int, orders_limit: int | None = None):
+        return {
+            'holdings': self.get_holdings(user_id),
+            'positions': self.get_positions(user_id),
+            'orders': self.get_orders(user_id)[:orders_limit],
+        }
+
+    def get_analytics(self, user_id: int, group_by: str | None = None):
+        return analytics.compute(self.get_holdings(user_id), self.get_positions(user_id), group_by=group_by)
+
 
 @pytest.fixture(scope="session", autouse=True)
 def create_test_db():
@@ -91,6 +102,11 @@ def db():
         session.close()
 
 
+@pytest.fixture
+def session_factory():
+    return TestingSessionLocal
+
+
 @pytest.fixture
 def client(db):
     def override_get_db():
@@ -108,6 +124,47 @@ def test_user():
 def clear_refresh_tokens(db):
     db.query(RefreshToken).delete()
     db.commit()
+    revocation_filter.reset()
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    user_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache(monkeypatch):
+    # keep versions from rolling over mid-test
+    monkeypatch.setattr(version_registry, 'max_age', 10 ** 9)
+    response_cache.clear()
+    stale_cache.clear()
+    version_registry.clear()
+
+
+@pytest.fixture(autouse=True)
+def order_writes(monkeypatch, tmp_path):
+    # order writes go to the test database through a throwaway journal;
+    # tests flush the queue before checking the database
+    monkeypatch.setattr(write_behind, 'session_factory', TestingSessionLocal)
+    monkeypatch.setattr(write_behind, 'journal', Journal(str(tmp_path / 'orders.journal')))
+    order_ledger.forget()
+
+    yield write_behind
+
+    write_behind.journal.close()
+    write_behind.reset()
+    order_ledger.forget()
+
+
+@pytest.fixture(autouse=True)
+def repeated_queries(monkeypatch):
+    # a request that starts running one statement per row fails its test
+    monkeypatch.setattr(query_monitor, 'repeat_threshold', 5)
+    query_monitor.reset()
+
+    yield query_monitor
+
+    assert not query_monitor.recent_repeats, f"repeated statements: {list(query_monitor.recent_repeats)}"
 
 
 @pytest.fixture
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.hashing import HashingPool
+
+
+def test_pool_rejects_when_queue_is_full():
+    pool = HashingPool(workers=1, queue_depth=0, retry_after=2)
+    release = threading.Event()
+    running = pool.submit(release.wait)
+
+    with pytest.raises(HTTPException) as exc:
+        pool.submit(lambda: None)
+
+    release.set()
+    running.result()
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers == {'Retry-After': '2'}
+    assert pool.stats()['rejected'] == 1
+
+
+def test_pool_measures_queue_wait_and_hash_time_separately():
+    pool = HashingPool(workers=2, queue_depth=4, retry_after=1)
+
+    assert pool.map(str.upper, ['a', 'b', 'c']) == ['A', 'B', 'C']
+
+    stats = pool.stats()
+    assert stats['queue_wait']['count'] == 3
+    assert stats['hash_time']['count'] == 3
+
+
+def test_bulk_work_leaves_slots_for_interactive_calls():
+    pool = HashingPool(workers=2, queue_depth=0, retry_after=1, bulk_slots=1)
+    release = threading.Event()
+    bulk = threading.Thread(target=pool.map, args=(lambda _: release.wait(2), range(3)))
+    bulk.start()
+
+    # the bulk job holds one worker; the other still takes a login
+    assert pool.run(str.upper, 'a') == 'A'
+
+    release.set()
+    bulk.join()
+    assert pool.stats()['rejected'] == 0
+
+
+def test_register_does_not_hash_on_a_threadpool_thread(client, monkeypatch):
+    from app.core.security import AuthHelper
+
+    def blocking_hash(self, password):
+        raise AssertionError("register waited for the hashing pool on a threadpool thread")
+
+    monkeypatch.setattr(AuthHelper, 'get_password_hash', blocking_hash)
+    response = client.post('/auth/register', json={
+        "username": "threadpool",
+        "email": "threadpool@example.com",
+        "password": "TestPassword@123"
+    })
+
+    assert response.status_code == 200
@@ -0,0 +1,24 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.models.User import RefreshToken
+from app.services.maintenance import RefreshTokenSweeper
+
+
+def test_sweeper_purges_only_expired_tokens(db, session_factory):
+    now = datetime.now(timezone.utc)
+    db.add_all([
+        RefreshToken(token_hash=f"expired-{i}", user_id=1, expired_at=now - timedelta(days=1), revoked=i % 2 == 0)
+        for i in range(5)
+    ])
+    db.add_all([
+        RefreshToken(token_hash="live", user_id=1, expired_at=now + timedelta(days=1)),
+        RefreshToken(token_hash="live-revoked", user_id=1, expired_at=now + timedelta(days=1), revoked=True),
+    ])
+    db.commit()
+
+    sweeper = RefreshTokenSweeper(session_factory, batch_size=2, batch_delay=0, interval=0)
+
+    assert asyncio.run(sweeper.sweep()) == 5
+    assert sweeper.stats()['batch_latency']['count'] == 3
+    assert {token.token_hash for token in db.query(RefreshToken)} == {"live", "live-revoked"}
@@ -0,0 +1,159 @@
+import pytest
+from types import SimpleNamespace
+
+from app.core.journal import Journal
+from app.dependencies import get_current_user
+from app.main import app
+from app.models.stock import Holding, Order, OrderStatus, OrderType, Position
+from app.services.matching import MatchingEngine, OrderBook, RestingOrder, matching_engine
+from app.services.persistence import write_behind
+
+
+def order(order_id: int, user_id: int, side: OrderType, price: float, quantity: int) -> RestingOrder:
+    return RestingOrder(order_id, user_id, "INFY", side, price, quantity)
+
+
+def test_order_book_matches_in_price_time_priority():
+    book = OrderBook("INFY")
+    book.submit(order(1, 10, OrderType.SELL, 101.0, 5))
+    book.submit(order(2, 11, OrderType.SELL, 100.0, 5))
+    book.submit(order(3, 12, OrderType.SELL, 100.0, 5))
+    book.submit(order(4, 13, OrderType.SELL, 99.0, 5))
+    book.cancel(4)
+
+    taker = order(5, 20, OrderType.BUY, 100.5, 12)
+    fills = book.submit(taker)
+
+    assert [(fill.maker.id, fill.price, fill.quantity) for fill in fills] == [(2, 100.0, 5), (3, 100.0, 5)]
+    assert taker.remaining == 2
+    assert book.best_bid() == 100.5
+    assert book.best_ask() == 101.0
+    assert book.reserved(10) == 5 and book.reserved(11) == 0
+
+    taker = order(6, 10, OrderType.SELL, 100.0, 3)
+    fills = book.submit(taker)
+    assert [(fill.maker.id, fill.price, fill.quantity) for fill in fills] == [(5, 100.5, 2)]
+    assert taker.remaining == 1
+    assert book.reserved(10) == 6
+    assert len(book) == 2
+
+
+def test_order_book_compacts_cancelled_entries():
+    book = OrderBook("INFY")
+    for order_id in range(200):
+        book.submit(order(order_id, 1, OrderType.BUY, 50.0 + order_id % 7, 1))
+    for order_id in range(190):
+        book.cancel(order_id)
+
+    assert len(book) == 10
+    assert len(book._bids) < 200
+    assert book.best_bid() == max(50.0 + order_id % 7 for order_id in range(190, 200))
+
+
+@pytest.fixture
+def market(db):
+    users = {user_id: SimpleNamespace(id=user_id) for user_id in (1, 2)}
+    db.add(Holding(user_id=2, symbol="INFY", quantity=10, avg_price=100.0, current_price=100.0))
+    db.commit()
+
+    def act_as(user_id: int):
+        app.dependency_overrides[get_current_user] = lambda: users[user_id]
+
+    yield act_as
+
+    app.dependency_overrides.clear()
+    matching_engine.book("INFY").clear()
+    write_behind.flush()
+    for model in (Holding, Position, Order):
+        db.query(model).delete()
+    db.commit()
+
+
+def test_place_match_and_cancel_orders(client, db, market):
+    market(2)
+    resting = client.post("/stock/orders", json={"symbol": "INFY", "order_type": "SELL", "quantity": 6, "price": 110.0})
+    assert resting.status_code == 201
+    assert resting.json()["status"] == "PENDING"
+    assert resting.json()["filled_quantity"] == 0
+
+    oversold = client.post("/stock/orders", json={"symbol": "INFY", "order_type": "SELL", "quantity": 5, "price": 120.0})
+    assert oversold.status_code == 400
+
+    market(1)
+    taker = client.post("/stock/orders", json={"symbol": "INFY", "order_type": "BUY", "quantity": 4, "price": 112.0})
+    assert taker.status_code == 201
+    assert taker.json()["status"] == "EXECUTING"
+    assert taker.json()["filled_quantity"] == 4
+
+    # the fills are only in the journal until the queue flushes
+    assert db.get(Order, taker.json()["id"]) is None
+    write_behind.flush()
+
+    db.expire_all()
+    holdings = {h.user_id: h for h in db.query(Holding).filter(Holding.symbol == "INFY")}
+    assert (holdings[1].quantity, holdings[1].avg_price) == (4, 110.0)
+    assert holdings[2].quantity == 6
+    positions = {p.user_id: p.quantity for p in db.query(Position).filter(Position.symbol == "INFY")}
+    assert positions == {1: 4, 2: -4}
+
+    sell = db.get(Order, resting.json()["id"])
+    assert (sell.filled_quantity, sell.status, sell.realized_pnl) == (4, OrderStatus.PENDING, pytest.approx(40.0))
+
+    assert client.delete(f"/stock/orders/{sell.id}").status_code == 404
+
+    market(2)
+    canceled = client.delete(f"/stock/orders/{sell.id}")
+    assert canceled.status_code == 200
+    assert canceled.json()["status"] == "CANCELED"
+    assert client.delete(f"/stock/orders/{sell.id}").status_code == 409
+    assert len(matching_engine.book("INFY")) == 0
+
+    write_behind.flush()
+    db.expire_all()
+    assert db.get(Order, sell.id).status == OrderStatus.CANCELED
+
+
+def test_cancel_finds_orders_still_in_the_queue(client, market):
+    market(1)
+    placed = client.post("/stock/orders", json={"symbol": "INFY", "order_type": "BUY", "quantity": 2, "price": 90.0})
+    market(2)
+    assert client.delete(f"/stock/orders/{placed.json()['id']}").status_code == 404
+
+    market(1)
+    canceled = client.delete(f"/stock/orders/{placed.json()['id']}")
+    assert canceled.json()["status"] == "CANCELED"
+    assert client.delete(f"/stock/orders/{placed.json()['id']}").status_code == 409
+
+
+def test_engine_rebuilds_open_orders_from_database(db, market):
+    db.add_all([
+        Order(user_id=2, symbol="INFY", order_type=OrderType.SELL, quantity=5, price=105.0,
+              status=OrderStatus.PENDING, filled_quantity=2),
+        Order(user_id=1, symbol="INFY", order_type=OrderType.BUY, quantity=3, price=95.0,
+              status=OrderStatus.CANCELED, filled_quantity=0),
+    ])
+    db.commit()
+
+    engine = MatchingEngine()
+    engine.load(db)
+
+    book = engine.book("INFY")
+    assert len(book) == 1
+    assert book.best_ask() == 105.0
+    assert book.reserved(2) == 3
+
+
+def test_only_the_journal_owner_matches_orders(client, market, tmp_path, monkeypatch):
+    owner, other = Journal(str(tmp_path / "orders.journal")), Journal(str(tmp_path / "orders.journal"))
+    assert owner.claim()
+    assert not other.claim()
+
+    monkeypatch.setattr(matching_engine, 'enabled', False)
+    market(1)
+    refused = client.post("/stock/orders", json={"symbol": "INFY", "order_type": "BUY", "quantity": 1, "price": 90.0})
+    assert refused.status_code == 503
+    assert len(matching_engine.book("INFY")) == 0
+
+    owner.close()
+    assert other.claim()
+    other.close()
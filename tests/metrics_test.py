@@ -0,0 +1,71 @@
+import pathlib
+import subprocess
+import sys
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.dependencies import get_current_user
+from app.main import app
+
+
+def scrape(client) -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def sample(samples: dict, name: str, **labels) -> float:
+    return samples.get((name, tuple(sorted(labels.items()))), 0.0)
+
+
+def test_metrics_count_requests_and_queries(client, test_user):
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    route = {'method': 'GET', 'route': '/stock/orders'}
+
+    before = scrape(client)
+    assert client.get("/stock/orders").status_code == 200
+    assert client.get("/stock/orders", params={"cursor": "nope"}).status_code == 400
+    client.get("/no/such/path")
+    after = scrape(client)
+
+    app.dependency_overrides.clear()
+
+    def delta(name: str, **labels) -> float:
+        return sample(after, name, **labels) - sample(before, name, **labels)
+
+    assert delta('http_responses_total', status='200', **route) == 1
+    assert delta('http_responses_total', status='400', **route) == 1
+    assert delta('http_responses_total', method='GET', route='unmatched', status='404') == 1
+    assert delta('http_request_duration_seconds_count', **route) == 2
+    # the successful request ran its query; the rejected cursor never reached the database
+    assert delta('http_request_db_queries_sum', **route) == 1
+    assert delta('http_request_db_seconds_sum', **route) > 0
+    assert sample(after, 'circuit_breaker_state', breaker='orders') == 0
+
+
+def test_metrics_include_cache_lookups(authorized_client):
+    authorized_client.get("/stock/holdings")
+    authorized_client.get("/stock/holdings")
+
+    samples = scrape(authorized_client)
+    assert sample(samples, 'cache_lookups_total', cache='response', result='hit') >= 1
+    assert sample(samples, 'cache_lookups_total', cache='response', result='miss') >= 1
+
+
+def test_metrics_add_up_across_worker_processes(tmp_path):
+    env = {'PROMETHEUS_MULTIPROC_DIR': str(tmp_path)}
+    root = pathlib.Path(__file__).parent.parent
+    worker = "from app.core import metrics; metrics.responses.labels('GET', '/health', '200').inc()"
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', worker], env=env, cwd=root, check=True)
+
+    scraper = "from app.core import metrics; print(metrics.render()[0].decode())"
+    output = subprocess.run(
+        [sys.executable, '-c', scraper], env=env, cwd=root, check=True, capture_output=True, text=True,
+    ).stdout
+
+    assert 'http_responses_total{method="GET",route="/health",status="200"} 2.0' in output
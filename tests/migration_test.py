@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.core.security import AuthHelper
+from app.migrations.refresh_token_digest import upgrade
+
+
+def test_refresh_token_digest_migration(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE refresh_tokens (id INTEGER PRIMARY KEY, token VARCHAR(300) NOT NULL, '
+            'user_id INTEGER NOT NULL, created_at DATETIME, expired_at DATETIME, revoked BOOLEAN)'
+        ))
+        conn.execute(text('CREATE UNIQUE INDEX ix_refresh_tokens_token ON refresh_tokens (token)'))
+        conn.execute(text(
+            "INSERT INTO refresh_tokens (id, token, user_id, revoked) VALUES (1, 'a.b.c', 1, 1), (2, 'd.e.f', 1, 0)"
+        ))
+
+    upgrade(engine)
+    upgrade(engine)
+
+    columns = {column['name'] for column in inspect(engine).get_columns('refresh_tokens')}
+    assert 'token' not in columns
+    assert {'token_hash', 'revoked_at'} <= columns
+
+    with engine.connect() as conn:
+        rows = conn.execute(text('SELECT id, token_hash FROM refresh_tokens ORDER BY id')).all()
+
+    assert rows == [(1, AuthHelper.token_digest('a.b.c')), (2, AuthHelper.token_digest('d.e.f'))]
+
+
+def test_order_matching_migration(tmp_path):
+    from app.migrations.order_matching import upgrade as upgrade_order_matching
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE holdings (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, '
+            'symbol VARCHAR(20) NOT NULL UNIQUE, quantity INTEGER NOT NULL, avg_price FLOAT NOT NULL, '
+            'current_price FLOAT NOT NULL)'
+        ))
+        conn.execute(text('CREATE INDEX ix_holdings_id ON holdings (id)'))
+        conn.execute(text(
+            'CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, symbol VARCHAR(20) NOT NULL, '
+            'order_type VARCHAR(4) NOT NULL, quantity INTEGER NOT NULL, price FLOAT NOT NULL, '
+            'status VARCHAR(9) NOT NULL, timestamp DATETIME, realized_pnl FLOAT)'
+        ))
+        conn.execute(text("INSERT INTO holdings VALUES (1, 1, 'AAPL', 10, 150.0, 160.0)"))
+        conn.execute(text(
+            "INSERT INTO orders (id, user_id, symbol, order_type, quantity, price, status) VALUES "
+            "(1, 1, 'AAPL', 'BUY', 10, 150.0, 'EXECUTING'), (2, 1, 'AAPL', 'SELL', 4, 170.0, 'PENDING')"
+        ))
+
+    upgrade_order_matching(engine)
+    upgrade_order_matching(engine)
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO holdings VALUES (2, 2, 'AAPL', 5, 150.0, 160.0)"))
+        filled = conn.execute(text('SELECT id, filled_quantity FROM orders ORDER BY id')).all()
+
+    inspector = inspect(engine)
+    assert filled == [(1, 10), (2, 0)]
+    assert [c['column_names'] for c in inspector.get_unique_constraints('holdings')] == [['user_id', 'symbol']]
+    assert {'ix_holdings_id', 'ix_holdings_symbol'} <= {index['name'] for index in inspector.get_indexes('holdings')}
+    with engine.connect() as conn:
+        plan = conn.execute(text("EXPLAIN QUERY PLAN UPDATE holdings SET current_price = 1 WHERE symbol = 'AAPL'")).all()
+    assert 'ix_holdings_symbol' in str(plan)
+
+
+def test_positions_user_symbol_migration(tmp_path):
+    from app.migrations.positions_user_symbol import upgrade as upgrade_positions
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE positions (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, symbol VARCHAR(20) NOT NULL, '
+            'quantity INTEGER NOT NULL, entry_price FLOAT NOT NULL, current_price FLOAT NOT NULL, unrealized_pnl FLOAT)'
+        ))
+        conn.execute(text("INSERT INTO positions VALUES (1, 1, 'TCS', 5, 10.0, 10.0, 0), (2, 1, 'TCS', 2, 10.0, 10.0, 0)"))
+
+    with pytest.raises(RuntimeError, match="1/TCS"):
+        upgrade_positions(engine)
+
+    with engine.begin() as conn:
+        conn.execute(text('DELETE FROM positions WHERE id = 2'))
+    upgrade_positions(engine)
+    upgrade_positions(engine)
+
+    indexes = {index['name']: index for index in inspect(engine).get_indexes('positions')}
+    assert indexes['uq_positions_user_symbol']['unique']
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from app.core.journal import Journal
+from app.models.stock import Holding, Order, OrderStatus, OrderType, Position
+from app.services.ledger import Account, account_events, order_event
+from app.services.matching import RestingOrder
+from app.services.persistence import WriteBehindQueue
+
+
+def events(order_id: int, status: OrderStatus = OrderStatus.PENDING, held: int = 5) -> list[dict]:
+    order = RestingOrder(order_id, 7, "WBQ", OrderType.BUY, 10.0, 5, timestamp=datetime(2026, 1, 5, 9, 15))
+    if status is OrderStatus.EXECUTING:
+        order.remaining = 0
+    return [order_event(order, status)] + account_events(Account(7, "WBQ", held, 10.0, held, 10.0, 10.0))
+
+
+def clean(db):
+    db.query(Order).filter(Order.symbol == "WBQ").delete()
+    db.query(Holding).filter(Holding.symbol == "WBQ").delete()
+    db.query(Position).filter(Position.symbol == "WBQ").delete()
+    db.commit()
+
+
+def test_journal_replays_batches_after_the_last_checkpoint(tmp_path):
+    journal = Journal(str(tmp_path / "orders.journal"))
+    journal.append([{"n": 1}])
+    journal.checkpoint(journal.append([{"n": 2}]))
+    journal.append([{"n": 3}])
+    journal.close()
+
+    # a crash in the middle of a write leaves a torn line behind
+    with open(journal.path, "ab") as file:
+        file.write(b'{"seq": 4, "eve')
+
+    reopened = Journal(journal.path)
+    assert reopened.replay() == [{"n": 3}]
+    assert reopened.seq == 3
+    assert reopened.append([{"n": 4}]) == 4
+    assert reopened.replay() == [{"n": 3}, {"n": 4}]
+
+
+def test_queue_coalesces_rows_and_flushes_in_one_batch(session_factory, db, tmp_path):
+    queue = WriteBehindQueue(session_factory, Journal(str(tmp_path / "orders.journal")), batch_size=100, interval=1)
+    queue.submit(events(9001))
+    queue.submit(events(9001, OrderStatus.EXECUTING, held=8))
+
+    assert queue.pending() == 3
+    assert queue.pending_row("orders", 9001)["status"] == "EXECUTING"
+    assert queue.flush() == 3
+
+    assert db.get(Order, 9001).status == OrderStatus.EXECUTING
+    assert db.query(Holding).filter(Holding.symbol == "WBQ").one().quantity == 8
+    assert queue.journal.replay() == []
+
+    queue.submit(events(9001, OrderStatus.EXECUTING, held=0))
+    queue.flush()
+    db.expire_all()
+    assert db.query(Holding).filter(Holding.symbol == "WBQ").count() == 0
+    clean(db)
+
+
+def test_queue_recovers_unflushed_events_after_a_crash(session_factory, db, tmp_path):
+    path = str(tmp_path / "orders.journal")
+    crashed = WriteBehindQueue(session_factory, Journal(path), batch_size=100, interval=1)
+    crashed.submit(events(9002))
+    crashed.flush()
+    crashed.submit(events(9003))
+    crashed.journal.close()
+
+    restarted = WriteBehindQueue(session_factory, Journal(path), batch_size=100, interval=1)
+    assert restarted.recover() == 3
+    assert restarted.recover() == 0
+
+    assert {order.id for order in db.query(Order).filter(Order.symbol == "WBQ")} == {9002, 9003}
+    clean(db)
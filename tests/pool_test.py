@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core.pool import InstrumentedQueuePool
+
+
+def test_pool_records_waits_timeouts_and_invalidations(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    pool = engine.pool
+
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    released = threading.Timer(0.01, held.close)
+    released.start()
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        conn.invalidate()
+    released.join()
+
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['checkout_wait']['count'] == 3
+    assert stats['checkout_wait']['max_ms'] >= 40
+    assert stats['peak_checked_out'] == 1
+    assert stats['invalidations'] == 1
+    assert stats['connects'] == 1
+    assert stats['checked_out'] == 0
+
+    with engine.connect():
+        assert pool.stats()['connects'] == 2
+
+
+def test_pool_diagnostics(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, 'DIAGNOSTICS_API_KEY', "ops-secret")
+    response = client.get("/diagnostics/pool", headers={"X-API-Key": "ops-secret"})
+
+    assert response.status_code == 200
+    assert "primary" in response.json()
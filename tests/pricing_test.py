@@ -0,0 +1,92 @@
+import pytest
+
+from app.config import settings
+from app.core.etag import version_registry
+from app.models.stock import Holding, Position
+from app.services.pricing import PriceIngestor, price_ingestor
+
+
+@pytest.fixture
+def marked_book(db):
+    db.add_all([
+        Holding(user_id=1, symbol="AAPL", quantity=10, avg_price=150.0, current_price=160.0),
+        Holding(user_id=2, symbol="GOOG", quantity=8, avg_price=2800.0, current_price=2900.0),
+        Position(user_id=1, symbol="AAPL", quantity=20, entry_price=155.0, current_price=160.0, unrealized_pnl=100.0),
+        Position(user_id=2, symbol="AAPL", quantity=-5, entry_price=158.0, current_price=160.0, unrealized_pnl=-10.0),
+        Position(user_id=2, symbol="TCS", quantity=12, entry_price=3200.0, current_price=3300.0, unrealized_pnl=1200.0),
+    ])
+    db.commit()
+
+    yield
+
+    db.query(Holding).delete()
+    db.query(Position).delete()
+    db.commit()
+
+
+def test_ingestor_coalesces_ticks_and_recomputes_pnl(db, session_factory, marked_book):
+    ingestor = PriceIngestor(session_factory, window=0, chunk_size=1)
+
+    assert ingestor.submit([("AAPL", 161.0), ("GOOG", 2950.0), ("AAPL", 170.0), ("MSFT", 300.0)]) == 4
+    assert ingestor.pending() == 3
+
+    before = version_registry.version(1, ('holdings', 'positions'))
+    assert ingestor.flush() == 4
+    assert ingestor.flush() == 0
+    assert version_registry.version(1, ('holdings', 'positions')) != before
+
+    db.expire_all()
+    assert {h.symbol: h.current_price for h in db.query(Holding)} == {"AAPL": 170.0, "GOOG": 2950.0}
+    positions = {(p.user_id, p.symbol): p for p in db.query(Position)}
+    assert positions[(1, "AAPL")].unrealized_pnl == pytest.approx((170.0 - 155.0) * 20)
+    assert positions[(2, "AAPL")].unrealized_pnl == pytest.approx((170.0 - 158.0) * -5)
+    assert positions[(2, "TCS")].current_price == 3300.0
+
+    stats = ingestor.stats()
+    assert stats['ticks_received'] == 4
+    assert stats['symbols_applied'] == 3
+    assert stats['rows_updated'] == 4
+    assert stats['flush_latency']['count'] == 1
+    # the coalesced AAPL tick is received but never applied
+    assert stats['applied_per_second'] == pytest.approx(stats['received_per_second'] * 3 / 4, rel=0.05)
+
+
+def test_failed_flush_keeps_its_ticks_for_the_next_one(db, session_factory, marked_book, monkeypatch):
+    ingestor = PriceIngestor(session_factory, window=0, chunk_size=500)
+    ingestor.submit([("AAPL", 161.0), ("GOOG", 2950.0)])
+    apply = ingestor.apply
+
+    def failing_apply(prices):
+        # a newer AAPL tick lands while the doomed flush is running
+        ingestor.submit([("AAPL", 175.0)])
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(ingestor, 'apply', failing_apply)
+    with pytest.raises(RuntimeError):
+        ingestor.flush()
+
+    assert ingestor._pending == {"AAPL": 175.0, "GOOG": 2950.0}
+
+    monkeypatch.setattr(ingestor, 'apply', apply)
+    assert ingestor.flush() == 4
+    db.expire_all()
+    assert {h.symbol: h.current_price for h in db.query(Holding)} == {"AAPL": 175.0, "GOOG": 2950.0}
+
+
+def test_price_ingest_endpoint_requires_api_key(client, monkeypatch):
+    monkeypatch.setattr(settings, 'PRICE_INGEST_API_KEY', None)
+    body = {"ticks": [{"symbol": "AAPL", "price": 161.0}]}
+
+    assert client.post("/stock/prices", json=body, headers={"X-API-Key": ""}).status_code == 403
+
+    monkeypatch.setattr(settings, 'PRICE_INGEST_API_KEY', "ingest-secret")
+    assert client.post("/stock/prices", json=body, headers={"X-API-Key": "wrong"}).status_code == 403
+    assert client.post("/stock/prices", json={"ticks": [{"symbol": "AAPL", "price": -1}]},
+                       headers={"X-API-Key": "ingest-secret"}).status_code == 422
+
+    price_ingestor.reset()
+    response = client.post("/stock/prices", json=body, headers={"X-API-Key": "ingest-secret"})
+    price_ingestor.reset()
+
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 1, "pending_symbols": 1}
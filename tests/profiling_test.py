@@ -0,0 +1,124 @@
+import pytest
+
+from app.config import settings
+from app.core.profiling import profiler
+from app.dependencies import get_current_user
+from app.main import app
+
+
+@pytest.fixture
+def profiling(client, test_user, monkeypatch):
+    monkeypatch.setattr(settings, 'DIAGNOSTICS_API_KEY', "ops-secret")
+    monkeypatch.setattr(profiler, 'api_key', "ops-secret")
+    monkeypatch.setattr(profiler, 'enabled', True)
+    profiler.reset()
+    app.dependency_overrides[get_current_user] = lambda: test_user
+
+    yield client
+
+    app.dependency_overrides.clear()
+    profiler.reset()
+
+
+def test_profile_flag_is_ignored_while_disabled(client, test_user, monkeypatch):
+    monkeypatch.setattr(profiler, 'enabled', False)
+    app.dependency_overrides[get_current_user] = lambda: test_user
+
+    response = client.get("/stock/orders", headers={"X-Profile": "1", "X-API-Key": "anything"})
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_profiling_requires_the_diagnostics_key(profiling):
+    response = profiling.get("/stock/orders", headers={"X-Profile": "1", "X-API-Key": "wrong"})
+
+    assert response.status_code == 403
+    assert profiler.recent() == []
+
+
+def test_profiled_request_stores_call_tree_and_db_time(profiling):
+    response = profiling.get("/stock/orders", params={"profile": "1"}, headers={"X-API-Key": "ops-secret"})
+
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+
+    summary = profiling.get(f"/diagnostics/profiles/{profile_id}", headers={"X-API-Key": "ops-secret"}).json()
+    assert summary['path'] == "/stock/orders"
+    assert summary['status'] == 200
+    assert summary['db']['queries'] >= 1
+    assert any('FROM orders' in entry['statement'] for entry in summary['db']['statements'])
+    assert any('get_orders' in entry['function'] for entry in summary['functions'])
+
+    listed = profiling.get("/diagnostics/profiles", headers={"X-API-Key": "ops-secret"}).json()['profiles']
+    assert [entry['id'] for entry in listed] == [int(profile_id)]
+
+
+def test_profiling_is_rate_limited(profiling, monkeypatch):
+    monkeypatch.setattr(profiler, 'per_minute', 1)
+    headers = {"X-Profile": "1", "X-API-Key": "ops-secret"}
+
+    assert profiling.get("/stock/orders", headers=headers).status_code == 200
+    limited = profiling.get("/stock/orders", headers=headers)
+
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) > 0
+    # unprofiled requests are unaffected
+    assert profiling.get("/stock/orders").status_code == 200
+
+
+def test_unknown_profile_is_404(profiling):
+    response = profiling.get("/diagnostics/profiles/999", headers={"X-API-Key": "ops-secret"})
+
+    assert response.status_code == 404
+
+
+def test_overlapping_profiled_requests_are_refused(monkeypatch):
+    import asyncio
+
+    from app.core.profiling import ProfilingMiddleware
+
+    monkeypatch.setattr(profiler, 'api_key', "ops-secret")
+    monkeypatch.setattr(profiler, 'enabled', True)
+    profiler.reset()
+    entered, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        entered.set()
+        await release.wait()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+
+    middleware = ProfilingMiddleware(slow_app)
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': '/stock/orders', 'query_string': b'',
+        'headers': [(b'x-profile', b'1'), (b'x-api-key', b'ops-secret')],
+    }
+
+    async def request() -> dict:
+        started = {}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                started.update(message)
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        await middleware(scope, receive, send)
+        return started
+
+    async def scenario():
+        first = asyncio.create_task(request())
+        await entered.wait()
+        second = await request()
+        release.set()
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+    profiler.reset()
+
+    assert first['status'] == 200
+    assert any(name == b'x-profile-id' for name, _ in first['headers'])
+    assert second['status'] == 409
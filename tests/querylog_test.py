@@ -0,0 +1,93 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app.core.querylog import parameters_shape, query_monitor, query_scope
+from app.models.stock import Holding, Order, OrderStatus, OrderType, Position
+from app.models.User import User
+from app.services.stock import StockService
+from app.services.user import UserService
+
+
+def test_query_budgets(db):
+    # raise a budget only together with the change that needs the extra query
+    user = User(username="budget", email="budget@example.com", hashed_password="x", created_at=datetime.now(timezone.utc))
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    # several rows per table, so a per-row lazy load blows the budget
+    symbols = ["AAPL", "GOOG", "INFY", "TCS", "TSLA"]
+    rows = [
+        *(Holding(user_id=user_id, symbol=symbol, quantity=10, avg_price=100.0, current_price=110.0) for symbol in symbols),
+        *(Position(user_id=user_id, symbol=symbol, quantity=5, entry_price=100.0, current_price=90.0,
+                   unrealized_pnl=-50.0) for symbol in symbols),
+        *(Order(user_id=user_id, symbol=symbol, order_type=OrderType.BUY, quantity=10, price=100.0,
+                status=OrderStatus.EXECUTING, filled_quantity=10) for symbol in symbols),
+    ]
+    db.add_all(rows)
+    db.commit()
+    user_service, stock_service = UserService(db), StockService(db)
+
+    try:
+        with query_scope() as login:
+            user_service.get_user_by_email("budget@example.com")
+            user_service.store_refresh_token("token", user_id, datetime.now(timezone.utc) + timedelta(days=1))
+        assert login.count <= 3
+
+        with query_scope() as portfolio:
+            result = stock_service.get_portfolio(user_id)
+        assert [len(result[name]) for name in ('holdings', 'positions', 'orders')] == [5, 5, 5]
+        assert portfolio.count <= 3
+
+        with query_scope() as analytics:
+            result = stock_service.get_analytics(user_id)
+        assert len(result['holdings']) == 5
+        assert analytics.count <= 2
+    finally:
+        for row in rows:
+            db.delete(row)
+        db.delete(user)
+        db.commit()
+
+
+def test_slow_queries_are_logged_with_caller_and_parameter_shape(db, monkeypatch, caplog):
+    monkeypatch.setattr(query_monitor, 'slow_threshold', 0)
+
+    with caplog.at_level(logging.WARNING, logger='app.core.querylog'):
+        UserService(db).get_user_by_id(42)
+
+    entry = query_monitor.recent_slow[-1]
+    assert entry['caller'] == 'app.services.user.UserService.get_user_by_id'
+    assert entry['parameters'] == '(int, int, int)'
+    assert 'FROM users' in entry['statement']
+    assert 'app.services.user.UserService.get_user_by_id' in caplog.text
+
+
+def test_repeated_statements_are_flagged_once(db, monkeypatch):
+    monkeypatch.setattr(query_monitor, 'repeat_threshold', 2)
+    user_service = UserService(db)
+
+    with query_scope() as stats:
+        for user_id in range(4):
+            user_service.get_user_by_id(user_id)
+
+    assert stats.count == 4
+    assert list(stats.statements.values()) == [4]
+    assert query_monitor.repeated_statements == 1
+    assert query_monitor.recent_repeats[0]['caller'] == 'app.services.user.UserService.get_user_by_id'
+
+    # flagged on purpose; keep the suite-wide check from failing this test
+    query_monitor.reset()
+
+
+def test_queries_outside_a_scope_are_not_counted(db, monkeypatch):
+    monkeypatch.setattr(query_monitor, 'repeat_threshold', 0)
+
+    UserService(db).get_user_by_id(1)
+
+    assert query_monitor.repeated_statements == 0
+
+
+def test_parameters_shape_hides_values():
+    assert parameters_shape({'email': 'a@b.c', 'limit': 1}) == '{email: str, limit: int}'
+    assert parameters_shape([(1, 'x'), (2, 'y')], executemany=True) == '2 x (int, str)'
+    assert parameters_shape((), executemany=False) == '()'
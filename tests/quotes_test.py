@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.config import settings
+from app.dependencies import get_stock_service, get_websocket_user
+from app.main import app
+from app.services.pricing import price_ingestor
+from app.services.quotes import PriceStore, Subscription, price_store
+from conftest import MockStockService
+
+
+def test_price_store_reports_only_changed_prices():
+    store = PriceStore()
+
+    assert store.update([("AAPL", 150.0), ("TSLA", 700.0)], timestamp=1.0) == {
+        "AAPL": (150.0, 1.0), "TSLA": (700.0, 1.0),
+    }
+    assert store.update([("AAPL", 150.0), ("TSLA", 701.0)], timestamp=2.0) == {"TSLA": (701.0, 2.0)}
+    assert store.snapshot(["AAPL", "MSFT"]) == {"AAPL": (150.0, 1.0)}
+
+
+def test_subscription_coalesces_and_flags_slow_consumers():
+    async def scenario():
+        subscription = Subscription(["AAPL", "TSLA"], max_lag=2)
+        subscription.offer("AAPL", (150.0, 1.0))
+        subscription.offer("AAPL", (151.0, 2.0))
+        subscription.offer("TSLA", (700.0, 2.0))
+        batch = await subscription.next_batch()
+
+        for price in range(4):
+            subscription.offer("AAPL", (float(price), 3.0))
+        return batch, subscription.dropped
+
+    batch, dropped = asyncio.run(scenario())
+    assert batch == {"AAPL": (151.0, 2.0), "TSLA": (700.0, 2.0)}
+    assert dropped
+
+
+@pytest.fixture
+def stream_client(client, test_user, monkeypatch):
+    monkeypatch.setattr(settings, 'PRICE_INGEST_API_KEY', "ingest-secret")
+    app.dependency_overrides[get_websocket_user] = lambda: test_user
+    app.dependency_overrides[get_stock_service] = lambda: MockStockService()
+    price_store.clear()
+    price_ingestor.reset()
+
+    yield client
+
+    app.dependency_overrides.clear()
+    price_store.clear()
+    price_ingestor.reset()
+
+
+def test_price_stream_pushes_snapshot_then_deltas(stream_client):
+    with stream_client.websocket_connect("/stock/prices/stream?token=unused") as websocket:
+        snapshot = websocket.receive_json()
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["prices"]["AAPL"] == {"price": 150.75, "ts": None}
+        assert set(snapshot["prices"]) == {"AAPL", "GOOGL", "TSLA"}
+
+        response = stream_client.post(
+            "/stock/prices",
+            json={"ticks": [{"symbol": "MSFT", "price": 310.0}, {"symbol": "TSLA", "price": 333.3}]},
+            headers={"X-API-Key": "ingest-secret"},
+        )
+        assert response.status_code == 202
+
+        delta = websocket.receive_json()
+        assert delta["type"] == "delta"
+        assert list(delta["prices"]) == ["TSLA"]
+        assert delta["prices"]["TSLA"]["price"] == 333.3
+
+
+def test_price_stream_rejects_invalid_token(client):
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/stock/prices/stream?token=not-a-jwt") as websocket:
+            websocket.receive_json()
+
+    assert exc_info.value.code == 1008
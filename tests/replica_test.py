@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, ReplicaSet, RoutingSession, get_db, read_as, recent_writes
+from app.models.stock import Holding
+
+
+def sqlite_engine(path):
+    return create_engine(f"sqlite:///{path}", connect_args={'check_same_thread': False})
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    # two files stand in for a primary and a replica that has not caught up
+    primary, replica = sqlite_engine(tmp_path / "primary.db"), sqlite_engine(tmp_path / "replica.db")
+    for engine, quantity in ((primary, 2), (replica, 1)):
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(Holding.__table__.insert(), {
+                'user_id': 1, 'symbol': 'INFY', 'quantity': quantity, 'avg_price': 1.0, 'current_price': 1.0,
+            })
+
+    class Session(RoutingSession):
+        replicas = ReplicaSet([replica], eject_seconds=60)
+
+    recent_writes.clear()
+    yield SimpleNamespace(primary=primary, replica=replica, sessions=sessionmaker(bind=primary, class_=Session))
+    recent_writes.clear()
+
+
+def held(db) -> int:
+    return db.query(Holding.quantity).filter(Holding.user_id == 1).scalar()
+
+
+def test_reads_use_the_replica_only_when_asked(cluster):
+    with cluster.sessions(info={'replica': True}) as db:
+        assert held(db) == 1
+    with cluster.sessions() as db:
+        assert held(db) == 2
+
+
+def test_session_reads_its_own_writes_from_the_primary(cluster):
+    with cluster.sessions(info={'replica': True}) as db:
+        db.add(Holding(user_id=1, symbol='TCS', quantity=5, avg_price=1.0, current_price=1.0))
+        db.flush()
+        assert db.query(Holding).count() == 2
+        db.commit()
+
+
+def test_user_reads_primary_right_after_a_commit(cluster):
+    with cluster.sessions(info={'replica': True}) as db:
+        read_as(db, 1)
+        db.query(Holding).filter(Holding.symbol == 'INFY').update({'quantity': 3})
+        db.commit()
+
+    with cluster.sessions(info={'replica': True}) as db:
+        read_as(db, 1)
+        assert held(db) == 3
+    with cluster.sessions(info={'replica': True}) as db:
+        read_as(db, 2)
+        assert held(db) == 1
+
+
+def test_failed_replica_is_ejected(cluster, tmp_path):
+    broken = sqlite_engine(tmp_path / "missing" / "replica.db")
+
+    class Session(RoutingSession):
+        replicas = ReplicaSet([broken, cluster.replica], eject_seconds=60)
+
+    replicas = Session.replicas
+    sessions = sessionmaker(bind=cluster.primary, class_=Session)
+
+    with sessions(info={'replica': True}) as db, pytest.raises(OperationalError):
+        held(db)
+
+    picks = {replicas.choose() for _ in range(4)}
+    assert picks == {cluster.replica}
+    assert [replica['healthy'] for replica in replicas.stats()] == [False, True]
+
+    replicas.eject(cluster.replica)
+    assert replicas.choose() is None
+    with sessions(info={'replica': True}) as db:
+        assert held(db) == 2
+
+
+def test_only_read_requests_are_routed_to_replicas():
+    for method, replica in (('GET', True), ('POST', False)):
+        dependency = get_db(SimpleNamespace(scope={'type': 'http', 'method': method}))
+        db = next(dependency)
+        assert db.info['replica'] is replica
+        dependency.close()
+
+
+def test_replica_diagnostics(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, 'DIAGNOSTICS_API_KEY', "ops-secret")
+    response = client.get("/diagnostics/replicas", headers={"X-API-Key": "ops-secret"})
+    assert response.status_code == 200
+    assert response.json() == {'replicas': []}
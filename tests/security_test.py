@@ -0,0 +1,35 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import AuthHelper, claims_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_claims_cache():
+    claims_cache.clear()
+
+
+def test_decode_token_reuses_verified_claims():
+    auth_helper = AuthHelper()
+    token = auth_helper.encode_token({'sub': '1', 'username': 'sanjay', 'email': 'sanjay@gmail.com'})
+
+    first = auth_helper.decode_token(token)
+    second = auth_helper.decode_token(token)
+
+    assert second is first
+    assert claims_cache.hits == 1
+    assert claims_cache.misses == 1
+
+
+def test_cached_claims_expire_with_the_token():
+    auth_helper = AuthHelper()
+    auth_helper.access_token_expires_minutes = -1
+    token = auth_helper.encode_token({'sub': '1'})
+    claims_cache.set(auth_helper.token_digest(token), object(), expires_at=time.time())
+
+    with pytest.raises(HTTPException) as exc:
+        auth_helper.decode_token(token)
+
+    assert exc.value.detail == 'Token Expired'
@@ -0,0 +1,66 @@
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.pool import StaticPool
+
+from app.models.stock import Holding, Order, OrderStatus, OrderType, Position
+from app.models.User import User
+from app.seeds import generate
+
+
+def memory_engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+def dump(engine) -> dict:
+    with engine.connect() as conn:
+        return {
+            'users': conn.execute(select(User.id, User.username, User.created_at).order_by(User.id)).all(),
+            'holdings': conn.execute(select(Holding.user_id, Holding.symbol, Holding.quantity).order_by(Holding.id)).all(),
+            'positions': conn.execute(select(Position.user_id, Position.symbol, Position.quantity).order_by(Position.id)).all(),
+            'orders': conn.execute(select(Order).order_by(Order.id)).all(),
+        }
+
+
+def test_generate_is_deterministic_per_seed():
+    first, second, other = memory_engine(), memory_engine(), memory_engine()
+
+    counts = generate(200, seed=7, chunk_size=100, engine=first, report=False)
+    generate(200, seed=7, chunk_size=100, engine=second, report=False)
+    generate(200, seed=8, chunk_size=100, engine=other, report=False)
+
+    rows = dump(first)
+    assert rows == dump(second)
+    assert rows != dump(other)
+    assert counts == {name: len(table_rows) for name, table_rows in rows.items()}
+    assert counts['users'] == 200 and counts['orders'] > counts['users']
+
+
+def test_generate_appends_after_existing_rows_and_resets():
+    engine = memory_engine()
+    generate(20, seed=1, engine=engine, report=False)
+    generate(20, seed=2, engine=engine, report=False)
+
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count(), func.max(User.id)).select_from(User)).one() == (40, 40)
+
+    generate(5, seed=1, reset=True, engine=engine, report=False)
+
+    with engine.connect() as conn:
+        assert conn.execute(select(func.min(User.id), func.max(User.id))).one() == (1, 5)
+        assert conn.execute(select(func.count()).where(Order.user_id > 5)).scalar() == 0
+
+
+def test_generated_resting_orders_never_cross():
+    engine = memory_engine()
+    generate(300, seed=3, engine=engine, report=False)
+
+    with engine.connect() as conn:
+        pending = conn.execute(
+            select(Order.symbol, Order.order_type, func.min(Order.price), func.max(Order.price))
+            .where(Order.status == OrderStatus.PENDING)
+            .group_by(Order.symbol, Order.order_type)
+        ).all()
+
+    best_bid = {symbol: high for symbol, side, _, high in pending if side == OrderType.BUY}
+    best_ask = {symbol: low for symbol, side, low, _ in pending if side == OrderType.SELL}
+    assert pending
+    assert all(best_bid[symbol] < ask for symbol, ask in best_ask.items() if symbol in best_bid)
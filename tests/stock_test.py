@@ -17,7 +17,8 @@ def raise_unauthorized():
 
     "/stock/holdings",
     "/stock/positions",
-    "/stock/orders"
+    "/stock/orders",
+    "/stock/analytics",
 ])
 def test_unauthorized_access(client: TestClient, endpoint: str):
     app.dependency_overrides[get_current_user] = raise_unauthorized
@@ -63,4 +64,339 @@ def test_get_orders_authenticated(authorized_client):
     assert len(data) == 1
 
     assert data[0]["symbol"] == "MSFT"
-    assert data[0]["status"] == "executed"
\ No newline at end of file
+    assert data[0]["status"] == "executed"
+
+@pytest.fixture
+def order_history(db):
+    from datetime import datetime, timedelta
+    from app.models.stock import Order, OrderType, OrderStatus
+
+    base = datetime(2024, 1, 1)
+    orders = [
+        Order(user_id=1, symbol="AAPL" if i % 2 else "TSLA", order_type=OrderType.BUY, quantity=1,
+              price=100.0 + i, status=OrderStatus.EXECUTING, timestamp=base + timedelta(days=i // 2),
+              realized_pnl=0.0)
+        for i in range(5)
+    ]
+    db.add_all(orders)
+    db.commit()
+
+    yield orders
+
+    db.query(Order).delete()
+    db.commit()
+
+
+def test_get_orders_paginates_newest_first(client, test_user, order_history):
+    app.dependency_overrides[get_current_user] = lambda: test_user
+
+    first = client.get("/stock/orders", params={"limit": 3})
+    second = client.get("/stock/orders", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+
+    app.dependency_overrides.clear()
+
+    assert [order["id"] for order in first.json()] == [o.id for o in reversed(order_history)][:3]
+    assert [order["id"] for order in second.json()] == [o.id for o in reversed(order_history)][3:]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_get_orders_filters(client, test_user, order_history):
+    app.dependency_overrides[get_current_user] = lambda: test_user
+
+    response = client.get("/stock/orders", params={"symbol": "AAPL", "start": "2024-01-02T00:00:00"})
+    bad_cursor = client.get("/stock/orders", params={"cursor": "not-a-cursor"})
+
+    app.dependency_overrides.clear()
+
+    assert [order["id"] for order in response.json()] == [order_history[3].id]
+    assert bad_cursor.status_code == 400
+
+
+def test_get_portfolio_authenticated(authorized_client):
+    response = authorized_client.get("/stock/portfolio")
+    assert response.status_code == 200
+
+    data = response.json()
+    assert [holding["symbol"] for holding in data["holdings"]] == ["AAPL", "GOOGL"]
+    assert [position["symbol"] for position in data["positions"]] == ["TSLA"]
+    assert [order["symbol"] for order in data["orders"]] == ["MSFT"]
+    assert data["totals"]["invested_amount"] == pytest.approx(15 * 145.20 + 5 * 2800.00)
+    assert data["totals"]["market_value"] == pytest.approx(15 * 150.75 + 5 * 2900.00)
+    assert data["totals"]["unrealized_pnl"] == pytest.approx(95.0)
+
+
+def test_get_portfolio_fetches_from_database(client, test_user, order_history):
+    app.dependency_overrides[get_current_user] = lambda: test_user
+
+    response = client.get("/stock/portfolio", params={"orders_limit": 2})
+
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [order["id"] for order in response.json()["orders"]] == [o.id for o in reversed(order_history)][:2]
+
+
+def test_get_analytics_authenticated(authorized_client):
+    response = authorized_client.get("/stock/analytics")
+    assert response.status_code == 200
+
+    data = response.json()
+    aapl, googl = data["holdings"]
+    assert aapl["invested_amount"] == pytest.approx(15 * 145.20)
+    assert aapl["market_value"] == pytest.approx(15 * 150.75)
+    assert aapl["pnl_percent"] == pytest.approx((150.75 - 145.20) / 145.20 * 100)
+    assert aapl["allocation_percent"] + googl["allocation_percent"] == pytest.approx(100)
+    assert data["positions"][0]["exposure"] == pytest.approx(10 * 330.00)
+    assert data["totals"]["pnl"] == pytest.approx(15 * (150.75 - 145.20) + 5 * 100.00)
+    assert data["by_symbol"] is None
+
+
+def test_get_analytics_grouped_by_symbol(authorized_client):
+    response = authorized_client.get("/stock/analytics", params={"group_by": "symbol"})
+    assert response.status_code == 200
+
+    groups = response.json()["by_symbol"]
+    assert [group["symbol"] for group in groups] == ["GOOGL", "TSLA", "AAPL"]
+    assert sum(group["allocation_percent"] for group in groups) == pytest.approx(100)
+    assert groups[1]["pnl"] == pytest.approx(95.0)
+
+
+def test_analytics_accepts_orm_rows_and_empty_portfolios(db, test_user):
+    from app.models.stock import Holding
+    from app.services.stock import StockService
+
+    db.add(Holding(user_id=test_user.id, symbol="INFY", quantity=4, avg_price=10.0, current_price=12.5))
+    db.commit()
+
+    try:
+        analytics = StockService(db).get_analytics(test_user.id, group_by="symbol")
+    finally:
+        db.query(Holding).delete()
+        db.commit()
+
+    assert analytics["holdings"][0]["pnl"] == pytest.approx(10.0)
+    assert analytics["holdings"][0]["allocation_percent"] == pytest.approx(100)
+    assert analytics["by_symbol"] == [
+        {"symbol": "INFY", "quantity": 4, "market_value": 50.0, "pnl": 10.0, "allocation_percent": 100.0}
+    ]
+    assert StockService(db).get_analytics(test_user.id + 1)["totals"]["pnl_percent"] == 0.0
+
+
+def test_circuit_breaker_does_not_serialise_calls():
+    import threading
+    from app.core.breaker import CircuitBreaker
+
+    breaker = CircuitBreaker(fail_max=3, reset_timeout=10)
+    both_inside = threading.Barrier(2, timeout=2)
+
+    threads = [threading.Thread(target=breaker.call, args=(both_inside.wait,)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not both_inside.broken
+
+
+def test_half_open_breaker_lets_one_trial_call_through():
+    import threading
+    import pybreaker
+    from app.core.breaker import CircuitBreaker
+
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=0)
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        breaker.call(lambda: 1 / 0)
+    assert breaker.current_state == pybreaker.STATE_OPEN
+
+    inside, release = threading.Event(), threading.Event()
+    trial = threading.Thread(target=breaker.call, args=(lambda: inside.set() or release.wait(2),))
+    trial.start()
+    assert inside.wait(2)
+
+    assert breaker.current_state == pybreaker.STATE_HALF_OPEN
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        breaker.call(lambda: None)
+
+    release.set()
+    trial.join()
+    assert breaker.current_state == pybreaker.STATE_CLOSED
+    assert breaker.call(lambda: 42) == 42
+
+
+def test_half_open_breaker_admits_one_trial_per_thread():
+    import pybreaker
+    from greenlet import greenlet
+    from app.core.breaker import CircuitBreaker
+
+    # AsyncSession runs every query in a greenlet on the event loop's thread
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=0)
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        breaker.call(lambda: 1 / 0)
+
+    loop = greenlet.getcurrent()
+    trial = greenlet(lambda: breaker.call(loop.switch))
+    trial.switch()
+    assert breaker.current_state == pybreaker.STATE_HALF_OPEN
+
+    for _ in range(4):
+        with pytest.raises(pybreaker.CircuitBreakerError):
+            greenlet(breaker.call).switch(lambda: None)
+
+    trial.switch()
+    assert trial.dead
+    assert breaker.current_state == pybreaker.STATE_CLOSED
+
+
+def test_closed_breaker_counts_failures():
+    import pybreaker
+    from app.core.breaker import CircuitBreaker
+
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=10)
+    with pytest.raises(ZeroDivisionError):
+        breaker.call(lambda: 1 / 0)
+    assert breaker.fail_counter == 1
+    breaker.call(lambda: None)
+    assert breaker.fail_counter == 0
+
+    with pytest.raises(ZeroDivisionError):
+        breaker.call(lambda: 1 / 0)
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        breaker.call(lambda: 1 / 0)
+    assert breaker.current_state == pybreaker.STATE_OPEN
+
+
+def test_adaptive_breaker_opens_on_slow_calls():
+    import time
+    import pybreaker
+    from app.core.breaker import AdaptiveCircuitBreaker
+
+    breaker = AdaptiveCircuitBreaker(
+        fail_max=3, reset_timeout=10, latency_threshold=0.005, latency_percentile=0.5, min_samples=4
+    )
+    for _ in range(3):
+        breaker.call(lambda: None)
+
+    # the median only turns slow with the third slow call
+    breaker.call(time.sleep, 0.01)
+    breaker.call(time.sleep, 0.01)
+    assert breaker.current_state == pybreaker.STATE_CLOSED
+    breaker.call(time.sleep, 0.01)
+
+    assert breaker.current_state == pybreaker.STATE_OPEN
+    stats = breaker.stats()
+    assert (stats['opened'], stats['latency_trips']) == (1, 1)
+    assert stats['latency']['p50_ms'] >= 10
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        breaker.call(lambda: None)
+
+
+def test_open_breaker_serves_last_known_good_snapshot(authorized_client):
+    from types import SimpleNamespace
+    from pybreaker import CircuitBreakerError
+    from app.core.etag import version_registry
+    from app.dependencies import get_stock_service
+    from conftest import MockStockService
+
+    fresh = authorized_client.get("/stock/holdings")
+
+    class OpenBreakerStockService(MockStockService):
+        def get_holdings(self, user_id: int):
+            raise CircuitBreakerError("holdings breaker is open")
+
+    app.dependency_overrides[get_stock_service] = lambda: OpenBreakerStockService()
+    version_registry.bump(1, 'holdings')
+    stale = authorized_client.get("/stock/holdings")
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=2)
+    missing = authorized_client.get("/stock/holdings")
+
+    assert stale.status_code == 200
+    assert stale.json() == fresh.json()
+    assert stale.headers["X-Stale"] == "true"
+    assert "ETag" not in stale.headers
+    assert missing.status_code == 503
+
+
+def test_breaker_diagnostics_require_key(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, 'DIAGNOSTICS_API_KEY', "ops-secret")
+    assert client.get("/diagnostics/breakers").status_code == 403
+
+    response = client.get("/diagnostics/breakers", headers={"X-API-Key": "ops-secret"})
+    assert response.status_code == 200
+    assert set(response.json()['breakers']) == {'holdings', 'positions', 'orders'}
+    assert response.json()['breakers']['holdings']['state'] == 'closed'
+
+
+def test_holdings_conditional_get(authorized_client):
+    from app.core.etag import version_registry
+    from app.dependencies import get_stock_service
+    from conftest import MockStockService
+
+    calls = []
+
+    class CountingStockService(MockStockService):
+        def get_holdings(self, user_id: int):
+            calls.append(user_id)
+            return super().get_holdings(user_id)
+
+    app.dependency_overrides[get_stock_service] = lambda: CountingStockService()
+
+    first = authorized_client.get("/stock/holdings")
+    etag = first.headers["ETag"]
+    not_modified = authorized_client.get("/stock/holdings", headers={"If-None-Match": etag})
+    cached = authorized_client.get("/stock/holdings")
+
+    version_registry.bump(1, 'holdings')
+    changed = authorized_client.get("/stock/holdings", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert cached.json() == first.json()
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert calls == [1, 1]
+
+
+def test_orm_writes_bump_versions_after_commit(db):
+    from app.core.etag import version_registry
+    from app.models.stock import Holding
+
+    before = version_registry.version(7, ('holdings',))
+    holding = Holding(user_id=7, symbol="NFLX", quantity=1, avg_price=1.0, current_price=1.0)
+    db.add(holding)
+    db.flush()
+    flushed = version_registry.version(7, ('holdings',))
+    db.commit()
+    committed = version_registry.version(7, ('holdings',))
+
+    db.delete(holding)
+    db.commit()
+
+    assert flushed == before
+    assert committed != before
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_export_orders_streams_full_history(client, test_user, order_history, export_format):
+    import csv
+    import json
+
+    app.dependency_overrides[get_current_user] = lambda: test_user
+
+    with client.stream("GET", "/stock/orders/export", params={"format": export_format}) as response:
+        body = response.read().decode()
+
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    if export_format == "ndjson":
+        rows = [json.loads(line) for line in body.splitlines()]
+        assert response.headers["content-type"] == "application/x-ndjson"
+    else:
+        rows = list(csv.DictReader(body.splitlines()))
+
+    assert [int(row["id"]) for row in rows] == [order.id for order in order_history]
+    assert rows[0]["order_type"] == "BUY"